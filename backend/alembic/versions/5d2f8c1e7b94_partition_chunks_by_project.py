@@ -0,0 +1,117 @@
+"""partition chunks by project
+
+Revision ID: 5d2f8c1e7b94
+Revises: c41e7a9b2d58
+Create Date: 2026-10-19 10:00:00.000000
+
+Adds a denormalized chunks.project_id and rebuilds chunks as a table
+LIST-partitioned by project. Indexes declared on the parent (including the
+HNSW index) are created per partition, so ANN search for a project only walks
+that project's graph. New projects get their partition from
+app/services/partitions.py; anything without one lands in chunks_default.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.config import get_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2f8c1e7b94"
+down_revision: Union[str, None] = "c41e7a9b2d58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+settings = get_settings()
+
+CHUNK_COLUMNS = "id, document_id, content, page_number, section, embedding, metadata, created_at"
+
+
+def create_embedding_index() -> None:
+    op.execute(
+        f"""
+        CREATE INDEX ix_chunks_embedding_hnsw ON chunks
+        USING hnsw ((embedding::halfvec({settings.embedding_dimension})) halfvec_cosine_ops)
+        WITH (m = {settings.hnsw_m}, ef_construction = {settings.hnsw_ef_construction})
+        """
+    )
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE chunks RENAME TO chunks_unpartitioned")
+    op.execute("DROP INDEX IF EXISTS ix_chunks_embedding_hnsw")
+    op.execute("ALTER TABLE chunks_unpartitioned RENAME CONSTRAINT chunks_pkey TO chunks_unpartitioned_pkey")
+
+    op.execute(
+        f"""
+        CREATE TABLE chunks (
+            id UUID NOT NULL,
+            project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+            document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+            content TEXT NOT NULL,
+            page_number INTEGER,
+            section VARCHAR(500),
+            embedding vector({settings.embedding_dimension}),
+            metadata JSONB NOT NULL DEFAULT '{{}}',
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, project_id)
+        ) PARTITION BY LIST (project_id)
+        """
+    )
+    op.execute("CREATE TABLE chunks_default PARTITION OF chunks DEFAULT")
+    op.execute(
+        """
+        DO $$
+        DECLARE p record;
+        BEGIN
+            FOR p IN SELECT id FROM projects LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF chunks FOR VALUES IN (%L)',
+                    'chunks_p_' || replace(p.id::text, '-', ''),
+                    p.id
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO chunks (project_id, {CHUNK_COLUMNS})
+        SELECT d.project_id, {", ".join("c." + col for col in CHUNK_COLUMNS.split(", "))}
+        FROM chunks_unpartitioned c
+        JOIN documents d ON d.id = c.document_id
+        """
+    )
+    op.execute("DROP TABLE chunks_unpartitioned")
+
+    op.create_index("ix_chunks_document_id", "chunks", ["document_id"])
+    create_embedding_index()
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE chunks RENAME TO chunks_partitioned")
+    op.execute("ALTER TABLE chunks_partitioned RENAME CONSTRAINT chunks_pkey TO chunks_partitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_chunks_embedding_hnsw")
+    op.execute("DROP INDEX IF EXISTS ix_chunks_document_id")
+
+    op.execute(
+        f"""
+        CREATE TABLE chunks (
+            id UUID PRIMARY KEY,
+            document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+            content TEXT NOT NULL,
+            page_number INTEGER,
+            section VARCHAR(500),
+            embedding vector({settings.embedding_dimension}),
+            metadata JSONB NOT NULL DEFAULT '{{}}',
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        )
+        """
+    )
+    op.execute(
+        f"INSERT INTO chunks ({CHUNK_COLUMNS}) SELECT {CHUNK_COLUMNS} FROM chunks_partitioned"
+    )
+    # Dropping the parent drops every partition with it
+    op.execute("DROP TABLE chunks_partitioned")
+    create_embedding_index()
@@ -0,0 +1,64 @@
+"""add stored tsvector columns for full-text search
+
+Revision ID: 9a3c6e2f4d71
+Revises: 5d2f8c1e7b94
+Create Date: 2026-10-19 11:00:00.000000
+
+Keyword search previously parsed chunk and message text with to_tsvector on
+every query, once for the match and again for ts_rank. The parsed vectors are
+now generated columns, so queries only read them. Chunk section titles and
+document filenames are weighted 'A' so they can outrank body text (weight 'D').
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9a3c6e2f4d71"
+down_revision: Union[str, None] = "5d2f8c1e7b94"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        ALTER TABLE chunks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(section, '')), 'A')
+            || setweight(to_tsvector('english', content), 'D')
+        ) STORED
+        """
+    )
+    op.execute("CREATE INDEX ix_chunks_search_vector ON chunks USING gin (search_vector)")
+
+    op.execute(
+        """
+        ALTER TABLE documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', translate(filename, '_-.', '   ')), 'A')
+        ) STORED
+        """
+    )
+
+    op.execute(
+        """
+        ALTER TABLE messages ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            to_tsvector('english', content)
+        ) STORED
+        """
+    )
+    op.execute("CREATE INDEX ix_messages_search_vector ON messages USING gin (search_vector)")
+    # Queries use search_vector now, so inserts shouldn't maintain the inline
+    # expression index from 001. 0fe10ec32c1b drops it on the usual path;
+    # databases that still have it lose it here.
+    op.execute("DROP INDEX IF EXISTS idx_messages_content_fts")
+
+
+def downgrade() -> None:
+    # Not recreated here: 0fe10ec32c1b's downgrade recreates it, and would
+    # fail if it already existed
+    op.drop_index("ix_messages_search_vector", table_name="messages")
+    op.drop_column("messages", "search_vector")
+    op.drop_column("documents", "search_vector")
+    op.drop_index("ix_chunks_search_vector", table_name="chunks")
+    op.drop_column("chunks", "search_vector")
@@ -0,0 +1,36 @@
+"""add project enrichment mode
+
+Revision ID: a7e5c3b9d214
+Revises: f3c8a1d5b927
+Create Date: 2026-10-19 17:00:00.000000
+
+Per-project choice of when answer support and follow-ups are computed:
+inline, streamed as separate events, or deferred to the background.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7e5c3b9d214"
+down_revision: Union[str, None] = "f3c8a1d5b927"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+enrichment_mode = postgresql.ENUM("inline", "streamed", "deferred", name="enrichmentmode")
+
+
+def upgrade() -> None:
+    enrichment_mode.create(op.get_bind(), checkfirst=True)
+    op.add_column(
+        "projects",
+        sa.Column("enrichment_mode", enrichment_mode, nullable=False, server_default="streamed"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("projects", "enrichment_mode")
+    enrichment_mode.drop(op.get_bind(), checkfirst=True)
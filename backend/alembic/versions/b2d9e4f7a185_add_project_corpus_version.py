@@ -0,0 +1,31 @@
+"""add project corpus version
+
+Revision ID: b2d9e4f7a185
+Revises: e7b41c9d3a06
+Create Date: 2026-10-19 13:00:00.000000
+
+Counter bumped whenever a project's retrievable chunks change, used to key
+cached retrieval results.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b2d9e4f7a185"
+down_revision: Union[str, None] = "e7b41c9d3a06"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "projects",
+        sa.Column("corpus_version", sa.Integer, nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("projects", "corpus_version")
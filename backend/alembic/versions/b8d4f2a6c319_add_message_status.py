@@ -0,0 +1,36 @@
+"""add message status
+
+Revision ID: b8d4f2a6c319
+Revises: a7e5c3b9d214
+Create Date: 2026-10-19 18:00:00.000000
+
+Marks assistant messages whose generation was cancelled (client disconnect
+or explicit cancel); their content is the partial answer.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8d4f2a6c319"
+down_revision: Union[str, None] = "a7e5c3b9d214"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+message_status = postgresql.ENUM("complete", "interrupted", name="messagestatus")
+
+
+def upgrade() -> None:
+    message_status.create(op.get_bind(), checkfirst=True)
+    op.add_column(
+        "messages",
+        sa.Column("status", message_status, nullable=False, server_default="complete"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("messages", "status")
+    message_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,48 @@
+"""add hnsw index on chunk embeddings
+
+Revision ID: c41e7a9b2d58
+Revises: 8f9d3f1a2b6c
+Create Date: 2026-10-19 09:00:00.000000
+
+Replaces the ivfflat index from the initial schema (built on an empty table,
+so its centroids never reflected real data) with an HNSW index. pgvector only
+indexes up to 2000 dimensions for `vector`, so the index is built on a
+halfvec cast of the 3072-dim embedding; queries in app/services/retrieval.py
+use the same expression. Requires pgvector >= 0.7.0.
+
+m and ef_construction come from HNSW_M / HNSW_EF_CONSTRUCTION. Changing them
+requires a new migration that rebuilds the index.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.config import get_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c41e7a9b2d58"
+down_revision: Union[str, None] = "8f9d3f1a2b6c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+settings = get_settings()
+
+
+def upgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_chunks_embedding")
+
+    # Build without blocking ingestion writes
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chunks_embedding_hnsw ON chunks
+            USING hnsw ((embedding::halfvec({settings.embedding_dimension})) halfvec_cosine_ops)
+            WITH (m = {settings.hnsw_m}, ef_construction = {settings.hnsw_ef_construction})
+            """
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_chunks_embedding_hnsw")
@@ -0,0 +1,33 @@
+"""add message history index
+
+Revision ID: c5e9a3d7f142
+Revises: b8d4f2a6c319
+Create Date: 2026-10-19 19:00:00.000000
+
+Serves the newest messages of a conversation (ORDER BY created_at DESC
+LIMIT n) for chat prompt history, and conversation message listings, which
+have had no index since idx_messages_conversation_id was dropped.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5e9a3d7f142"
+down_revision: Union[str, None] = "b8d4f2a6c319"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_messages_conversation_created",
+        "messages",
+        ["conversation_id", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_conversation_created", table_name="messages")
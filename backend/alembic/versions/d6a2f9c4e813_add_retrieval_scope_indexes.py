@@ -0,0 +1,41 @@
+"""add retrieval scope indexes
+
+Revision ID: d6a2f9c4e813
+Revises: b2d9e4f7a185
+Create Date: 2026-10-19 15:00:00.000000
+
+Supports resolving chat retrieval filters (document category, tag) to
+document ids without scanning a project's documents or all tags.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d6a2f9c4e813"
+down_revision: Union[str, None] = "b2d9e4f7a185"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_documents_project_category_live",
+        "documents",
+        ["project_id", "category"],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_document_tags_tag_document",
+        "document_tags",
+        ["tag", "document_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_document_tags_tag_document", table_name="document_tags")
+    op.drop_index("ix_documents_project_category_live", table_name="documents")
@@ -0,0 +1,33 @@
+"""add conversation summary
+
+Revision ID: d9b3e7a1c624
+Revises: c5e9a3d7f142
+Create Date: 2026-10-19 20:00:00.000000
+
+Rolling summary of a conversation's older messages, used in place of them
+in chat prompts; summary_message_count is how many messages it covers.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d9b3e7a1c624"
+down_revision: Union[str, None] = "c5e9a3d7f142"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("summary", sa.Text(), nullable=True))
+    op.add_column(
+        "conversations",
+        sa.Column("summary_message_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("conversations", "summary_message_count")
+    op.drop_column("conversations", "summary")
@@ -0,0 +1,29 @@
+"""add message usage
+
+Revision ID: e4a8c2f6b917
+Revises: d9b3e7a1c624
+Create Date: 2026-10-19 21:00:00.000000
+
+Provider token usage per assistant message, including prompt tokens served
+from the provider's prompt cache.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4a8c2f6b917"
+down_revision: Union[str, None] = "d9b3e7a1c624"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("messages", sa.Column("usage", postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("messages", "usage")
@@ -0,0 +1,41 @@
+"""add shared query embedding cache
+
+Revision ID: e7b41c9d3a06
+Revises: 9a3c6e2f4d71
+Create Date: 2026-10-19 12:00:00.000000
+
+Optional second tier behind the in-process query-embedding LRU, so workers
+reuse each other's embeddings of repeated questions.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+from app.config import get_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b41c9d3a06"
+down_revision: Union[str, None] = "9a3c6e2f4d71"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+settings = get_settings()
+
+
+def upgrade() -> None:
+    op.create_table(
+        "query_embeddings",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("embedding", Vector(settings.embedding_dimension), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_query_embeddings_created_at", "query_embeddings", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_query_embeddings_created_at", table_name="query_embeddings")
+    op.drop_table("query_embeddings")
@@ -0,0 +1,62 @@
+"""add document summaries
+
+Revision ID: f3c8a1d5b927
+Revises: d6a2f9c4e813
+Create Date: 2026-10-19 16:00:00.000000
+
+Per-document and per-section summaries with embeddings, written as the last
+ingestion stage. Back coarse-to-fine retrieval and project overviews.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+from app.config import get_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c8a1d5b927"
+down_revision: Union[str, None] = "d6a2f9c4e813"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+settings = get_settings()
+
+
+def upgrade() -> None:
+    op.create_table(
+        "document_summaries",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "project_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("projects.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "document_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("documents.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("section", sa.String(500), nullable=True),
+        sa.Column("content", sa.Text, nullable=False),
+        sa.Column("chunk_count", sa.Integer, nullable=False),
+        sa.Column("page_start", sa.Integer, nullable=True),
+        sa.Column("page_end", sa.Integer, nullable=True),
+        sa.Column("embedding", Vector(settings.embedding_dimension), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_document_summaries_project_document",
+        "document_summaries",
+        ["project_id", "document_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_document_summaries_project_document", table_name="document_summaries")
+    op.drop_table("document_summaries")
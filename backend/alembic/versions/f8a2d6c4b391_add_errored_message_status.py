@@ -0,0 +1,30 @@
+"""add errored message status
+
+Revision ID: f8a2d6c4b391
+Revises: e4a8c2f6b917
+Create Date: 2026-10-19 22:00:00.000000
+
+Assistant messages whose generation failed are stored as errored, so a
+client reconnecting after the event log expires gets the outcome.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f8a2d6c4b391"
+down_revision: Union[str, None] = "e4a8c2f6b917"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ADD VALUE can't run inside a transaction block before PostgreSQL 12
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE messagestatus ADD VALUE IF NOT EXISTS 'errored'")
+
+
+def downgrade() -> None:
+    # PostgreSQL can't remove enum values; errored rows become interrupted
+    op.execute("UPDATE messages SET status = 'interrupted' WHERE status = 'errored'")
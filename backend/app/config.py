@@ -39,6 +39,81 @@ class Settings(BaseSettings):
 
     # Retrieval settings
     retrieval_top_k: int = 40  # more context for GPT-4o
+    embedding_timeout_seconds: float = 5.0  # past this, answer from keyword results only
+    query_embedding_cache_size: int = 2048  # 0 disables
+    query_embedding_cache_ttl_seconds: int = 86_400
+    query_embedding_cache_db: bool = False  # share cached embeddings across workers
+    # "python" fuses two queries in merge_results; "sql" runs one fused statement
+    retrieval_fusion_mode: Literal["python", "sql"] = "python"
+    vector_search_profile: Literal["fast", "balanced", "exhaustive"] = "balanced"
+    # ts_rank weights for D, C, B, A labels: body text is D, section titles and
+    # filenames are A. Set all four equal to rank without field weighting.
+    keyword_rank_weights: list[float] = [0.1, 0.2, 0.4, 1.0]
+    # Lexical leg of hybrid search: Postgres full text (ts_rank) or the
+    # in-process BM25 index (app.services.bm25_index)
+    lexical_backend: Literal["postgres", "bm25"] = "postgres"
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    chunk_cache_size: int = 4096  # chunk texts kept in-process by id; 0 disables
+    retrieval_cache_max_mb: int = 64  # cached hybrid_search results; 0 disables
+    # Coarse-to-fine retrieval: rank documents by their summaries and search
+    # chunks only within the closest N; 0 searches every document
+    hierarchical_top_documents: int = 0
+    # Chat turns without explicit filters search only the document categories
+    # their question mentions (plus uncategorized documents)
+    retrieval_auto_scope: bool = False
+    # Follow-up turns are answered from the chunks earlier turns retrieved when
+    # at least working_set_min_hits of them clear working_set_min_similarity
+    working_set_enabled: bool = True
+    working_set_ttl_seconds: int = 900
+    working_set_max_chunks: int = 200
+    working_set_min_hits: int = 12
+    working_set_min_similarity: float = 0.45  # cosine
+    # Exact in-process vector search for projects up to vector_index_max_chunks;
+    # larger projects use the pgvector HNSW index
+    vector_index_enabled: bool = False
+    vector_index_max_chunks: int = 50_000
+    vector_index_memory_mb: int = 2048  # loaded project indexes, LRU-evicted past this
+
+    # Context packing (app.services.context_packer): retrieved chunks are packed
+    # into the prompt up to a token budget per provider, or "provider:model"
+    context_token_budget: int = 12_000
+    context_token_budgets: dict[str, int] = {"openai": 24_000, "anthropic": 48_000, "ollama": 6_000}
+    # MMR relevance/diversity trade-off (1.0 = rank order only); None disables
+    context_mmr_lambda: float | None = None
+
+    # Answer support: "response" compares each chunk with the whole answer;
+    # "sentences" takes each chunk's best match over the answer's sentences
+    support_scoring: Literal["response", "sentences"] = "response"
+
+    # Streamed answer tokens are sent in frames of up to stream_coalesce_chars,
+    # each held at most stream_coalesce_ms; 0 sends every token as it arrives
+    stream_coalesce_ms: int = 30
+    stream_coalesce_chars: int = 256
+    # Answers keep generating when their stream drops; clients resume with
+    # Last-Event-ID. An answer nobody follows for stream_detach_grace_seconds
+    # is cancelled, and event logs are kept stream_resume_ttl_seconds after
+    # the answer is saved.
+    stream_detach_grace_seconds: int = 30
+    stream_resume_ttl_seconds: int = 300
+
+    # Chat prompts include the newest history_max_messages messages that fit
+    # in history_token_budget tokens
+    history_max_messages: int = 20
+    history_token_budget: int = 4_000
+    # Messages older than the newest conversation_summary_keep_messages are
+    # folded into a rolling summary, conversation_summary_batch_messages at a time
+    conversation_summary_keep_messages: int = 10
+    conversation_summary_batch_messages: int = 6
+    conversation_summary_max_tokens: int = 600
+
+    # Settings-table values are cached per worker; changes propagate by
+    # LISTEN/NOTIFY, and this bounds staleness if a notification is missed
+    runtime_settings_ttl_seconds: int = 300
+
+    # Vector index settings (applied by migrations when the HNSW index is built)
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 64
 
 
 @lru_cache
@@ -1,7 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from pgvector.asyncpg import register_vector
 
 from app.config import get_settings
 
@@ -16,6 +17,14 @@ async_engine = create_async_engine(
     max_overflow=20,
 )
 
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def register_vector_codec(dbapi_connection, connection_record):
+    """Exchange vector/halfvec values with asyncpg in pgvector's binary format."""
+    if async_engine.dialect.driver == "asyncpg":
+        dbapi_connection.run_async(register_vector)
+
+
 AsyncSessionLocal = async_sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
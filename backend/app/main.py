@@ -1,4 +1,5 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,14 +11,20 @@ from app.routers import (
     search_router,
     reports_router,
     settings_router,
+    admin_router,
 )
+from app.services import notify
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    listener = asyncio.create_task(notify.listen_forever())
     yield
-    # Shutdown
+    # Shutdown: wait for the LISTEN connection to close before the engine goes
+    listener.cancel()
+    with suppress(asyncio.CancelledError):
+        await listener
 
 
 app = FastAPI(
@@ -48,6 +55,7 @@ app.include_router(chat_router)
 app.include_router(search_router)
 app.include_router(reports_router)
 app.include_router(settings_router)
+app.include_router(admin_router)
 
 
 @app.get("/health")
@@ -1,18 +1,22 @@
 from app.models.project import Project
 from app.models.document import Document, DocumentTag
 from app.models.chunk import Chunk
+from app.models.document_summary import DocumentSummary
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.models.settings import Settings
 from app.models.report_template import ReportTemplate
+from app.models.query_embedding import QueryEmbedding
 
 __all__ = [
     "Project",
     "Document",
     "DocumentTag",
     "Chunk",
+    "DocumentSummary",
     "Conversation",
     "Message",
     "Settings",
     "ReportTemplate",
+    "QueryEmbedding",
 ]
@@ -2,8 +2,8 @@ import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import String, Text, Enum, DateTime, Integer, ForeignKey, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import String, Text, Enum, DateTime, Integer, ForeignKey, Computed, func
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -57,6 +57,14 @@ class Document(Base):
     )
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
     deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    search_vector = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', translate(filename, '_-.', '   ')), 'A')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -69,6 +77,9 @@ class Document(Base):
     tags: Mapped[list["DocumentTag"]] = relationship(
         "DocumentTag", back_populates="document", cascade="all, delete-orphan"
     )
+    summaries: Mapped[list["DocumentSummary"]] = relationship(
+        "DocumentSummary", back_populates="document", cascade="all, delete-orphan"
+    )
 
 
 class DocumentTag(Base):
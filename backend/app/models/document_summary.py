@@ -0,0 +1,43 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, Text, Integer, ForeignKey, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.database import Base
+from app.models.types import EmbeddingVector
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class DocumentSummary(Base):
+    """
+    Compact summary of a whole document (section is None) or of one of its
+    sections, with an embedding for ranking documents before chunks.
+    """
+
+    __tablename__ = "document_summaries"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    project_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+    )
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False
+    )
+    section: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    chunk_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    page_start: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    page_end: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    embedding = mapped_column(EmbeddingVector(settings.embedding_dimension), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    # Relationships
+    document: Mapped["Document"] = relationship("Document", back_populates="summaries")
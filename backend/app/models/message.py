@@ -2,8 +2,8 @@ import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import String, Text, Enum, ForeignKey, DateTime, func
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import String, Text, Enum, ForeignKey, DateTime, Computed, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -14,6 +14,12 @@ class MessageRole(str, PyEnum):
     assistant = "assistant"
 
 
+class MessageStatus(str, PyEnum):
+    complete = "complete"
+    interrupted = "interrupted"  # generation cancelled; content is the partial answer
+    errored = "errored"  # generation failed; content is the partial answer, if any
+
+
 class Message(Base):
     __tablename__ = "messages"
 
@@ -28,9 +34,22 @@ class Message(Base):
     )
     role: Mapped[MessageRole] = mapped_column(Enum(MessageRole), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[MessageStatus] = mapped_column(
+        Enum(MessageStatus),
+        default=MessageStatus.complete,
+        server_default=MessageStatus.complete.value,
+        nullable=False,
+    )
     citations: Mapped[list | None] = mapped_column(JSONB, nullable=True)
     suggested_followups: Mapped[list | None] = mapped_column(JSONB, nullable=True)
     debug_info: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    # Provider token usage for assistant answers
+    usage: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    search_vector = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('english', content)", persisted=True),
+        deferred=True,
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
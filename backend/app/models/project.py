@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import String, Text, Enum, DateTime, func
+from sqlalchemy import String, Text, Enum, DateTime, Integer, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -14,6 +14,13 @@ class RoleMode(str, PyEnum):
     analytical = "analytical"
 
 
+class EnrichmentMode(str, PyEnum):
+    """When post-answer enrichments (answer support, follow-ups) run."""
+    inline = "inline"  # before the answer is returned or completed
+    streamed = "streamed"  # streamed chats send them as events after `complete`
+    deferred = "deferred"  # in the background; the stored message is patched
+
+
 class Project(Base):
     __tablename__ = "projects"
 
@@ -25,6 +32,14 @@ class Project(Base):
     role_mode: Mapped[RoleMode] = mapped_column(
         Enum(RoleMode), default=RoleMode.plain, nullable=False
     )
+    enrichment_mode: Mapped[EnrichmentMode] = mapped_column(
+        Enum(EnrichmentMode),
+        default=EnrichmentMode.streamed,
+        server_default=EnrichmentMode.streamed.value,
+        nullable=False,
+    )
+    # Bumped whenever retrievable chunks change; keys the retrieval cache
+    corpus_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import String, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.types import EmbeddingVector
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class QueryEmbedding(Base):
+    """Shared tier of the query-embedding cache, keyed by model and normalized query."""
+
+    __tablename__ = "query_embeddings"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 hex
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    embedding = mapped_column(EmbeddingVector(settings.embedding_dimension), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
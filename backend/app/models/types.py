@@ -0,0 +1,53 @@
+from typing import Any
+
+import numpy as np
+from pgvector import HalfVector, Vector
+from pgvector.sqlalchemy import HALFVEC, VECTOR
+
+
+class EmbeddingVector(VECTOR):
+    """
+    pgvector column exchanged as float32 numpy arrays.
+
+    On asyncpg the binary codec registered in app.database encodes lists and
+    arrays directly, so SQLAlchemy must not pre-render them as text. Other
+    drivers (psycopg2 for migrations) keep pgvector's text protocol.
+    """
+
+    cache_ok = True
+
+    def bind_processor(self, dialect: Any) -> Any:
+        if dialect.driver == "asyncpg":
+            return None
+        return super().bind_processor(dialect)
+
+    def result_processor(self, dialect: Any, coltype: Any) -> Any:
+        def process(value: Any) -> np.ndarray | None:
+            if value is None:
+                return None
+            if not isinstance(value, Vector):
+                value = Vector.from_text(value)
+            return value.to_numpy()
+
+        return process
+
+
+class HalfEmbeddingVector(HALFVEC):
+    """halfvec counterpart of EmbeddingVector, used for the HNSW index cast."""
+
+    cache_ok = True
+
+    def bind_processor(self, dialect: Any) -> Any:
+        if dialect.driver == "asyncpg":
+            return None
+        return super().bind_processor(dialect)
+
+    def result_processor(self, dialect: Any, coltype: Any) -> Any:
+        def process(value: Any) -> np.ndarray | None:
+            if value is None:
+                return None
+            if not isinstance(value, HalfVector):
+                value = HalfVector.from_text(value)
+            return value.to_numpy().astype(np.float32)
+
+        return process
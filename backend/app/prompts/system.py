@@ -114,3 +114,15 @@ Format your response as a JSON array of 3 strings:
 ["Question 1?", "Question 2?", "Question 3?"]
 
 Only output the JSON array, nothing else."""
+
+
+def get_conversation_summary_prompt() -> str:
+    """Get prompt for folding older messages into the running conversation summary."""
+    return """You maintain the running summary of a real estate due diligence conversation between a user and a document assistant.
+Rewrite the current summary to also cover the new messages. Keep:
+1. The questions the user asked and the conclusions reached
+2. Specific facts, figures, dates, parties and the documents and pages they came from
+3. Open questions and anything the user asked to keep in mind
+
+Drop pleasantries and repetition. Write plain prose or short bullet points, at most 300 words.
+Only output the summary, nothing else."""
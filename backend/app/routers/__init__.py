@@ -4,6 +4,7 @@ from app.routers.chat import router as chat_router
 from app.routers.search import router as search_router
 from app.routers.reports import router as reports_router
 from app.routers.settings import router as settings_router
+from app.routers.admin import router as admin_router
 
 __all__ = [
     "projects_router",
@@ -12,4 +13,5 @@ __all__ = [
     "search_router",
     "reports_router",
     "settings_router",
+    "admin_router",
 ]
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+
+from app.schemas.admin import CacheStatsResponse, CacheStats, SharedCacheStats
+from app.services.embeddings import query_embedding_cache_stats
+from app.services.retrieval import chunk_text_cache
+from app.services.retrieval_cache import retrieval_cache
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/cache-stats", response_model=CacheStatsResponse)
+async def get_cache_stats():
+    """
+    Hit ratios of this worker's in-process caches.
+
+    Counters are per process and reset on restart; with several workers each
+    reports its own.
+    """
+    query_embeddings = query_embedding_cache_stats()
+    shared = query_embeddings.pop("shared")
+
+    return CacheStatsResponse(
+        retrieval=CacheStats(**retrieval_cache.stats()),
+        query_embeddings=CacheStats(**query_embeddings),
+        query_embeddings_shared=SharedCacheStats(**shared),
+        chunk_texts=CacheStats(**chunk_text_cache.stats()),
+    )
@@ -1,21 +1,22 @@
+import asyncio
 import uuid
 import json
 import time
-import math
-import re
+from dataclasses import asdict
 from datetime import datetime, timezone
 from typing import AsyncGenerator
 
-from fastapi import APIRouter, Depends, HTTPException
+import numpy as np
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sse_starlette.sse import EventSourceResponse
 
-from app.database import get_db
-from app.models.project import Project
+from app.database import get_db, AsyncSessionLocal
+from app.models.project import Project, EnrichmentMode
 from app.models.conversation import Conversation
-from app.models.message import Message, MessageRole
+from app.models.message import Message, MessageRole, MessageStatus
 from app.schemas.chat import (
     ChatRequest,
     ChatResponse,
@@ -26,45 +27,100 @@ from app.schemas.chat import (
     Citation,
     DebugInfo,
     RetrievedChunkInfo,
+    RetrievalTimingsInfo,
     EditAndRegenerateRequest,
     EditAndRegenerateResponse,
 )
-from app.services.retrieval import hybrid_search, format_context_for_llm, RetrievedChunk
-from app.services.embeddings import generate_embeddings
-from app.services.llm import get_llm_provider
+from app.models.document import DocumentCategory
+from app.services.retrieval import (
+    format_context_for_llm,
+    load_chunk_embeddings,
+    resolve_document_scope,
+    RetrievedChunk,
+    RetrievalTimings,
+)
+from app.services.ingestion.categorizer import classify_query
+from app.services.context_packer import PackedContext, context_token_budget, pack_context
+from app.services.citations import CitationParser, extract_citations
+from app.services.streaming import coalesce_tokens, dumps
+from app.services import generations
+from app.services.support import score_answer_support
+from app.services.conversation_memory import load_memory, update_summary
+from app.services.working_set import conversation_search, discard as discard_working_set
+from app.services.llm import BaseLLMProvider, get_llm_provider
 from app.prompts.system import get_system_prompt, get_followup_generation_prompt
-from app.models.settings import Settings as SettingsModel
-from app.routers.settings import decrypt_value
+from app.services.runtime_settings import get_llm_config
 from app.config import get_settings
 
 settings = get_settings()
 router = APIRouter(prefix="/projects/{project_id}", tags=["chat"])
 
 
-async def get_llm_config(db: AsyncSession) -> tuple[str, str | None]:
-    """Read LLM provider and decrypted API key from DB settings.
-    Falls back to env vars if not set in DB."""
-    result = await db.execute(select(SettingsModel))
-    settings_dict = {s.key: s for s in result.scalars().all()}
+async def resolve_search_scope(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    request: ChatRequest,
+) -> list[uuid.UUID] | None:
+    """Documents a chat turn searches: its explicit filters, else auto-scoped categories."""
+    if request.document_ids or request.categories or request.tags:
+        return await resolve_document_scope(
+            db, project_id, request.document_ids, request.categories, request.tags
+        )
+
+    auto_scope = settings.retrieval_auto_scope if request.auto_scope is None else request.auto_scope
+    categories = classify_query(request.message) if auto_scope else []
+    if not categories:
+        return None
+
+    # Uncategorized documents stay in scope; a scope matching nothing searches everything
+    scoped = await resolve_document_scope(
+        db, project_id, categories=[*categories, DocumentCategory.other]
+    )
+    return scoped or None
+
+
+def provider_context_budget(provider_name: str, provider: BaseLLMProvider) -> int:
+    """Context budget for a provider and the model it answers with."""
+    return context_token_budget(provider_name, getattr(provider, "default_model", None))
+
 
-    # Provider from DB, fallback to env
-    provider_setting = settings_dict.get("llm_provider")
-    provider = (
-        provider_setting.value.get("v", settings.default_llm_provider)
-        if provider_setting
-        else settings.default_llm_provider
+def _chunk_info(chunk: RetrievedChunk) -> RetrievedChunkInfo:
+    return RetrievedChunkInfo(
+        document_name=chunk.document_name,
+        page_number=chunk.page_number,
+        section=chunk.section,
+        content=chunk.content[:500],  # Truncate for UI
+        score=chunk.score,
+        retrieval_relevance=chunk.retrieval_relevance,
+        answer_support=chunk.answer_support,
+        retrieval_rank=chunk.retrieval_rank,
+        cited_in_answer=chunk.cited_in_answer,
     )
 
-    # API key from DB (encrypted), fallback to env
-    api_key = None
-    key_setting = settings_dict.get(f"api_key_{provider}")
-    if key_setting and key_setting.encrypted_value:
-        try:
-            api_key = decrypt_value(key_setting.encrypted_value)
-        except Exception:
-            pass  # Fall through to env var
 
-    return provider, api_key
+def build_debug_info(
+    chunks: list[RetrievedChunk],
+    start_time: float,
+    llm_model: str,
+    system_prompt: str,
+    user_prompt: str,
+    retrieval_timings: RetrievalTimings | None = None,
+    packed: PackedContext | None = None,
+) -> DebugInfo:
+    """Assemble the Inspect payload stored with an assistant message."""
+    return DebugInfo(
+        retrieved_chunks=[_chunk_info(c) for c in chunks],
+        execution_time_ms=(time.time() - start_time) * 1000,
+        llm_model=llm_model,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        retrieval_timings=(
+            RetrievalTimingsInfo(**asdict(retrieval_timings)) if retrieval_timings else None
+        ),
+        context_token_budget=packed.token_budget if packed else None,
+        context_tokens_used=packed.tokens_used if packed else None,
+        dropped_chunks=[_chunk_info(c) for c in packed.dropped_chunks] if packed else [],
+    )
 
 
 @router.get("/conversations", response_model=ConversationListResponse)
@@ -175,9 +231,11 @@ async def get_conversation(
                 id=m.id,
                 role=m.role,
                 content=m.content,
+                status=m.status,
                 citations=[Citation(**c) for c in (m.citations or [])],
                 suggested_followups=m.suggested_followups,
                 debug_info=DebugInfo(**m.debug_info) if m.debug_info else None,
+                usage=m.usage,
                 created_at=m.created_at,
             )
             for m in messages
@@ -239,6 +297,7 @@ async def delete_conversation(
     else:
         await db.delete(conversation)
     await db.commit()
+    discard_working_set(conversation_id)
 
 
 @router.post("/conversations/{conversation_id}/restore")
@@ -377,49 +436,36 @@ async def edit_and_regenerate(
     await db.flush()
 
     start_time = time.time()
-    chunks = await hybrid_search(db, request.new_content, project_id)
-    history = await get_conversation_history(db, branch_conversation.id)
-    response_content, citations = await generate_response(
+    retrieval_timings = RetrievalTimings()
+    chunks = await conversation_search(
+        db, request.new_content, project_id, branch_conversation.id, timings=retrieval_timings
+    )
+    llm_config = await get_llm_config(db)
+    provider_name, api_key = llm_config
+    provider = get_llm_provider(provider_name, api_key=api_key)
+    packed = pack_context(chunks, provider_context_budget(provider_name, provider))
+    chunks = packed.chunks
+    history = await load_memory(db, branch_conversation.id)
+    response_content, citations, usage = await generate_response(
         db=db,
         project=project,
         query=request.new_content,
         chunks=chunks,
         history=history,
+        context=packed.text,
     )
-    followups = await generate_followups(
-        db=db,
-        query=request.new_content,
-        response=response_content,
-        chunks=chunks,
-    )
+    deferred = project.enrichment_mode == EnrichmentMode.deferred
+    followups = None
+    if not deferred:
+        vectors = await load_chunk_embeddings(db, project_id, [c.chunk_id for c in chunks])
+        followups = await enrich_response(
+            request.new_content, response_content, chunks, citations, llm_config, vectors
+        )
 
-    provider_name, _ = await get_llm_config(db)
-    context = format_context_for_llm(chunks)
     system_prompt = get_system_prompt(project.role_mode.value)
-    user_prompt = f"""Based on the following documents:
-
-{context}
-
-Question: {request.new_content}"""
-    debug_info = DebugInfo(
-        retrieved_chunks=[
-            RetrievedChunkInfo(
-                document_name=c.document_name,
-                page_number=c.page_number,
-                section=c.section,
-                content=c.content[:500],
-                score=c.score,
-                retrieval_relevance=c.retrieval_relevance,
-                answer_support=c.answer_support,
-                retrieval_rank=c.retrieval_rank,
-                cited_in_answer=c.cited_in_answer,
-            )
-            for c in chunks
-        ],
-        execution_time_ms=(time.time() - start_time) * 1000,
-        llm_model=provider_name,
-        system_prompt=system_prompt,
-        user_prompt=user_prompt,
+    user_prompt = build_prompt_messages(system_prompt, [], packed.text, request.new_content)[-1]["content"]
+    debug_info = build_debug_info(
+        chunks, start_time, provider_name, system_prompt, user_prompt, retrieval_timings, packed
     )
 
     assistant_message = Message(
@@ -429,10 +475,23 @@ Question: {request.new_content}"""
         citations=[c.model_dump(mode="json") for c in citations],
         suggested_followups=followups,
         debug_info=debug_info.model_dump(mode="json"),
+        usage=usage,
     )
     db.add(assistant_message)
     await db.commit()
     await db.refresh(assistant_message)
+    run_in_background(update_summary(branch_conversation.id, llm_config))
+    if deferred:
+        enrich_in_background(
+            assistant_message.id,
+            project_id,
+            request.new_content,
+            response_content,
+            chunks,
+            citations,
+            llm_config,
+            debug_info,
+        )
 
     return EditAndRegenerateResponse(
         source_conversation_id=source_conversation.id,
@@ -445,6 +504,7 @@ Question: {request.new_content}"""
             citations=citations,
             suggested_followups=followups,
             debug_info=debug_info,
+            usage=usage,
             created_at=assistant_message.created_at,
         ),
     )
@@ -494,55 +554,50 @@ async def chat(
 
     # Retrieve relevant chunks
     start_time = time.time()
-    chunks = await hybrid_search(db, request.message, project_id)
+    retrieval_timings = RetrievalTimings()
+    document_ids = await resolve_search_scope(db, project_id, request)
+    chunks = await conversation_search(
+        db,
+        request.message,
+        project_id,
+        conversation.id,
+        document_ids=document_ids,
+        timings=retrieval_timings,
+    )
+
+    # Fit the retrieved chunks into the provider's context budget
+    llm_config = await get_llm_config(db)
+    provider_name, api_key = llm_config
+    provider = get_llm_provider(provider_name, api_key=api_key)
+    packed = pack_context(chunks, provider_context_budget(provider_name, provider))
+    chunks = packed.chunks
 
     # Build conversation history
-    history = await get_conversation_history(db, conversation.id)
+    history = await load_memory(db, conversation.id)
 
     # Generate response
-    response_content, citations = await generate_response(
+    response_content, citations, usage = await generate_response(
         db=db,
         project=project,
         query=request.message,
         chunks=chunks,
         history=history,
+        context=packed.text,
     )
 
-    # Generate follow-up suggestions
-    followups = await generate_followups(
-        db=db,
-        query=request.message,
-        response=response_content,
-        chunks=chunks,
-    )
+    # Support scores and follow-up suggestions, unless deferred
+    deferred = project.enrichment_mode == EnrichmentMode.deferred
+    followups = None
+    if not deferred:
+        vectors = await load_chunk_embeddings(db, project_id, [c.chunk_id for c in chunks])
+        followups = await enrich_response(
+            request.message, response_content, chunks, citations, llm_config, vectors
+        )
 
-    provider_name, _ = await get_llm_config(db)
-    context = format_context_for_llm(chunks)
     system_prompt = get_system_prompt(project.role_mode.value)
-    user_prompt = f"""Based on the following documents:
-
-{context}
-
-Question: {request.message}"""
-    debug_info = DebugInfo(
-        retrieved_chunks=[
-            RetrievedChunkInfo(
-                document_name=c.document_name,
-                page_number=c.page_number,
-                section=c.section,
-                content=c.content[:500],
-                score=c.score,
-                retrieval_relevance=c.retrieval_relevance,
-                answer_support=c.answer_support,
-                retrieval_rank=c.retrieval_rank,
-                cited_in_answer=c.cited_in_answer,
-            )
-            for c in chunks
-        ],
-        execution_time_ms=(time.time() - start_time) * 1000,
-        llm_model=provider_name,
-        system_prompt=system_prompt,
-        user_prompt=user_prompt,
+    user_prompt = build_prompt_messages(system_prompt, [], packed.text, request.message)[-1]["content"]
+    debug_info = build_debug_info(
+        chunks, start_time, provider_name, system_prompt, user_prompt, retrieval_timings, packed
     )
 
     # Save assistant message
@@ -553,9 +608,22 @@ Question: {request.message}"""
         citations=[c.model_dump(mode='json') for c in citations],
         suggested_followups=followups,
         debug_info=debug_info.model_dump(mode='json'),
+        usage=usage,
     )
     db.add(assistant_message)
     await db.commit()
+    run_in_background(update_summary(conversation.id, llm_config))
+    if deferred:
+        enrich_in_background(
+            assistant_message.id,
+            project_id,
+            request.message,
+            response_content,
+            chunks,
+            citations,
+            llm_config,
+            debug_info,
+        )
 
     return ChatResponse(
         conversation_id=conversation.id,
@@ -566,6 +634,7 @@ Question: {request.message}"""
             citations=citations,
             suggested_followups=followups,
             debug_info=debug_info,
+            usage=usage,
             created_at=assistant_message.created_at,
         ),
     )
@@ -611,16 +680,94 @@ async def chat_stream(
         content=request.message,
     )
     db.add(user_message)
+    document_ids = await resolve_search_scope(db, project_id, request)
     await db.commit()
 
-    return EventSourceResponse(
-        stream_response(
-            db=db,
-            project=project,
-            conversation=conversation,
-            query=request.message,
-        )
+    # Generated in the background so the answer survives a dropped connection
+    generation = generations.start(uuid.uuid4(), project_id)
+    run_in_background(
+        run_generation(generation, project, conversation, request.message, document_ids)
+    )
+    return EventSourceResponse(follow_generation(generation))
+
+
+@router.get("/messages/{message_id}/stream")
+async def resume_stream(
+    project_id: uuid.UUID,
+    message_id: uuid.UUID,
+    last_event_id: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Reconnect to a streaming answer, resuming after the Last-Event-ID event."""
+    generation = generations.get(project_id, message_id)
+    if generation is not None:
+        after = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+        return EventSourceResponse(follow_generation(generation, after))
+
+    # Event log expired; the stored message is the whole answer
+    result = await db.execute(
+        select(Message)
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .where(Message.id == message_id, Conversation.project_id == project_id)
     )
+    message = result.scalar_one_or_none()
+    if not message:
+        # Every generation ends with a stored message, so this id is unknown
+        raise HTTPException(status_code=404, detail="Message not found")
+
+    async def stored_answer():
+        yield dumps({
+            "type": "complete",
+            "message_id": str(message.id),
+            "conversation_id": str(message.conversation_id),
+            "content": message.content,
+            "status": message.status.value,
+            "citations": message.citations,
+            "suggested_followups": message.suggested_followups,
+            "debug_info": message.debug_info,
+        })
+
+    return EventSourceResponse(stored_answer())
+
+
+@router.post("/messages/{message_id}/cancel", status_code=202)
+async def cancel_generation(
+    project_id: uuid.UUID,
+    message_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+):
+    """Stop a streaming answer by the message id from its `start` event."""
+    await generations.cancel(db, project_id, message_id)
+    await db.commit()
+
+    return {"status": "cancelling"}
+
+
+async def follow_generation(
+    generation: generations.Generation,
+    after: int = -1,
+) -> AsyncGenerator[dict, None]:
+    """SSE events of a generation, numbered by their index in its log."""
+    async for index, event in generation.follow(after):
+        yield {"id": str(index), "data": event}
+
+
+async def run_generation(
+    generation: generations.Generation,
+    project: Project,
+    conversation: Conversation,
+    query: str,
+    document_ids: list[uuid.UUID] | None,
+) -> None:
+    """Write stream_response's events to the generation log, with its own session."""
+    try:
+        async with AsyncSessionLocal() as db:
+            async for event in stream_response(
+                db, project, conversation, query, generation, document_ids
+            ):
+                generation.append(event)
+    finally:
+        generations.finish(generation.message_id)
 
 
 async def stream_response(
@@ -628,118 +775,187 @@ async def stream_response(
     project: Project,
     conversation: Conversation,
     query: str,
+    generation: generations.Generation,
+    document_ids: list[uuid.UUID] | None = None,
 ) -> AsyncGenerator[str, None]:
     """Stream the response tokens."""
+    message_id = generation.message_id
+    parts: list[str] = []
+    citation_parser: CitationParser | None = None
+    saved = False
     try:
+        yield dumps({
+            "type": "start",
+            "message_id": str(message_id),
+            "conversation_id": str(conversation.id),
+        })
         start_time = time.time()
 
         # Retrieve relevant chunks
-        chunks = await hybrid_search(db, query, project.id)
-
-        # Build context
-        context = format_context_for_llm(chunks)
+        retrieval_timings = RetrievalTimings()
+        chunks = await conversation_search(
+            db,
+            query,
+            project.id,
+            conversation.id,
+            document_ids=document_ids,
+            timings=retrieval_timings,
+        )
 
         # Build conversation history
-        history = await get_conversation_history(db, conversation.id)
+        history = await load_memory(db, conversation.id)
 
         # Get LLM provider from DB settings (with env var fallback)
-        provider_name, api_key = await get_llm_config(db)
+        llm_config = await get_llm_config(db)
+        provider_name, api_key = llm_config
         provider = get_llm_provider(provider_name, api_key=api_key)
 
+        # Build context within the provider's token budget
+        packed = pack_context(chunks, provider_context_budget(provider_name, provider))
+        chunks = packed.chunks
+        context = packed.text
+
         # Build messages and capture prompts for debug
         system_prompt = get_system_prompt(project.role_mode.value)
-        messages = [
-            {"role": "system", "content": system_prompt},
-        ]
-
-        # Add history
-        for msg in history[-10:]:  # Last 10 messages for context
-            messages.append({"role": msg.role.value, "content": msg.content})
-
-        # Add context and query
-        user_prompt = f"""Based on the following documents:
-
-{context}
-
-Question: {query}"""
-        messages.append({
-            "role": "user",
-            "content": user_prompt
-        })
-
-        # Stream response
-        full_response = ""
-        async for token in provider.generate_stream(messages):
-            full_response += token
-            yield json.dumps({"type": "token", "content": token})
-
-        # Parse citations from response
-        citations = extract_citations_from_response(full_response, chunks)
-        await annotate_chunks_with_support(chunks, full_response, citations)
-
-        # Generate follow-ups
-        followups = await generate_followups(db, query, full_response, chunks)
+        messages = build_prompt_messages(system_prompt, history, context, query)
+        user_prompt = messages[-1]["content"]
+
+        # Stream response in coalesced frames, emitting each citation as its
+        # marker completes
+        citation_parser = CitationParser(chunks)
+        tokens = provider.generate_stream(messages)
+        async for frame in coalesce_tokens(tokens, cancelled=generation.cancelled):
+            parts.append(frame)
+            yield dumps({"type": "token", "content": frame})
+            for citation in citation_parser.feed(frame):
+                yield dumps({"type": "citation", "citation": citation.model_dump(mode='json')})
+        full_response = "".join(parts)
+
+        if generation.cancelled.is_set():
+            # Cancelled or abandoned: keep the partial answer, skip enrichment
+            db.add(interrupted_message(message_id, conversation.id, parts, citation_parser))
+            await db.commit()
+            saved = True
+            yield dumps({"type": "interrupted", "message_id": str(message_id)})
+            return
+
+        citations = citation_parser.citations
+        mark_cited_chunks(chunks, citations)
+        citations_json = [c.model_dump(mode='json') for c in citations]
+
+        mode = project.enrichment_mode
+        followups = None
+        if mode == EnrichmentMode.inline:
+            vectors = await load_chunk_embeddings(db, project.id, [c.chunk_id for c in chunks])
+            followups = await enrich_response(
+                query, full_response, chunks, citations, llm_config, vectors
+            )
+        else:
+            yield dumps({"type": "citations", "citations": citations_json})
 
         # Build debug info
-        execution_time_ms = (time.time() - start_time) * 1000
-        debug_info = DebugInfo(
-            retrieved_chunks=[
-                RetrievedChunkInfo(
-                    document_name=c.document_name,
-                    page_number=c.page_number,
-                    section=c.section,
-                    content=c.content[:500],  # Truncate for UI
-                    score=c.score,
-                    retrieval_relevance=c.retrieval_relevance,
-                    answer_support=c.answer_support,
-                    retrieval_rank=c.retrieval_rank,
-                    cited_in_answer=c.cited_in_answer,
-                )
-                for c in chunks
-            ],
-            execution_time_ms=execution_time_ms,
-            llm_model=provider.model_name if hasattr(provider, 'model_name') else provider_name,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
+        debug_info = build_debug_info(
+            chunks,
+            start_time,
+            provider.model_name if hasattr(provider, 'model_name') else provider_name,
+            system_prompt,
+            user_prompt,
+            retrieval_timings,
+            packed,
         )
 
-        # Save assistant message
+        # Save assistant message; streamed/deferred enrichments patch it later
         assistant_message = Message(
+            id=message_id,
             conversation_id=conversation.id,
             role=MessageRole.assistant,
             content=full_response,
-            citations=[c.model_dump(mode='json') for c in citations],
+            citations=citations_json,
             suggested_followups=followups,
             debug_info=debug_info.model_dump(mode='json'),
+            usage=provider.last_usage,
         )
         db.add(assistant_message)
         await db.commit()
+        saved = True
         await db.refresh(assistant_message)
+        run_in_background(update_summary(conversation.id, llm_config))
 
         # Send final message with metadata
-        yield json.dumps({
+        yield dumps({
             "type": "complete",
             "message_id": str(assistant_message.id),
             "conversation_id": str(conversation.id),
-            "citations": [c.model_dump(mode='json') for c in citations],
+            "citations": citations_json,
             "suggested_followups": followups,
             "debug_info": debug_info.model_dump(mode='json'),
+            "usage": assistant_message.usage,
         })
+
+        if mode == EnrichmentMode.deferred:
+            enrich_in_background(
+                assistant_message.id,
+                project.id,
+                query,
+                full_response,
+                chunks,
+                citations,
+                llm_config,
+                debug_info,
+            )
+        elif mode == EnrichmentMode.streamed:
+            vectors = await load_chunk_embeddings(db, project.id, [c.chunk_id for c in chunks])
+            async for event in stream_enrichments(
+                db,
+                assistant_message,
+                query,
+                full_response,
+                chunks,
+                citations,
+                llm_config,
+                debug_info,
+                vectors,
+            ):
+                yield event
+    except asyncio.CancelledError:
+        # Server shutting down. Nothing more can be awaited in this task, so
+        # the partial answer is saved from a fresh session.
+        if not saved and parts:
+            message = interrupted_message(message_id, conversation.id, parts, citation_parser)
+            run_in_background(_save_message(message))
+        raise
     except Exception as e:
-        yield json.dumps({"type": "error", "content": str(e)})
+        if not saved:
+            # Stored so a reconnecting client learns the outcome once the log expires
+            try:
+                await db.rollback()
+                db.add(
+                    interrupted_message(
+                        message_id, conversation.id, parts, citation_parser, MessageStatus.errored
+                    )
+                )
+                await db.commit()
+            except Exception:
+                pass  # The error event below still reaches followers of the log
+        yield dumps({"type": "error", "content": str(e)})
 
 
-async def get_conversation_history(
-    db: AsyncSession,
+def interrupted_message(
+    message_id: uuid.UUID,
     conversation_id: uuid.UUID,
-) -> list[Message]:
-    """Get conversation history."""
-    result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at)
+    parts: list[str],
+    citation_parser: CitationParser | None,
+    status: MessageStatus = MessageStatus.interrupted,
+) -> Message:
+    citations = citation_parser.citations if citation_parser else []
+    return Message(
+        id=message_id,
+        conversation_id=conversation_id,
+        role=MessageRole.assistant,
+        content="".join(parts),
+        status=status,
+        citations=[c.model_dump(mode='json') for c in citations],
     )
-    return list(result.scalars().all())
 
 
 async def generate_response(
@@ -747,43 +963,60 @@ async def generate_response(
     project: Project,
     query: str,
     chunks: list[RetrievedChunk],
-    history: list[Message],
-) -> tuple[str, list[Citation]]:
-    """Generate a response using the LLM."""
+    history: list[dict],
+    context: str | None = None,
+) -> tuple[str, list[Citation], dict | None]:
+    """
+    Generate a response using the LLM; context defaults to all of chunks.
+    Returns the answer, its citations and the provider's token usage.
+    """
     # Build context
-    context = format_context_for_llm(chunks)
+    if context is None:
+        context = format_context_for_llm(chunks)
 
     # Get LLM provider from DB settings (with env var fallback)
     provider_name, api_key = await get_llm_config(db)
     provider = get_llm_provider(provider_name, api_key=api_key)
 
     # Build messages
-    messages = [
-        {"role": "system", "content": get_system_prompt(project.role_mode.value)},
-    ]
-
-    # Add history
-    for msg in history[-10:]:
-        messages.append({"role": msg.role.value, "content": msg.content})
-
-    # Add context and query
-    messages.append({
-        "role": "user",
-        "content": f"""Based on the following documents:
-
-{context}
-
-Question: {query}"""
-    })
+    messages = build_prompt_messages(
+        get_system_prompt(project.role_mode.value), history, context, query
+    )
 
     # Generate response
     response = await provider.generate(messages)
 
     # Extract citations
     citations = extract_citations_from_response(response.content, chunks)
-    await annotate_chunks_with_support(chunks, response.content, citations)
+    mark_cited_chunks(chunks, citations)
 
-    return response.content, citations
+    return response.content, citations, response.usage
+
+
+def build_prompt_messages(
+    system_prompt: str,
+    history: list[dict],
+    context: str,
+    query: str,
+) -> list[dict]:
+    """
+    Messages ordered from most to least stable, so provider prompt caches
+    reuse the longest prefix: the role's system prompt, the conversation
+    summary and recent messages (append-only between turns), and last this
+    turn's retrieved documents and question.
+    """
+    return [
+        {"role": "system", "content": system_prompt},
+        *history,
+        {
+            "role": "user",
+            "content": f"""Based on the following documents:
+
+{context}
+
+Question: {query}""",
+        },
+    ]
 
 
 def extract_citations_from_response(
@@ -791,86 +1024,36 @@ def extract_citations_from_response(
     chunks: list[RetrievedChunk],
 ) -> list[Citation]:
     """Extract citations from the response based on referenced chunks."""
-    citations = []
-    seen = set()
-
-    for chunk in chunks:
-        # Check if document is mentioned in response using strict format
-        # Pattern: [Document: <name>, ...]
-        pattern = re.compile(rf"\[Document: {re.escape(chunk.document_name)}.*\]")
-        if pattern.search(response):
-            key = (chunk.document_id, chunk.page_number)
-            if key not in seen:
-                citations.append(
-                    Citation(
-                        document_id=chunk.document_id,
-                        document_name=chunk.document_name,
-                        page=chunk.page_number,
-                        section=chunk.section,
-                    )
-                )
-                seen.add(key)
-
-    return citations
-
+    return extract_citations(response, chunks)
 
-def _cosine_similarity(a: list[float], b: list[float]) -> float:
-    """Compute cosine similarity for two equal-length vectors."""
-    if not a or not b or len(a) != len(b):
-        return 0.0
-    dot = sum(x * y for x, y in zip(a, b))
-    norm_a = math.sqrt(sum(x * x for x in a))
-    norm_b = math.sqrt(sum(y * y for y in b))
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot / (norm_a * norm_b)
 
-
-def _lexical_support_score(response: str, content: str) -> float:
-    """Fallback overlap score when embedding-based support cannot be computed."""
-    response_tokens = set(re.findall(r"\b[a-z0-9]{3,}\b", response.lower()))
-    content_tokens = set(re.findall(r"\b[a-z0-9]{3,}\b", content.lower()))
-    if not response_tokens or not content_tokens:
-        return 0.0
-    overlap = len(response_tokens & content_tokens)
-    return min(1.0, overlap / len(response_tokens))
+def mark_cited_chunks(chunks: list[RetrievedChunk], citations: list[Citation]) -> None:
+    citation_keys = {(c.document_id, c.page) for c in citations}
+    for chunk in chunks:
+        chunk.cited_in_answer = (chunk.document_id, chunk.page_number) in citation_keys
 
 
 async def annotate_chunks_with_support(
     chunks: list[RetrievedChunk],
     response: str,
     citations: list[Citation],
+    vectors: dict[uuid.UUID, np.ndarray] | None = None,
 ) -> None:
-    """Populate chunk-level support signals for Inspect UI."""
-    citation_keys = {(c.document_id, c.page) for c in citations}
-    for chunk in chunks:
-        chunk.cited_in_answer = (chunk.document_id, chunk.page_number) in citation_keys
-
-    if not chunks:
-        return
-
-    chunk_texts = [chunk.content[:1500] for chunk in chunks]
-    try:
-        vectors = await generate_embeddings([response[:3000], *chunk_texts])
-        response_vec = vectors[0]
-        chunk_vecs = vectors[1:]
-        for chunk, chunk_vec in zip(chunks, chunk_vecs):
-            support = _cosine_similarity(response_vec, chunk_vec)
-            chunk.answer_support = max(0.0, min(1.0, support))
-    except Exception:
-        for chunk in chunks:
-            chunk.answer_support = _lexical_support_score(response, chunk.content)
+    """Populate chunk-level support signals for Inspect UI; vectors are stored chunk embeddings."""
+    mark_cited_chunks(chunks, citations)
+    await score_answer_support(chunks, response, vectors)
 
 
 async def generate_followups(
-    db: AsyncSession,
+    db: AsyncSession | None,
     query: str,
     response: str,
     chunks: list[RetrievedChunk],
+    llm_config: tuple[str, str | None] | None = None,
 ) -> list[str]:
-    """Generate follow-up question suggestions."""
+    """Generate follow-up question suggestions; db is unused when llm_config is given."""
     try:
-        provider_name, api_key = await get_llm_config(db)
+        provider_name, api_key = llm_config or await get_llm_config(db)
         provider = get_llm_provider(provider_name, api_key=api_key)
 
         messages = [
@@ -900,3 +1083,146 @@ Generate 3 follow-up questions."""
         "Are there any important dates or deadlines mentioned?",
         "What additional documents would help clarify this?",
     ]
+
+
+async def enrich_response(
+    query: str,
+    response: str,
+    chunks: list[RetrievedChunk],
+    citations: list[Citation],
+    llm_config: tuple[str, str | None],
+    vectors: dict[uuid.UUID, np.ndarray] | None = None,
+) -> list[str]:
+    """Score answer support and generate follow-ups concurrently; returns the follow-ups."""
+    # Support scoring is best-effort; if it fails, chunks keep answer_support
+    # None and debug_info shows them unscored
+    _, followups = await asyncio.gather(
+        annotate_chunks_with_support(chunks, response, citations, vectors),
+        generate_followups(None, query, response, chunks, llm_config=llm_config),
+        return_exceptions=True,
+    )
+    if isinstance(followups, BaseException):
+        raise followups
+    return followups
+
+
+def with_support(debug_info: DebugInfo, chunks: list[RetrievedChunk]) -> DebugInfo:
+    """debug_info with retrieved chunks re-read after support scoring."""
+    return debug_info.model_copy(update={"retrieved_chunks": [_chunk_info(c) for c in chunks]})
+
+
+async def stream_enrichments(
+    db: AsyncSession,
+    message: Message,
+    query: str,
+    response: str,
+    chunks: list[RetrievedChunk],
+    citations: list[Citation],
+    llm_config: tuple[str, str | None],
+    debug_info: DebugInfo,
+    vectors: dict[uuid.UUID, np.ndarray] | None = None,
+) -> AsyncGenerator[str, None]:
+    """
+    Run support scoring and follow-up generation concurrently, yielding a
+    `support` or `followups` event and patching the stored message as each
+    finishes.
+    """
+    support = asyncio.create_task(
+        annotate_chunks_with_support(chunks, response, citations, vectors)
+    )
+    followups = asyncio.create_task(
+        generate_followups(None, query, response, chunks, llm_config=llm_config)
+    )
+    pending = {support, followups}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Support scoring is best-effort; a failure just sends no event
+            if support in done and support.exception() is None:
+                debug_json = with_support(debug_info, chunks).model_dump(mode='json')
+                message.debug_info = debug_json
+                await db.commit()
+                yield dumps({
+                    "type": "support",
+                    "message_id": str(message.id),
+                    "debug_info": debug_json,
+                })
+            if followups in done:
+                message.suggested_followups = followups.result()
+                await db.commit()
+                yield dumps({
+                    "type": "followups",
+                    "message_id": str(message.id),
+                    "suggested_followups": message.suggested_followups,
+                })
+    finally:
+        # Client went away mid-enrichment
+        for task in pending:
+            task.cancel()
+
+
+# Generations, deferred enrichments and saves in flight; held so they
+# aren't garbage collected
+_background_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(coroutine) -> None:
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def enrich_in_background(
+    message_id: uuid.UUID,
+    project_id: uuid.UUID,
+    query: str,
+    response: str,
+    chunks: list[RetrievedChunk],
+    citations: list[Citation],
+    llm_config: tuple[str, str | None],
+    debug_info: DebugInfo,
+) -> None:
+    """Run enrich_response after the request finishes and patch the stored message."""
+    run_in_background(
+        _enrich_message(
+            message_id, project_id, query, response, chunks, citations, llm_config, debug_info
+        )
+    )
+
+
+async def _save_message(message: Message) -> None:
+    async with AsyncSessionLocal() as db:
+        db.add(message)
+        await db.commit()
+
+
+async def _enrich_message(
+    message_id: uuid.UUID,
+    project_id: uuid.UUID,
+    query: str,
+    response: str,
+    chunks: list[RetrievedChunk],
+    citations: list[Citation],
+    llm_config: tuple[str, str | None],
+    debug_info: DebugInfo,
+) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            try:
+                vectors = await load_chunk_embeddings(
+                    db, project_id, [c.chunk_id for c in chunks]
+                )
+            except Exception:
+                await db.rollback()
+                vectors = None  # support scoring embeds the chunks itself
+            followups = await enrich_response(
+                query, response, chunks, citations, llm_config, vectors
+            )
+            message = await db.get(Message, message_id)
+            if message is None:
+                return  # Conversation purged meanwhile
+            message.suggested_followups = followups
+            message.debug_info = with_support(debug_info, chunks).model_dump(mode="json")
+            await db.commit()
+    except Exception:
+        pass  # The answer is already saved; it just keeps no enrichments
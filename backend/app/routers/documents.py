@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 import os
 from pathlib import Path
@@ -18,11 +19,40 @@ from app.schemas.document import (
     DocumentTagResponse,
 )
 from app.services.ingestion import IngestionPipeline
+from app.services import bm25_index, vector_index
+from app.services.retrieval_cache import bump_corpus_version
 from app.config import get_settings
 
 settings = get_settings()
 router = APIRouter(prefix="/projects/{project_id}/documents", tags=["documents"])
 
+
+async def _drop_indexes(project_id: uuid.UUID) -> None:
+    await asyncio.to_thread(vector_index.drop_project_index, project_id)
+    await asyncio.to_thread(bm25_index.drop_project_index, project_id)
+
+
+async def _remove_from_indexes_and_commit(
+    db: AsyncSession, project_id: uuid.UUID, document_id: uuid.UUID
+) -> None:
+    """
+    Bump the corpus version and update the project's indexes before
+    committing, so no search sees the new version with a stale index.
+    """
+    corpus_version = await bump_corpus_version(db, project_id)
+    await asyncio.to_thread(
+        vector_index.remove_documents, project_id, [document_id], corpus_version
+    )
+    await asyncio.to_thread(
+        bm25_index.remove_documents, project_id, [document_id], corpus_version
+    )
+    try:
+        await db.commit()
+    except Exception:
+        # The indexes are ahead of the rolled-back corpus; rebuild on next search
+        await _drop_indexes(project_id)
+        raise
+
 MIME_TYPE_MAP = {
     FileType.pdf: "application/pdf",
     FileType.docx: "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
@@ -299,7 +329,8 @@ async def delete_document(
         if os.path.exists(document.file_path):
             os.remove(document.file_path)
         await db.delete(document)
-    await db.commit()
+    # Soft-deleted documents are excluded from retrieval too
+    await _remove_from_indexes_and_commit(db, project_id, document_id)
 
 
 @router.post("/{document_id}/restore")
@@ -322,6 +353,9 @@ async def restore_document(
         raise HTTPException(status_code=404, detail="Document not found")
 
     document.deleted_at = None
+    await bump_corpus_version(db, project_id)
+    # Its chunks were dropped from the in-process indexes; rebuild on next search
+    await _drop_indexes(project_id)
     await db.commit()
     return {"status": "restored"}
 
@@ -349,7 +383,7 @@ async def purge_document(
         os.remove(document.file_path)
 
     await db.delete(document)
-    await db.commit()
+    await _remove_from_indexes_and_commit(db, project_id, document_id)
     return {"status": "purged"}
 
 
@@ -430,13 +464,19 @@ async def reprocess_document(
     await db.commit()
     await db.refresh(document)
 
-    # Delete existing chunks (will be recreated)
+    # Delete existing chunks and summaries (will be recreated)
     from app.models.chunk import Chunk
+    from app.models.document_summary import DocumentSummary
 
     await db.execute(
-        Chunk.__table__.delete().where(Chunk.document_id == document_id)
+        Chunk.__table__.delete().where(
+            Chunk.project_id == project_id, Chunk.document_id == document_id
+        )
+    )
+    await db.execute(
+        DocumentSummary.__table__.delete().where(DocumentSummary.document_id == document_id)
     )
-    await db.commit()
+    await _remove_from_indexes_and_commit(db, project_id, document_id)
 
     # Start background ingestion
     background_tasks.add_task(run_ingestion, document.id)
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, File, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,9 +13,15 @@ from app.schemas.project import (
     ProjectUpdate,
     ProjectResponse,
     ProjectListResponse,
+    ProjectOverviewResponse,
+    DocumentOverview,
+    SectionOverview,
 )
 from app.schemas.trash import TrashListResponse, TrashItem
 from app.services.export import export_project, import_project
+from app.services.partitions import create_chunk_partition, drop_chunk_partition
+from app.services import bm25_index, vector_index
+from app.services.summaries import project_overview
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -46,6 +53,7 @@ async def list_projects(db: AsyncSession = Depends(get_db)):
                 name=project.name,
                 description=project.description,
                 role_mode=project.role_mode,
+                enrichment_mode=project.enrichment_mode,
                 document_count=doc_count,
                 created_at=project.created_at,
                 updated_at=project.updated_at,
@@ -65,8 +73,11 @@ async def create_project(
         name=data.name,
         description=data.description,
         role_mode=data.role_mode,
+        enrichment_mode=data.enrichment_mode,
     )
     db.add(project)
+    await db.flush()
+    await create_chunk_partition(db, project.id)
     await db.commit()
     await db.refresh(project)
 
@@ -75,6 +86,7 @@ async def create_project(
         name=project.name,
         description=project.description,
         role_mode=project.role_mode,
+        enrichment_mode=project.enrichment_mode,
         document_count=0,
         created_at=project.created_at,
         updated_at=project.updated_at,
@@ -111,12 +123,50 @@ async def get_project(
         name=project.name,
         description=project.description,
         role_mode=project.role_mode,
+        enrichment_mode=project.enrichment_mode,
         document_count=doc_count,
         created_at=project.created_at,
         updated_at=project.updated_at,
     )
 
 
+@router.get("/{project_id}/overview", response_model=ProjectOverviewResponse)
+async def get_project_overview(
+    project_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+):
+    """Summarize what is in a project from the stored document summaries."""
+    result = await db.execute(select(Project.id).where(Project.id == project_id))
+    if not result.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    documents: dict[uuid.UUID, DocumentOverview] = {}
+    for row in await project_overview(db, project_id):
+        document = documents.get(row.document_id)
+        if document is None:
+            document = documents[row.document_id] = DocumentOverview(
+                document_id=row.document_id,
+                filename=row.filename,
+                category=row.category,
+                page_count=row.page_count,
+            )
+        if row.content is None:
+            continue
+        if row.section is None:
+            document.summary = row.content
+        else:
+            document.sections.append(
+                SectionOverview(
+                    section=row.section,
+                    summary=row.content,
+                    page_start=row.page_start,
+                    page_end=row.page_end,
+                )
+            )
+
+    return ProjectOverviewResponse(project_id=project_id, documents=list(documents.values()))
+
+
 @router.patch("/{project_id}", response_model=ProjectResponse)
 async def update_project(
     project_id: uuid.UUID,
@@ -136,6 +186,8 @@ async def update_project(
         project.description = data.description
     if data.role_mode is not None:
         project.role_mode = data.role_mode
+    if data.enrichment_mode is not None:
+        project.enrichment_mode = data.enrichment_mode
 
     await db.commit()
     await db.refresh(project)
@@ -154,6 +206,7 @@ async def update_project(
         name=project.name,
         description=project.description,
         role_mode=project.role_mode,
+        enrichment_mode=project.enrichment_mode,
         document_count=doc_count,
         created_at=project.created_at,
         updated_at=project.updated_at,
@@ -172,8 +225,12 @@ async def delete_project(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    # Drop the chunks partition first so the ORM cascade has no chunk rows to delete
+    await drop_chunk_partition(project_id)
     await db.delete(project)
     await db.commit()
+    await asyncio.to_thread(vector_index.drop_project_index, project_id)
+    await asyncio.to_thread(bm25_index.drop_project_index, project_id)
 
 
 @router.get("/{project_id}/export")
@@ -1,35 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from cryptography.fernet import Fernet
-
 from app.database import get_db
 from app.models.settings import Settings as SettingsModel
 from app.schemas.settings import SettingsUpdate, SettingsResponse, LLMSettings, EmbeddingSettings
 from app.services.llm import get_llm_provider
+from app.services import runtime_settings
+# decrypt_value is re-exported for callers that import it from here
+from app.services.runtime_settings import encrypt_value, decrypt_value  # noqa: F401
 from app.config import get_settings
 
 config = get_settings()
 router = APIRouter(prefix="/settings", tags=["settings"])
 
-# Generate encryption key from secret
-import hashlib
-import base64
-
-def get_encryption_key():
-    key = hashlib.sha256(config.secret_key.encode()).digest()
-    return base64.urlsafe_b64encode(key)
-
-
-def encrypt_value(value: str) -> bytes:
-    f = Fernet(get_encryption_key())
-    return f.encrypt(value.encode())
-
-
-def decrypt_value(encrypted: bytes) -> str:
-    f = Fernet(get_encryption_key())
-    return f.decrypt(encrypted).decode()
-
 
 @router.get("", response_model=SettingsResponse)
 async def get_settings_endpoint(db: AsyncSession = Depends(get_db)):
@@ -112,7 +95,9 @@ async def update_settings(
     if data.theme:
         await upsert_setting(db, "theme", {"v": data.theme})
 
+    await runtime_settings.notify_changed(db)
     await db.commit()
+    runtime_settings.invalidate()
 
     return {"status": "updated"}
 
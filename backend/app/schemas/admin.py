@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    bytes: int
+    max_bytes: int | None = None
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class SharedCacheStats(BaseModel):
+    enabled: bool
+    hits: int
+    misses: int
+    errors: int
+
+
+class CacheStatsResponse(BaseModel):
+    retrieval: CacheStats
+    query_embeddings: CacheStats
+    query_embeddings_shared: SharedCacheStats
+    chunk_texts: CacheStats
@@ -2,7 +2,8 @@ from datetime import datetime
 from uuid import UUID
 from pydantic import BaseModel, Field
 
-from app.models.message import MessageRole
+from app.models.document import DocumentCategory
+from app.models.message import MessageRole, MessageStatus
 
 
 class Citation(BaseModel):
@@ -25,6 +26,21 @@ class RetrievedChunkInfo(BaseModel):
     cited_in_answer: bool = False
 
 
+class RetrievalTimingsInfo(BaseModel):
+    """Per-leg hybrid retrieval timings in milliseconds."""
+    embedding_ms: float | None = None
+    coarse_ms: float | None = None
+    vector_ms: float | None = None
+    keyword_ms: float | None = None
+    fused_ms: float | None = None
+    content_ms: float | None = None
+    total_ms: float | None = None
+    fusion: str | None = None
+    degraded: str | None = None
+    cache_hit: bool = False
+    working_set_hit: bool = False
+
+
 class DebugInfo(BaseModel):
     """Debug information exposing the RAG pipeline for transparency."""
     retrieved_chunks: list[RetrievedChunkInfo]
@@ -32,11 +48,21 @@ class DebugInfo(BaseModel):
     llm_model: str
     system_prompt: str
     user_prompt: str
+    retrieval_timings: RetrievalTimingsInfo | None = None
+    context_token_budget: int | None = None
+    context_tokens_used: int | None = None
+    dropped_chunks: list[RetrievedChunkInfo] = []
 
 
 class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1)
     conversation_id: UUID | None = None
+    # Retrieval scope: documents matching all given filters
+    document_ids: list[UUID] | None = None
+    categories: list[DocumentCategory] | None = None
+    tags: list[str] | None = None
+    # Scope by categories inferred from the question; defaults to settings.retrieval_auto_scope
+    auto_scope: bool | None = None
 
 
 class EditAndRegenerateRequest(BaseModel):
@@ -54,9 +80,12 @@ class MessageResponse(BaseModel):
     id: UUID
     role: MessageRole
     content: str
+    status: MessageStatus = MessageStatus.complete
     citations: list[Citation] | None = None
     suggested_followups: list[str] | None = None
     debug_info: DebugInfo | None = None
+    # Provider token counts, including cached_prompt_tokens when reported
+    usage: dict | None = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
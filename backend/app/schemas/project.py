@@ -3,19 +3,22 @@ from uuid import UUID
 
 from pydantic import BaseModel, Field
 
-from app.models.project import RoleMode
+from app.models.document import DocumentCategory
+from app.models.project import RoleMode, EnrichmentMode
 
 
 class ProjectCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
     description: str | None = None
     role_mode: RoleMode = RoleMode.plain
+    enrichment_mode: EnrichmentMode = EnrichmentMode.streamed
 
 
 class ProjectUpdate(BaseModel):
     name: str | None = Field(None, min_length=1, max_length=255)
     description: str | None = None
     role_mode: RoleMode | None = None
+    enrichment_mode: EnrichmentMode | None = None
 
 
 class ProjectResponse(BaseModel):
@@ -23,6 +26,7 @@ class ProjectResponse(BaseModel):
     name: str
     description: str | None
     role_mode: RoleMode
+    enrichment_mode: EnrichmentMode = EnrichmentMode.streamed
     document_count: int = 0
     created_at: datetime
     updated_at: datetime
@@ -33,3 +37,24 @@ class ProjectResponse(BaseModel):
 class ProjectListResponse(BaseModel):
     projects: list[ProjectResponse]
     total: int
+
+
+class SectionOverview(BaseModel):
+    section: str
+    summary: str
+    page_start: int | None = None
+    page_end: int | None = None
+
+
+class DocumentOverview(BaseModel):
+    document_id: UUID
+    filename: str
+    category: DocumentCategory
+    page_count: int | None = None
+    summary: str | None = None  # None until the document is (re)ingested
+    sections: list[SectionOverview] = []
+
+
+class ProjectOverviewResponse(BaseModel):
+    project_id: UUID
+    documents: list[DocumentOverview]
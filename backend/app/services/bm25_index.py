@@ -0,0 +1,374 @@
+"""
+In-process BM25 lexical index per project.
+
+Postings are stored as flat arrays sorted by term (term_ids, doc_idx, tfs) with
+per-term offsets, so scoring a query is one array slice per query term. Added
+chunks are appended and the postings re-sorted; removed documents are
+tombstoned and compacted away once they make up a quarter of the index.
+Indexes persist as bm25.npz next to the vector index and load lazily.
+Updates hold the vector index's project lock and carry the corpus version,
+so an index that missed a change is dropped and rebuilt like the vector one.
+"""
+import asyncio
+import math
+import re
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.models.chunk import Chunk
+from app.models.document import Document
+from app.services.cache import LRUCache
+from app.services.retrieval_cache import get_corpus_version
+from app.services.vector_index import index_dir, project_lock, uuid_array
+from app.config import get_settings
+
+settings = get_settings()
+
+INDEX_FILE = "bm25.npz"
+COMPACT_RATIO = 0.25
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with what which who whom how when where why any all "
+    "there their they them than then so if not no do does did can could should "
+    "would may might shall been being into about over under per".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens without stopwords; trailing plural 's' is folded."""
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _empty(dtype) -> np.ndarray:
+    return np.zeros(0, dtype=dtype)
+
+
+@dataclass
+class ProjectBM25Index:
+    project_id: uuid.UUID
+    vocabulary: dict[str, int] = field(default_factory=dict)
+    chunk_ids: np.ndarray = field(default_factory=lambda: _empty("V16"))
+    document_ids: np.ndarray = field(default_factory=lambda: _empty("V16"))
+    doc_lengths: np.ndarray = field(default_factory=lambda: _empty(np.int32))
+    alive: np.ndarray = field(default_factory=lambda: _empty(bool))
+    # Postings sorted by term: term_ids[offsets[t]:offsets[t + 1]] == t
+    term_ids: np.ndarray = field(default_factory=lambda: _empty(np.int32))
+    doc_idx: np.ndarray = field(default_factory=lambda: _empty(np.int32))
+    tfs: np.ndarray = field(default_factory=lambda: _empty(np.int32))
+    offsets: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+    corpus_version: int = 0  # projects.corpus_version the contents reflect
+    mtime: float = 0.0
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def add(
+        self,
+        chunk_ids: list[uuid.UUID],
+        document_ids: list[uuid.UUID],
+        texts: list[str],
+    ) -> None:
+        start = len(self.chunk_ids)
+        new_terms, new_docs, new_tfs, lengths = [], [], [], []
+
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = self.vocabulary.setdefault(term, len(self.vocabulary))
+                new_terms.append(term_id)
+                new_docs.append(start + i)
+                new_tfs.append(tf)
+
+        self.chunk_ids = np.concatenate([self.chunk_ids, uuid_array(chunk_ids)])
+        self.document_ids = np.concatenate([self.document_ids, uuid_array(document_ids)])
+        self.doc_lengths = np.concatenate([self.doc_lengths, np.array(lengths, dtype=np.int32)])
+        self.alive = np.concatenate([self.alive, np.ones(len(texts), dtype=bool)])
+        self._set_postings(
+            np.concatenate([self.term_ids, np.array(new_terms, dtype=np.int32)]),
+            np.concatenate([self.doc_idx, np.array(new_docs, dtype=np.int32)]),
+            np.concatenate([self.tfs, np.array(new_tfs, dtype=np.int32)]),
+        )
+
+    def remove_documents(self, document_ids: list[uuid.UUID]) -> bool:
+        """Tombstone a document's chunks. Returns whether anything changed."""
+        removed = self.alive & np.isin(self.document_ids, uuid_array(document_ids))
+        if not removed.any():
+            return False
+        self.alive &= ~removed
+        if (~self.alive).sum() > COMPACT_RATIO * len(self.alive):
+            self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Drop tombstoned chunks and renumber the survivors."""
+        remap = np.cumsum(self.alive, dtype=np.int32) - 1
+        keep = self.alive[self.doc_idx]
+
+        self.chunk_ids = self.chunk_ids[self.alive]
+        self.document_ids = self.document_ids[self.alive]
+        self.doc_lengths = self.doc_lengths[self.alive]
+        self._set_postings(self.term_ids[keep], remap[self.doc_idx[keep]], self.tfs[keep])
+        self.alive = np.ones(len(self.chunk_ids), dtype=bool)
+
+    def _set_postings(self, term_ids: np.ndarray, doc_idx: np.ndarray, tfs: np.ndarray) -> None:
+        order = np.argsort(term_ids, kind="stable")
+        self.term_ids = term_ids[order]
+        self.doc_idx = doc_idx[order]
+        self.tfs = tfs[order]
+        counts = np.bincount(self.term_ids, minlength=len(self.vocabulary))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        document_ids: list[uuid.UUID] | None = None,
+    ) -> list[tuple[uuid.UUID, uuid.UUID, float]]:
+        """BM25-ranked (chunk_id, document_id, score) for chunks matching any query term."""
+        n_docs = len(self)
+        if n_docs == 0:
+            return []
+
+        k1, b = settings.bm25_k1, settings.bm25_b
+        avg_length = max(float(self.doc_lengths[self.alive].mean()), 1.0)
+        scores = np.zeros(len(self.chunk_ids), dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            postings = slice(self.offsets[term_id], self.offsets[term_id + 1])
+            docs = self.doc_idx[postings]
+            live = self.alive[docs]
+            docs, tfs = docs[live], self.tfs[postings][live].astype(np.float32)
+            if len(docs) == 0:
+                continue
+
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1 - b + b * self.doc_lengths[docs] / avg_length)
+            scores[docs] += idf * tfs * (k1 + 1) / (tfs + norm)
+
+        mask = scores > 0
+        if document_ids:
+            mask &= np.isin(self.document_ids, uuid_array(document_ids))
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return []
+
+        k = min(top_k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            (
+                uuid.UUID(bytes=bytes(self.chunk_ids[i])),
+                uuid.UUID(bytes=bytes(self.document_ids[i])),
+                float(scores[i]),
+            )
+            for i in top
+        ]
+
+    def save(self) -> None:
+        directory = index_dir(self.project_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self.vocabulary, key=self.vocabulary.__getitem__)
+        tmp = directory / f"{INDEX_FILE}.tmp.npz"
+        np.savez(
+            tmp,
+            vocabulary=np.array(terms, dtype=str),
+            chunk_ids=self.chunk_ids,
+            document_ids=self.document_ids,
+            doc_lengths=self.doc_lengths,
+            alive=self.alive,
+            term_ids=self.term_ids,
+            doc_idx=self.doc_idx,
+            tfs=self.tfs,
+            offsets=self.offsets,
+            corpus_version=self.corpus_version,
+        )
+        tmp.replace(directory / INDEX_FILE)
+        self.mtime = (directory / INDEX_FILE).stat().st_mtime
+
+    @classmethod
+    def load(cls, project_id: uuid.UUID) -> "ProjectBM25Index | None":
+        path = index_dir(project_id) / INDEX_FILE
+        if not path.exists():
+            return None
+        mtime = path.stat().st_mtime
+        with np.load(path) as data:
+            return cls(
+                project_id=project_id,
+                vocabulary={term: i for i, term in enumerate(data["vocabulary"].tolist())},
+                chunk_ids=data["chunk_ids"],
+                document_ids=data["document_ids"],
+                doc_lengths=data["doc_lengths"],
+                alive=data["alive"],
+                term_ids=data["term_ids"],
+                doc_idx=data["doc_idx"],
+                tfs=data["tfs"],
+                offsets=data["offsets"],
+                # Files written before versioning are rebuilt
+                corpus_version=int(data["corpus_version"]) if "corpus_version" in data else -1,
+                mtime=mtime,
+            )
+
+
+# Loaded indexes by project id; reloaded when the file on disk changes
+_loaded = LRUCache(maxsize=32)
+_locks: dict[uuid.UUID, asyncio.Lock] = {}
+
+
+def _disk_mtime(project_id: uuid.UUID) -> float | None:
+    try:
+        return (index_dir(project_id) / INDEX_FILE).stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+async def get_project_index(db: AsyncSession, project_id: uuid.UUID) -> ProjectBM25Index:
+    """Return the project's index, loading it from disk or building it on first use."""
+    corpus_version = await get_corpus_version(db, project_id)
+    async with _locks.setdefault(project_id, asyncio.Lock()):
+        index = _loaded.get(project_id)
+        if (
+            index is not None
+            and index.mtime == _disk_mtime(project_id)
+            and index.corpus_version >= corpus_version
+        ):
+            return index
+
+        index = await asyncio.to_thread(ProjectBM25Index.load, project_id)
+        if index is None or index.corpus_version < corpus_version:
+            index = await build_index(db, project_id)
+        _loaded.set(project_id, index)
+        return index
+
+
+async def build_index(db: AsyncSession, project_id: uuid.UUID) -> ProjectBM25Index:
+    """Build and persist a project's index from the chunks table."""
+    # Read before the rows, so the rows include at least this version
+    corpus_version = await get_corpus_version(db, project_id)
+    result = await db.execute(
+        select(Chunk.id, Chunk.document_id, Chunk.content, Chunk.section, Document.filename)
+        .join(Document, Chunk.document_id == Document.id)
+        .where(Chunk.project_id == project_id, Document.deleted_at.is_(None))
+    )
+    rows = result.all()
+
+    index = ProjectBM25Index(project_id=project_id, corpus_version=corpus_version)
+    await asyncio.to_thread(
+        index.add,
+        [row.id for row in rows],
+        [row.document_id for row in rows],
+        [_chunk_text(row.content, row.section, row.filename) for row in rows],
+    )
+    return await asyncio.to_thread(_save_unless_newer, index)
+
+
+def _save_unless_newer(index: ProjectBM25Index) -> ProjectBM25Index:
+    """Persist a freshly built index unless another writer saved a newer one meanwhile."""
+    with project_lock(index.project_id):
+        current = ProjectBM25Index.load(index.project_id)
+        if current is not None and current.corpus_version >= index.corpus_version:
+            return current
+        index.save()
+        return index
+
+
+def _update(
+    project_id: uuid.UUID,
+    corpus_version: int,
+    change: Callable[[ProjectBM25Index], None],
+) -> bool:
+    """
+    Apply the change made by corpus_version to a persisted index, under the
+    project lock. An index that missed an earlier version is dropped instead.
+    Returns whether an index was updated.
+    """
+    with project_lock(project_id):
+        index = ProjectBM25Index.load(project_id)
+        if index is None:
+            return False
+        if index.corpus_version != corpus_version - 1:
+            (index_dir(project_id) / INDEX_FILE).unlink(missing_ok=True)
+            return False
+        change(index)
+        index.corpus_version = corpus_version
+        index.save()
+        return True
+
+
+def _chunk_text(content: str, section: str | None, filename: str) -> str:
+    # Section titles and filenames are searchable, as in the Postgres tsvectors
+    return " ".join(part for part in (filename, section, content) if part)
+
+
+async def search_project_index(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    query: str,
+    top_k: int,
+    document_ids: list[uuid.UUID] | None = None,
+) -> list[tuple[uuid.UUID, uuid.UUID, float]]:
+    index = await get_project_index(db, project_id)
+    return await asyncio.to_thread(index.search, query, top_k, document_ids)
+
+
+async def index_document_chunks(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    chunk_ids: list[uuid.UUID],
+    document_id: uuid.UUID,
+    filename: str,
+    chunks: list[tuple[str, str | None]],
+    corpus_version: int,
+) -> None:
+    """
+    Add a newly ingested document's (content, section) chunks to the project
+    index. With the bm25 lexical backend active, a project without an index
+    gets one built here rather than on its first search.
+    """
+    texts = [_chunk_text(content, section, filename) for content, section in chunks]
+    updated = await asyncio.to_thread(
+        _update,
+        project_id,
+        corpus_version,
+        lambda index: index.add(chunk_ids, [document_id] * len(chunk_ids), texts),
+    )
+    if not updated and settings.lexical_backend == "bm25":
+        # Built from the table, which already holds these chunks
+        await build_index(db, project_id)
+
+
+def remove_documents(
+    project_id: uuid.UUID,
+    document_ids: list[uuid.UUID],
+    corpus_version: int,
+) -> None:
+    """Tombstone a document's chunks in a persisted index."""
+    _update(project_id, corpus_version, lambda index: index.remove_documents(document_ids))
+
+
+def drop_project_index(project_id: uuid.UUID) -> None:
+    _loaded.pop(project_id)
+    if not index_dir(project_id).exists():
+        return
+    with project_lock(project_id):
+        path: Path = index_dir(project_id) / INDEX_FILE
+        path.unlink(missing_ok=True)
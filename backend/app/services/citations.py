@@ -0,0 +1,101 @@
+"""
+Single-pass citation parsing for streamed answers.
+
+The LLM cites sources as `[Document: <name>, Page N, Section: ...]`, the same
+header format_context_for_llm writes. CitationParser is fed the answer as it
+streams, recognizes each complete marker once (markers split across tokens
+are buffered), and resolves it against the retrieved chunks through a dict
+keyed on document name and page, so the cost is linear in the answer.
+"""
+import re
+
+from app.schemas.chat import Citation
+from app.services.retrieval import RetrievedChunk
+
+MARKER = "[Document:"
+# Longer "markers" are prose that happens to contain the prefix
+MAX_MARKER_CHARS = 500
+
+MARKER_BODY = re.compile(
+    r"\s*(?P<name>.+?)"
+    r"(?:,\s*(?:Page|Pages|p\.)\s*(?P<page>\d+)[^,]*)?"
+    r"(?:,\s*Section:\s*(?P<section>.*))?\s*",
+    re.IGNORECASE,
+)
+
+
+class CitationParser:
+    """Incrementally extract citations from an answer, in order of first mention."""
+
+    def __init__(self, chunks: list[RetrievedChunk]):
+        self.citations: list[Citation] = []
+        self._pending = ""
+        self._seen: set[tuple] = set()
+        # name -> page -> first chunk on that page, pages in retrieval order
+        self._pages: dict[str, dict[int | None, RetrievedChunk]] = {}
+        for chunk in chunks:
+            pages = self._pages.setdefault(chunk.document_name.lower(), {})
+            pages.setdefault(chunk.page_number, chunk)
+
+    def feed(self, text: str) -> list[Citation]:
+        """Consume the next piece of the answer; returns citations it completed."""
+        self._pending += text
+        found = []
+        while True:
+            start = self._pending.find(MARKER)
+            if start == -1:
+                self._pending = self._pending[len(self._pending) - _partial_marker(self._pending):]
+                return found
+
+            end = self._pending.find("]", start)
+            if end == -1:
+                self._pending = self._pending[start:]
+                if len(self._pending) <= MAX_MARKER_CHARS:
+                    return found
+                self._pending = self._pending[len(MARKER):]
+                continue
+
+            found.extend(self._resolve(self._pending[start + len(MARKER):end]))
+            self._pending = self._pending[end + 1:]
+
+    def _resolve(self, body: str) -> list[Citation]:
+        match = MARKER_BODY.fullmatch(body)
+        if match is None:
+            return []
+        pages = self._pages.get(match["name"].strip().lower())
+        if pages is None:
+            return []
+
+        page = int(match["page"]) if match["page"] else None
+        # A page that wasn't retrieved cites every retrieved page of the document
+        chunks = [pages[page]] if page in pages else list(pages.values())
+
+        found = []
+        for chunk in chunks:
+            key = (chunk.document_id, chunk.page_number)
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            citation = Citation(
+                document_id=chunk.document_id,
+                document_name=chunk.document_name,
+                page=chunk.page_number,
+                section=chunk.section,
+            )
+            self.citations.append(citation)
+            found.append(citation)
+        return found
+
+
+def _partial_marker(text: str) -> int:
+    """Length of the longest suffix of text that could begin a marker."""
+    for size in range(min(len(MARKER) - 1, len(text)), 0, -1):
+        if text.endswith(MARKER[:size]):
+            return size
+    return 0
+
+
+def extract_citations(response: str, chunks: list[RetrievedChunk]) -> list[Citation]:
+    parser = CitationParser(chunks)
+    parser.feed(response)
+    return parser.citations
@@ -0,0 +1,203 @@
+"""
+Token-budgeted packing of retrieved chunks into the LLM prompt.
+
+Consecutive chunks of the same page share settings.chunk_overlap tokens of
+text, and boilerplate pages repeat verbatim across a document. The packer
+drops exact duplicates, optionally reorders candidates for diversity (MMR),
+admits chunks in rank order while their novel text fits the budget, and
+merges admitted neighbours into one block so overlapping text appears once.
+"""
+import hashlib
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import tiktoken
+
+from app.services.retrieval import RetrievedChunk
+from app.config import get_settings
+
+settings = get_settings()
+
+# Longest run of words checked when looking for overlap between neighbours
+MAX_OVERLAP_WORDS = 600
+
+
+@lru_cache
+def _encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoding().encode(text))
+
+
+def context_token_budget(provider: str, model: str | None = None) -> int:
+    """Budget for a provider/model from settings.context_token_budgets."""
+    budgets = settings.context_token_budgets
+    if model and f"{provider}:{model}" in budgets:
+        return budgets[f"{provider}:{model}"]
+    return budgets.get(provider, settings.context_token_budget)
+
+
+@dataclass
+class PackedContext:
+    text: str
+    chunks: list[RetrievedChunk]  # admitted chunks, in rank order
+    token_budget: int
+    tokens_used: int
+    dropped_chunks: list[RetrievedChunk] = field(default_factory=list)
+
+
+def pack_context(chunks: list[RetrievedChunk], token_budget: int) -> PackedContext:
+    """Fit the highest-ranked chunks into token_budget with overlap removed."""
+    candidates, dropped = _dedupe(chunks)
+    if settings.context_mmr_lambda is not None:
+        candidates = _mmr_order(candidates, settings.context_mmr_lambda)
+
+    words = {chunk.chunk_id: chunk.content.split() for chunk in candidates}
+    admitted: dict[tuple, RetrievedChunk] = {}
+    selected: list[RetrievedChunk] = []
+    tokens_used = 0
+
+    for chunk in candidates:
+        novel = words[chunk.chunk_id]
+        neighbours = _neighbour_keys(chunk)
+        if neighbours:
+            before = admitted.get(neighbours[0])
+            after = admitted.get(neighbours[1])
+            start = _overlap(words[before.chunk_id], novel) if before else 0
+            end = len(novel) - _overlap(novel, words[after.chunk_id]) if after else len(novel)
+            novel = novel[start:max(start, end)]
+
+        # Header and separator cost a few tokens per block
+        cost = count_tokens(" ".join(novel)) + 20
+        if tokens_used + cost > token_budget:
+            dropped.append(chunk)
+            continue
+
+        tokens_used += cost
+        selected.append(chunk)
+        if neighbours:
+            admitted[_chunk_key(chunk)] = chunk
+
+    return PackedContext(
+        text=_render(selected, words),
+        chunks=selected,
+        token_budget=token_budget,
+        tokens_used=tokens_used,
+        dropped_chunks=dropped,
+    )
+
+
+def _chunk_key(chunk: RetrievedChunk) -> tuple:
+    return (chunk.document_id, chunk.page_number, chunk.chunk_index)
+
+
+def _neighbour_keys(chunk: RetrievedChunk) -> tuple[tuple, tuple] | None:
+    if chunk.chunk_index is None:
+        return None
+    return (
+        (chunk.document_id, chunk.page_number, chunk.chunk_index - 1),
+        (chunk.document_id, chunk.page_number, chunk.chunk_index + 1),
+    )
+
+
+def _dedupe(chunks: list[RetrievedChunk]) -> tuple[list[RetrievedChunk], list[RetrievedChunk]]:
+    seen = set()
+    unique, duplicates = [], []
+    for chunk in chunks:
+        digest = hashlib.sha1(" ".join(chunk.content.lower().split()).encode()).digest()
+        if digest in seen:
+            duplicates.append(chunk)
+        else:
+            seen.add(digest)
+            unique.append(chunk)
+    return unique, duplicates
+
+
+def _overlap(first: list[str], second: list[str]) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second`."""
+    if not first or not second:
+        return 0
+    limit = min(len(first), len(second), MAX_OVERLAP_WORDS)
+    # Earliest matching start in first's tail is the longest overlap
+    for start in range(len(first) - limit, len(first)):
+        if first[start] == second[0] and first[start:] == second[: len(first) - start]:
+            return len(first) - start
+    return 0
+
+
+def _mmr_order(chunks: list[RetrievedChunk], lambda_: float) -> list[RetrievedChunk]:
+    """
+    Maximal marginal relevance over retrieval rank, with word-set Jaccard
+    similarity standing in for embeddings (retrieved chunks carry none).
+    """
+    if len(chunks) < 3:
+        return chunks
+    terms = [set(re.findall(r"[a-z0-9]{3,}", c.content.lower())) for c in chunks]
+    relevance = [1 - i / len(chunks) for i in range(len(chunks))]
+
+    remaining = list(range(len(chunks)))
+    order: list[int] = []
+    while remaining:
+        def marginal(i: int) -> float:
+            redundancy = max(
+                (
+                    len(terms[i] & terms[j]) / max(len(terms[i] | terms[j]), 1)
+                    for j in order
+                ),
+                default=0.0,
+            )
+            return lambda_ * relevance[i] - (1 - lambda_) * redundancy
+
+        best = max(remaining, key=marginal)
+        order.append(best)
+        remaining.remove(best)
+    return [chunks[i] for i in order]
+
+
+def _render(selected: list[RetrievedChunk], words: dict) -> str:
+    """Format blocks like format_context_for_llm, merging consecutive chunks."""
+    # (first chunk, merged words or None while the block is a single chunk)
+    blocks: list[tuple[RetrievedChunk, list[str] | None]] = []
+    block_of: dict[tuple, int] = {}
+
+    ordered = sorted(
+        enumerate(selected),
+        key=lambda item: (
+            str(item[1].document_id),
+            item[1].page_number or 0,
+            item[1].chunk_index if item[1].chunk_index is not None else -1,
+            item[0],
+        ),
+    )
+    first_rank: list[int] = []
+    for rank, chunk in ordered:
+        previous = _neighbour_keys(chunk)
+        if previous and previous[0] in block_of:
+            index = block_of[previous[0]]
+            head, text = blocks[index]
+            text = text or list(words[head.chunk_id])
+            text.extend(words[chunk.chunk_id][_overlap(text, words[chunk.chunk_id]):])
+            blocks[index] = (head, text)
+            first_rank[index] = min(first_rank[index], rank)
+        else:
+            index = len(blocks)
+            blocks.append((chunk, None))
+            first_rank.append(rank)
+        if chunk.chunk_index is not None:
+            block_of[_chunk_key(chunk)] = index
+
+    parts = []
+    for index in sorted(range(len(blocks)), key=first_rank.__getitem__):
+        head, text = blocks[index]
+        header = f"[Document: {head.document_name}"
+        if head.page_number:
+            header += f", Page {head.page_number}"
+        if head.section:
+            header += f", Section: {head.section}"
+        header += "]"
+        parts.append(f"{header}\n{' '.join(text) if text else head.content}")
+
+    return "\n\n---\n\n".join(parts)
@@ -0,0 +1,161 @@
+"""
+Rolling summaries of long conversations.
+
+A turn's prompt carries the conversation summary followed by the newest
+messages it doesn't cover, together within settings.history_token_budget.
+After each turn, update_summary folds messages older than the newest
+settings.conversation_summary_keep_messages into the summary, at most
+settings.conversation_summary_batch_messages per summarizer call, so earlier
+facts survive while prompt size stays flat as the
+conversation grows. conversations.summary_message_count is how many of the
+oldest messages the summary covers.
+"""
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
+
+from app.database import AsyncSessionLocal
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.prompts.system import get_conversation_summary_prompt
+from app.services.context_packer import count_tokens
+from app.services.history import load_history
+from app.services.llm import get_llm_provider
+from app.config import get_settings
+
+settings = get_settings()
+
+# Longest stretch of one message passed to the summarizer
+MAX_MESSAGE_CHARS = 2000
+
+
+def summary_message(summary: str) -> dict:
+    return {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+
+
+async def load_memory(db: AsyncSession, conversation_id: uuid.UUID) -> list[dict]:
+    """Prompt messages standing in for the conversation so far, oldest first."""
+    row = (
+        await db.execute(
+            select(Conversation.summary, Conversation.summary_message_count).where(
+                Conversation.id == conversation_id
+            )
+        )
+    ).one_or_none()
+    if row is None or not row.summary:
+        return await load_history(db, conversation_id)
+
+    memory = summary_message(row.summary)
+    unsummarized = await _message_count(db, conversation_id) - row.summary_message_count
+    if unsummarized <= 0:
+        return [memory]
+    history = await load_history(
+        db,
+        conversation_id,
+        token_budget=max(settings.history_token_budget - count_tokens(memory["content"]), 0),
+        max_messages=min(unsummarized, settings.history_max_messages),
+    )
+    return [memory] + history
+
+
+def messages_to_fold(total: int, covered: int) -> int:
+    """How many messages after the covered ones to fold next; 0 until a full batch is due."""
+    foldable = total - settings.conversation_summary_keep_messages - covered
+    batch = settings.conversation_summary_batch_messages
+    return batch if foldable >= batch else 0
+
+
+def format_transcript(messages: list[tuple[str, str]]) -> str:
+    return "\n\n".join(
+        f"{role.title()}: {content[:MAX_MESSAGE_CHARS]}" for role, content in messages
+    )
+
+
+async def update_summary(
+    conversation_id: uuid.UUID,
+    llm_config: tuple[str, str | None],
+) -> None:
+    """Fold messages that have left the recent window into the summary."""
+    try:
+        async with AsyncSessionLocal() as db:
+            # A lagging summary (a branched or imported conversation) catches
+            # up one bounded batch at a time
+            while await _fold(db, conversation_id, llm_config):
+                pass
+    except Exception:
+        pass  # The previous summary stays; the next turn retries the batch
+
+
+async def _fold(
+    db: AsyncSession,
+    conversation_id: uuid.UUID,
+    llm_config: tuple[str, str | None],
+) -> bool:
+    """Fold the next batch into the summary; returns whether one was folded."""
+    row = (
+        await db.execute(
+            select(Conversation.summary, Conversation.summary_message_count).where(
+                Conversation.id == conversation_id
+            )
+        )
+    ).one_or_none()
+    if row is None:
+        return False
+    covered = row.summary_message_count
+    count = messages_to_fold(await _message_count(db, conversation_id), covered)
+    if count == 0:
+        return False
+
+    # Copied branch messages share a created_at; the id keeps the order stable
+    result = await db.execute(
+        select(Message.role, Message.content)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at, Message.id)
+        .offset(covered)
+        .limit(count)
+    )
+    transcript = format_transcript([(m.role.value, m.content) for m in result])
+
+    provider_name, api_key = llm_config
+    provider = get_llm_provider(provider_name, api_key=api_key)
+    response = await provider.generate(
+        [
+            {"role": "system", "content": get_conversation_summary_prompt()},
+            {
+                "role": "user",
+                "content": f"""Current summary:
+{row.summary or "(none yet)"}
+
+New messages:
+{transcript}""",
+            },
+        ],
+        temperature=0.2,
+        max_tokens=settings.conversation_summary_max_tokens,
+    )
+    if not response.content.strip():
+        return False
+
+    # Conditional on the count so concurrent turns can't fold a batch twice;
+    # updated_at is kept so summarizing doesn't reorder the conversation list
+    result = await db.execute(
+        update(Conversation)
+        .where(
+            Conversation.id == conversation_id,
+            Conversation.summary_message_count == covered,
+        )
+        .values(
+            summary=response.content.strip(),
+            summary_message_count=covered + count,
+            updated_at=Conversation.updated_at,
+        )
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def _message_count(db: AsyncSession, conversation_id: uuid.UUID) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(Message).where(Message.conversation_id == conversation_id)
+    )
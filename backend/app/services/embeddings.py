@@ -1,19 +1,46 @@
+import asyncio
+import base64
+import hashlib
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
 from openai import AsyncOpenAI
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
 
+from app.database import AsyncSessionLocal
+from app.models.query_embedding import QueryEmbedding
+from app.services.cache import LRUCache
 from app.config import get_settings
 
 settings = get_settings()
 
+# Query embeddings by (model, normalized query). Repeated diligence questions
+# skip the embeddings API entirely on a hit.
+query_embedding_cache = LRUCache(
+    maxsize=settings.query_embedding_cache_size,
+    ttl=settings.query_embedding_cache_ttl_seconds,
+)
+query_embedding_db_stats = {"hits": 0, "misses": 0, "errors": 0}
+# Shared-tier writes in flight; held so they aren't garbage collected
+_pending_stores: set[asyncio.Task] = set()
+
 
 async def generate_embeddings(
     texts: list[str],
     model: str | None = None,
-) -> list[list[float]]:
+) -> np.ndarray:
     """
     Generate embeddings for a list of texts using OpenAI's embedding model.
+
+    Returns a float32 array of shape (len(texts), embedding_dimension); empty
+    texts get a zero row.
     """
+    embeddings = np.zeros((len(texts), settings.embedding_dimension), dtype=np.float32)
     if not texts:
-        return []
+        return embeddings
 
     model = model or settings.default_embedding_model
 
@@ -23,7 +50,6 @@ async def generate_embeddings(
     client = AsyncOpenAI(api_key=settings.openai_api_key)
 
     # Batch process for efficiency (OpenAI allows up to 2048 items per batch)
-    all_embeddings = []
     batch_size = 100
 
     for i in range(0, len(texts), batch_size):
@@ -34,35 +60,135 @@ async def generate_embeddings(
         non_empty_texts = [batch[j] for j in non_empty_indices]
 
         if non_empty_texts:
+            # base64 payloads decode straight into float32 without parsing JSON floats
             response = await client.embeddings.create(
                 model=model,
                 input=non_empty_texts,
+                encoding_format="base64",
             )
 
             # Map embeddings back to original positions
-            embedding_map = {
-                non_empty_indices[k]: response.data[k].embedding
-                for k in range(len(non_empty_texts))
-            }
-
-            # Fill in batch results
-            batch_embeddings = []
-            for j in range(len(batch)):
-                if j in embedding_map:
-                    batch_embeddings.append(embedding_map[j])
-                else:
-                    # Empty text gets zero vector
-                    batch_embeddings.append([0.0] * settings.embedding_dimension)
-
-            all_embeddings.extend(batch_embeddings)
-        else:
-            # All texts were empty
-            all_embeddings.extend([[0.0] * settings.embedding_dimension] * len(batch))
+            for k, j in enumerate(non_empty_indices):
+                embeddings[i + j] = np.frombuffer(
+                    base64.b64decode(response.data[k].embedding), dtype=np.float32
+                )
 
-    return all_embeddings
+    return embeddings
 
 
-async def generate_single_embedding(text: str, model: str | None = None) -> list[float]:
+async def generate_single_embedding(text: str, model: str | None = None) -> np.ndarray:
     """Generate embedding for a single text."""
     embeddings = await generate_embeddings([text], model)
-    return embeddings[0] if embeddings else [0.0] * settings.embedding_dimension
+    return embeddings[0]
+
+
+def normalize_query(text: str) -> str:
+    """Case, whitespace and trailing punctuation don't change a query's cache key."""
+    return re.sub(r"\s+", " ", text).strip().rstrip("?.!").strip().lower()
+
+
+async def get_query_embedding(query: str, model: str | None = None) -> np.ndarray:
+    """
+    Embedding for a search query, served from the in-process LRU, then the
+    shared Postgres tier (settings.query_embedding_cache_db), then the API.
+    """
+    model = model or settings.default_embedding_model
+    normalized = normalize_query(query)
+    key = (model, normalized)
+
+    embedding = query_embedding_cache.get(key)
+    if embedding is not None:
+        return embedding
+
+    db_key = hashlib.sha256(f"{model}\n{normalized}".encode()).hexdigest()
+    if settings.query_embedding_cache_db:
+        embedding = await _load_shared_embedding(db_key)
+        if embedding is not None:
+            query_embedding_cache.set(key, embedding)
+            return embedding
+
+    # Normalization only picks the cache key; the model sees the query as asked
+    embedding = await generate_single_embedding(query, model)
+    # Cached arrays are shared between callers
+    embedding.setflags(write=False)
+    query_embedding_cache.set(key, embedding)
+
+    if settings.query_embedding_cache_db:
+        # Written off the request path
+        task = asyncio.create_task(_store_shared_embedding(db_key, model, embedding))
+        _pending_stores.add(task)
+        task.add_done_callback(_pending_stores.discard)
+
+    return embedding
+
+
+async def _load_shared_embedding(key: str) -> np.ndarray | None:
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.query_embedding_cache_ttl_seconds
+    )
+    try:
+        async with AsyncSessionLocal() as db:
+            embedding = await db.scalar(
+                select(QueryEmbedding.embedding).where(
+                    QueryEmbedding.key == key, QueryEmbedding.created_at > cutoff
+                )
+            )
+    except Exception:
+        # The shared tier is an optimization; fall through to the API
+        query_embedding_db_stats["errors"] += 1
+        return None
+
+    if embedding is None:
+        query_embedding_db_stats["misses"] += 1
+        return None
+
+    query_embedding_db_stats["hits"] += 1
+    embedding.setflags(write=False)
+    return embedding
+
+
+async def _store_shared_embedding(key: str, model: str, embedding: np.ndarray) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                insert(QueryEmbedding)
+                .values(key=key, model=model, embedding=embedding)
+                .on_conflict_do_update(
+                    index_elements=[QueryEmbedding.key],
+                    set_={"embedding": embedding, "created_at": datetime.now(timezone.utc)},
+                )
+            )
+            # Expired rows are pruned by an occasional writer rather than a job
+            if random.random() < 0.01:
+                cutoff = datetime.now(timezone.utc) - timedelta(
+                    seconds=settings.query_embedding_cache_ttl_seconds
+                )
+                await db.execute(delete(QueryEmbedding).where(QueryEmbedding.created_at < cutoff))
+            await db.commit()
+    except Exception:
+        query_embedding_db_stats["errors"] += 1
+
+
+def query_embedding_cache_stats() -> dict:
+    """Hit/miss counters for both tiers of the query-embedding cache."""
+    stats = query_embedding_cache.stats()
+    stats["shared"] = {"enabled": settings.query_embedding_cache_db, **query_embedding_db_stats}
+    return stats
+
+
+def cosine_similarities(vector: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine similarity of one vector against each row of a matrix (0 for zero rows)."""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    vector = np.asarray(vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+    dots = matrix @ vector
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+
+def cosine_similarity_matrix(rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row of one matrix against every row of another."""
+    rows = np.atleast_2d(np.asarray(rows, dtype=np.float32))
+    columns = np.atleast_2d(np.asarray(columns, dtype=np.float32))
+    norms = np.outer(np.linalg.norm(rows, axis=1), np.linalg.norm(columns, axis=1))
+    dots = rows @ columns.T
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
@@ -13,6 +13,7 @@ from app.models.project import Project
 from app.models.document import Document, DocumentTag
 from app.models.conversation import Conversation
 from app.models.message import Message
+from app.services.partitions import create_chunk_partition
 from app.config import get_settings
 
 settings = get_settings()
@@ -77,6 +78,7 @@ async def export_project(
             "name": project.name,
             "description": project.description,
             "role_mode": project.role_mode.value,
+            "enrichment_mode": project.enrichment_mode.value,
             "created_at": project.created_at.isoformat(),
             "updated_at": project.updated_at.isoformat(),
         }
@@ -166,9 +168,11 @@ async def import_project(
             name=new_name or f"{project_data['name']} (Imported)",
             description=project_data.get("description"),
             role_mode=project_data.get("role_mode", "plain"),
+            enrichment_mode=project_data.get("enrichment_mode", "streamed"),
         )
         db.add(project)
         await db.flush()
+        await create_chunk_partition(db, project.id)
 
         # Map old IDs to new IDs
         doc_id_map = {}
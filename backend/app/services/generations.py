@@ -0,0 +1,135 @@
+"""
+Registry of in-flight streamed answers, keyed by assistant message id.
+
+Each answer is generated by a background task that appends its SSE events to
+the generation's log; HTTP streams only follow the log. A client that drops
+reconnects with Last-Event-ID (the index of the last event it saw) and
+resumes from the next one. The log stays in memory for
+settings.stream_resume_ttl_seconds after the answer is saved.
+
+Logs live only in the worker generating the answer, so multi-worker
+deployments must route a conversation's requests to one worker (sticky
+sessions) for resumes to continue mid-answer. Every generation ends with a
+stored message (complete, interrupted or errored), which any worker serves
+whole once the log is gone.
+
+A generation stops when POST /projects/{id}/messages/{message_id}/cancel is
+called, possibly from another tab served by another worker, which is why
+cancellation also goes out over LISTEN/NOTIFY, or when no client has followed
+it for settings.stream_detach_grace_seconds.
+"""
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services import notify
+from app.services.cache import LRUCache
+from app.config import get_settings
+
+settings = get_settings()
+
+CANCEL_CHANNEL = "generation_cancelled"
+
+
+@dataclass
+class Generation:
+    message_id: uuid.UUID
+    project_id: uuid.UUID
+    cancelled: asyncio.Event = field(default_factory=asyncio.Event)
+    events: list[str] = field(default_factory=list)
+    done: bool = False
+    followers: int = 0
+    _changed: asyncio.Event = field(default_factory=asyncio.Event)
+    _detached: asyncio.TimerHandle | None = None
+
+    def append(self, event: str) -> None:
+        self.events.append(event)
+        self._wake()
+
+    def close(self) -> None:
+        self.done = True
+        if self._detached is not None:
+            self._detached.cancel()
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self, after: int = -1) -> AsyncIterator[tuple[int, str]]:
+        """(index, event) for events after index `after`, then live until the answer ends."""
+        self.followers += 1
+        if self._detached is not None:
+            self._detached.cancel()
+            self._detached = None
+        try:
+            index = after + 1
+            while True:
+                while index < len(self.events):
+                    yield index, self.events[index]
+                    index += 1
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            self.followers -= 1
+            if self.followers == 0 and not self.done:
+                self._detached = asyncio.get_running_loop().call_later(
+                    settings.stream_detach_grace_seconds, self._cancel_if_unfollowed
+                )
+
+    def _cancel_if_unfollowed(self) -> None:
+        if self.followers == 0:
+            self.cancelled.set()
+
+
+_active: dict[uuid.UUID, Generation] = {}
+# Logs of saved answers, for clients reconnecting just after the end
+_finished = LRUCache(maxsize=256, ttl=settings.stream_resume_ttl_seconds)
+
+
+def start(message_id: uuid.UUID, project_id: uuid.UUID) -> Generation:
+    generation = Generation(message_id=message_id, project_id=project_id)
+    _active[message_id] = generation
+    return generation
+
+
+def get(project_id: uuid.UUID, message_id: uuid.UUID) -> Generation | None:
+    generation = _active.get(message_id) or _finished.get(message_id)
+    if generation is None or generation.project_id != project_id:
+        return None
+    return generation
+
+
+def finish(message_id: uuid.UUID) -> None:
+    generation = _active.pop(message_id, None)
+    if generation is not None:
+        generation.close()
+        _finished.set(message_id, generation)
+
+
+def cancel_local(project_id: uuid.UUID, message_id: uuid.UUID) -> bool:
+    """Cancel a generation running in this worker. Returns whether one was found."""
+    generation = _active.get(message_id)
+    if generation is None or generation.project_id != project_id:
+        return False
+    generation.cancelled.set()
+    return True
+
+
+async def cancel(db: AsyncSession, project_id: uuid.UUID, message_id: uuid.UUID) -> None:
+    """Cancel a generation in whichever worker runs it; commits with the caller."""
+    if not cancel_local(project_id, message_id):
+        await notify.notify(db, CANCEL_CHANNEL, f"{project_id}:{message_id}")
+
+
+def _on_cancel(payload: str | None) -> None:
+    if payload:  # None only signals a listener reconnect
+        project_id, message_id = payload.split(":")
+        cancel_local(uuid.UUID(project_id), uuid.UUID(message_id))
+
+
+notify.subscribe(CANCEL_CHANNEL, _on_cancel)
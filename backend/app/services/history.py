@@ -0,0 +1,57 @@
+"""
+Conversation history for chat prompts.
+
+Only the role and content of the newest messages are read, newest first
+through ix_messages_conversation_created, and kept while they fit the history
+token budget. Citations and debug payloads are never loaded, and answers
+whose generation failed are left out.
+"""
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.models.message import Message, MessageStatus
+from app.services.context_packer import count_tokens
+from app.config import get_settings
+
+settings = get_settings()
+
+# Role marker and separators cost a few tokens per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+async def load_history(
+    db: AsyncSession,
+    conversation_id: uuid.UUID,
+    token_budget: int | None = None,
+    max_messages: int | None = None,
+) -> list[dict]:
+    """The most recent messages that fit token_budget, oldest first, as prompt messages."""
+    result = await db.execute(
+        select(Message.role, Message.content)
+        .where(
+            Message.conversation_id == conversation_id,
+            Message.status != MessageStatus.errored,
+        )
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(max_messages or settings.history_max_messages)
+    )
+    newest_first = [{"role": row.role.value, "content": row.content} for row in result]
+    return fit_history(
+        newest_first,
+        settings.history_token_budget if token_budget is None else token_budget,
+    )
+
+
+def fit_history(newest_first: list[dict], token_budget: int) -> list[dict]:
+    """Keep the newest messages while they fit; older ones are dropped even if short."""
+    kept = []
+    tokens_used = 0
+    for message in newest_first:
+        tokens_used += count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        if tokens_used > token_budget:
+            break
+        kept.append(message)
+    kept.reverse()
+    return kept
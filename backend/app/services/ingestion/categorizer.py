@@ -110,6 +110,42 @@ def categorize_document(text: str, filename: str = "") -> DocumentCategory:
     return DocumentCategory.other
 
 
+# Question cues pointing at categories whose own patterns a question wouldn't
+# match: cap rates and NOI are also reported in appraisals
+QUERY_CATEGORY_HINTS = {
+    DocumentCategory.appraisal: [
+        r"\bcap\s+rate\b",
+        r"\bNOI\b",
+        r"\bnet\s+operating\s+income\b",
+        r"\bworth\b",
+    ],
+    DocumentCategory.financial: [
+        r"\bexpenses?\b",
+        r"\brevenue\b",
+        r"\bincome\b",
+    ],
+}
+
+
+def classify_query(query: str) -> list[DocumentCategory]:
+    """
+    Categories a question is about, for scoping retrieval. Matches
+    CATEGORY_PATTERNS and QUERY_CATEGORY_HINTS; returns an empty list
+    when nothing matches.
+    """
+    categories = []
+    for category in DocumentCategory:
+        patterns = CATEGORY_PATTERNS.get(category, []) + QUERY_CATEGORY_HINTS.get(category, [])
+        if any(re.search(pattern, query, _query_flags(pattern)) for pattern in patterns):
+            categories.append(category)
+    return categories
+
+
+def _query_flags(pattern: str) -> int:
+    # Acronyms like FAR or ESA only count in capitals; "how far" isn't zoning
+    return 0 if re.fullmatch(r"\\b[A-Z]+\\b", pattern) else re.IGNORECASE
+
+
 def suggest_category_from_filename(filename: str) -> DocumentCategory | None:
     """Suggest category based on filename alone."""
     filename_lower = filename.lower()
@@ -3,6 +3,7 @@ import uuid
 from pathlib import Path
 from typing import Callable
 
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -13,6 +14,9 @@ from app.services.ingestion.chunker import chunk_text
 from app.services.ingestion.categorizer import categorize_document
 from app.services.ingestion.vision import extract_text_from_image
 from app.services.embeddings import generate_embeddings
+from app.services import bm25_index, vector_index
+from app.services.summaries import build_summaries
+from app.services.retrieval_cache import bump_corpus_version
 from app.config import get_settings
 
 settings = get_settings()
@@ -111,8 +115,11 @@ class IngestionPipeline:
             await self.db.commit()
 
             # Store chunks with embeddings
+            stored_chunks = []
             for i, (chunk_data, embedding) in enumerate(zip(all_chunks, embeddings)):
                 chunk = Chunk(
+                    id=uuid.uuid4(),
+                    project_id=document.project_id,
                     document_id=document_id,
                     content=chunk_data.content,
                     page_number=chunk_data.page_number,
@@ -124,11 +131,30 @@ class IngestionPipeline:
                     },
                 )
                 self.db.add(chunk)
+                stored_chunks.append(chunk.id)
+
+            # Summaries for coarse-to-fine retrieval and project overviews
+            for summary in build_summaries(document, all_chunks, embeddings):
+                self.db.add(summary)
 
             # Mark as completed
             document.ingestion_status = IngestionStatus.completed
             document.ingestion_progress = 100
-            await self.db.commit()
+            # Flushed so a BM25 build in this transaction sees the new chunks
+            await self.db.flush()
+            corpus_version = await bump_corpus_version(self.db, document.project_id)
+
+            # Indexes are updated before the bump commits, so no search sees
+            # the new version with a stale index
+            await self._update_vector_index(document, stored_chunks, embeddings, corpus_version)
+            await self._update_bm25_index(document, stored_chunks, all_chunks, corpus_version)
+            try:
+                await self.db.commit()
+            except Exception:
+                # The indexes are ahead of the rolled-back corpus
+                await asyncio.to_thread(vector_index.drop_project_index, document.project_id)
+                await asyncio.to_thread(bm25_index.drop_project_index, document.project_id)
+                raise
 
             if self.progress_callback:
                 self.progress_callback(document_id, 100)
@@ -142,6 +168,48 @@ class IngestionPipeline:
             await self.db.commit()
             return False
 
+    async def _update_vector_index(
+        self,
+        document: Document,
+        chunk_ids: list[uuid.UUID],
+        embeddings: np.ndarray,
+        corpus_version: int,
+    ) -> None:
+        """Append the stored chunks to the project's in-process vector index, if built."""
+        try:
+            await asyncio.to_thread(
+                vector_index.add_chunks,
+                document.project_id,
+                chunk_ids,
+                [document.id] * len(chunk_ids),
+                embeddings,
+                corpus_version,
+            )
+        except Exception:
+            # A stale index is worse than none; it is rebuilt on the next search
+            await asyncio.to_thread(vector_index.drop_project_index, document.project_id)
+
+    async def _update_bm25_index(
+        self,
+        document: Document,
+        chunk_ids: list[uuid.UUID],
+        chunks: list,
+        corpus_version: int,
+    ) -> None:
+        """Index the stored chunks in the project's BM25 index."""
+        try:
+            await bm25_index.index_document_chunks(
+                self.db,
+                document.project_id,
+                chunk_ids,
+                document.id,
+                document.filename,
+                [(c.content, c.section) for c in chunks],
+                corpus_version,
+            )
+        except Exception:
+            await asyncio.to_thread(bm25_index.drop_project_index, document.project_id)
+
     async def ingest_multiple(
         self,
         document_ids: list[uuid.UUID],
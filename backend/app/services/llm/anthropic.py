@@ -7,6 +7,48 @@ from app.config import get_settings
 
 settings = get_settings()
 
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _split_messages(messages: list[dict]) -> tuple[list[dict] | None, list[dict]]:
+    """
+    System blocks and chat messages with prompt-cache breakpoints after the
+    static system prompt, after the last system block (conversation summary)
+    and after the conversation preceding the final message. Each turn then
+    reads everything but its last message from the cache.
+    """
+    system = [
+        {"type": "text", "text": msg["content"]} for msg in messages if msg["role"] == "system"
+    ]
+    chat_messages = [msg for msg in messages if msg["role"] != "system"]
+
+    if system:
+        system[0]["cache_control"] = CACHE_CONTROL
+        system[-1]["cache_control"] = CACHE_CONTROL
+    if len(chat_messages) >= 2 and chat_messages[-2]["content"]:
+        previous = chat_messages[-2]
+        chat_messages[-2] = {
+            "role": previous["role"],
+            "content": [
+                {"type": "text", "text": previous["content"], "cache_control": CACHE_CONTROL}
+            ],
+        }
+    return system or None, chat_messages
+
+
+def _usage(usage) -> dict:
+    # input_tokens excludes cache reads and writes; prompt_tokens counts them
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_creation = getattr(usage, "cache_creation_input_tokens", None) or 0
+    prompt_tokens = usage.input_tokens + cache_read + cache_creation
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": usage.output_tokens,
+        "total_tokens": prompt_tokens + usage.output_tokens,
+        "cached_prompt_tokens": cache_read,
+        "cache_creation_tokens": cache_creation,
+    }
+
 
 class AnthropicProvider(BaseLLMProvider):
     """Anthropic Claude LLM provider."""
@@ -27,14 +69,7 @@ class AnthropicProvider(BaseLLMProvider):
     ) -> LLMResponse:
         model = model or self.default_model
 
-        # Extract system message if present
-        system = None
-        chat_messages = []
-        for msg in messages:
-            if msg["role"] == "system":
-                system = msg["content"]
-            else:
-                chat_messages.append(msg)
+        system, chat_messages = _split_messages(messages)
 
         response = await self.client.messages.create(
             model=model,
@@ -48,11 +83,7 @@ class AnthropicProvider(BaseLLMProvider):
             content=response.content[0].text if response.content else "",
             model=model,
             finish_reason=response.stop_reason,
-            usage={
-                "prompt_tokens": response.usage.input_tokens,
-                "completion_tokens": response.usage.output_tokens,
-                "total_tokens": response.usage.input_tokens + response.usage.output_tokens,
-            },
+            usage=_usage(response.usage),
         )
 
     async def generate_stream(
@@ -64,14 +95,7 @@ class AnthropicProvider(BaseLLMProvider):
     ) -> AsyncGenerator[str, None]:
         model = model or self.default_model
 
-        # Extract system message if present
-        system = None
-        chat_messages = []
-        for msg in messages:
-            if msg["role"] == "system":
-                system = msg["content"]
-            else:
-                chat_messages.append(msg)
+        system, chat_messages = _split_messages(messages)
 
         async with self.client.messages.stream(
             model=model,
@@ -82,6 +106,8 @@ class AnthropicProvider(BaseLLMProvider):
         ) as stream:
             async for text in stream.text_stream:
                 yield text
+            final = await stream.get_final_message()
+            self.last_usage = _usage(final.usage)
 
     def get_available_models(self) -> list[str]:
         return [
@@ -14,6 +14,11 @@ class LLMResponse:
 class BaseLLMProvider(ABC):
     """Base class for LLM providers."""
 
+    # Usage of the last generate_stream call, set when its stream ends. Usage
+    # dicts carry prompt_tokens, completion_tokens and total_tokens, plus
+    # cached_prompt_tokens where the provider caches prompt prefixes.
+    last_usage: dict | None = None
+
     @abstractmethod
     async def generate(
         self,
@@ -8,8 +8,21 @@ from app.config import get_settings
 settings = get_settings()
 
 
+def _usage(usage) -> dict:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "cached_prompt_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0,
+    }
+
+
 class OpenAIProvider(BaseLLMProvider):
-    """OpenAI LLM provider."""
+    """
+    OpenAI LLM provider. OpenAI caches prompt prefixes automatically, so
+    callers keep the stable part of a prompt first.
+    """
 
     def __init__(self, api_key: str | None = None):
         self.api_key = api_key or settings.openai_api_key
@@ -38,11 +51,7 @@ class OpenAIProvider(BaseLLMProvider):
             content=response.choices[0].message.content or "",
             model=model,
             finish_reason=response.choices[0].finish_reason,
-            usage={
-                "prompt_tokens": response.usage.prompt_tokens if response.usage else 0,
-                "completion_tokens": response.usage.completion_tokens if response.usage else 0,
-                "total_tokens": response.usage.total_tokens if response.usage else 0,
-            },
+            usage=_usage(response.usage) if response.usage else None,
         )
 
     async def generate_stream(
@@ -60,10 +69,14 @@ class OpenAIProvider(BaseLLMProvider):
             temperature=temperature,
             max_tokens=max_tokens,
             stream=True,
+            stream_options={"include_usage": True},
         )
 
         async for chunk in stream:
-            if chunk.choices[0].delta.content:
+            # The final chunk has usage and no choices
+            if chunk.usage:
+                self.last_usage = _usage(chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
                 yield chunk.choices[0].delta.content
 
     def get_available_models(self) -> list[str]:
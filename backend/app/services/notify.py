@@ -0,0 +1,77 @@
+"""
+Cross-worker invalidation over Postgres LISTEN/NOTIFY.
+
+Each worker keeps one dedicated asyncpg connection listening on every
+subscribed channel (listen_forever, started from the app lifespan). Senders
+call notify() inside their transaction, so the message goes out only if it
+commits. After every (re)connect subscribers are called with payload None,
+since notifications sent while disconnected were lost.
+"""
+import asyncio
+from typing import Callable
+
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# A dead connection is only noticed when used, so ping it this often
+KEEPALIVE_SECONDS = 30
+RETRY_SECONDS = 5
+
+_subscribers: dict[str, list[Callable[[str | None], None]]] = {}
+
+
+def subscribe(channel: str, callback: Callable[[str | None], None]) -> None:
+    """Call callback(payload) for each notification on channel in this worker."""
+    _subscribers.setdefault(channel, []).append(callback)
+
+
+async def notify(db: AsyncSession, channel: str, payload: str = "") -> None:
+    """Queue a notification; Postgres delivers it when the caller commits."""
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": payload},
+    )
+
+
+def _dispatch(channel: str, payload: str | None) -> None:
+    for callback in _subscribers.get(channel, []):
+        try:
+            callback(payload)
+        except Exception:
+            pass  # One subscriber failing must not starve the others
+
+
+def _on_notification(connection, pid, channel, payload) -> None:
+    _dispatch(channel, payload)
+
+
+async def listen_forever() -> None:
+    """Hold a LISTEN connection for all subscribed channels, reconnecting on failure."""
+    dsn = settings.database_url.replace("+asyncpg", "", 1)
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            for channel in _subscribers:
+                await connection.add_listener(channel, _on_notification)
+            for channel in _subscribers:
+                _dispatch(channel, None)
+            while True:
+                await asyncio.sleep(KEEPALIVE_SECONDS)
+                await connection.fetchval("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass  # Database unavailable or connection lost; retry below
+        finally:
+            if connection is not None and not connection.is_closed():
+                try:
+                    await connection.close()
+                except Exception:
+                    pass
+        await asyncio.sleep(RETRY_SECONDS)
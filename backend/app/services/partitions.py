@@ -0,0 +1,60 @@
+import uuid
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.database import async_engine
+
+
+def chunk_partition_name(project_id: uuid.UUID) -> str:
+    """Name of the chunks partition holding a project's rows."""
+    return f"chunks_p_{project_id.hex}"
+
+
+async def create_chunk_partition(db: AsyncSession, project_id: uuid.UUID) -> None:
+    """
+    Create the chunks partition for a project, inheriting the parent's indexes.
+
+    If chunks for the project already sit in chunks_default the partition cannot
+    be created; the project keeps working from the default partition.
+    """
+    name = chunk_partition_name(project_id)
+    result = await db.execute(
+        text(
+            "SELECT to_regclass(:name) IS NOT NULL AS partitioned, "
+            "EXISTS (SELECT 1 FROM chunks_default WHERE project_id = :project_id) AS stray"
+        ),
+        {"name": name, "project_id": project_id},
+    )
+    row = result.one()
+    if row.partitioned or row.stray:
+        return
+
+    # DDL cannot take bind parameters; name and value are derived from a UUID
+    await db.execute(
+        text(f"CREATE TABLE \"{name}\" PARTITION OF chunks FOR VALUES IN ('{project_id}')")
+    )
+
+
+async def drop_chunk_partition(project_id: uuid.UUID) -> None:
+    """
+    Discard a project's chunks partition, rows and indexes in one step.
+
+    Runs outside any request transaction: the partition is detached and then
+    dropped, each step committing on its own. Dropping an attached partition
+    would hold ACCESS EXCLUSIVE on chunks, blocking every project's
+    retrieval, until the caller committed.
+    """
+    name = chunk_partition_name(project_id)
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}):
+            return
+        try:
+            await conn.execute(text(f"ALTER TABLE chunks DETACH PARTITION \"{name}\" CONCURRENTLY"))
+        except DBAPIError:
+            # PostgreSQL refuses CONCURRENTLY while chunks_default exists (or
+            # before 14); a plain detach holds the parent lock only briefly
+            await conn.execute(text(f"ALTER TABLE chunks DETACH PARTITION \"{name}\""))
+        await conn.execute(text(f"DROP TABLE IF EXISTS \"{name}\""))
@@ -1,17 +1,27 @@
+import asyncio
+import time
 import uuid
 from dataclasses import dataclass
 
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text, func
-from pgvector.sqlalchemy import Vector
+from sqlalchemy import select, text, cast, bindparam
 
+from app.database import AsyncSessionLocal
 from app.models.chunk import Chunk
-from app.models.document import Document
-from app.services.embeddings import generate_single_embedding
+from app.models.document import Document, DocumentCategory, DocumentTag
+from app.models.types import HalfEmbeddingVector
+from app.services import bm25_index, retrieval_cache, summaries, vector_index
+from app.services.cache import LRUCache
+from app.services.embeddings import get_query_embedding
 from app.config import get_settings
 
 settings = get_settings()
 
+# Hot chunk texts by chunk id. Chunks are immutable (reprocessing replaces them
+# with new ids), so entries never go stale, only unreachable.
+chunk_text_cache = LRUCache(maxsize=settings.chunk_cache_size)
+
 
 @dataclass
 class RetrievedChunk:
@@ -26,6 +36,60 @@ class RetrievedChunk:
     retrieval_rank: int | None = None
     answer_support: float | None = None
     cited_in_answer: bool = False
+    chunk_index: int | None = None  # position within the document, for merging neighbours
+
+
+@dataclass
+class RankedChunk:
+    """Ranking-phase candidate; content is loaded only for fusion survivors."""
+    chunk_id: uuid.UUID
+    document_id: uuid.UUID
+    score: float
+    retrieval_relevance: float | None = None
+    retrieval_rank: int | None = None
+
+
+@dataclass(frozen=True)
+class ChunkText:
+    document_name: str
+    content: str
+    page_number: int | None
+    section: str | None
+    chunk_index: int | None = None
+
+
+@dataclass(frozen=True)
+class VectorSearchProfile:
+    """ANN recall/latency knobs applied per query."""
+    ef_search: int  # HNSW candidate list size
+    probes: int  # IVFFlat lists scanned
+
+
+SEARCH_PROFILES: dict[str, VectorSearchProfile] = {
+    "fast": VectorSearchProfile(ef_search=40, probes=1),
+    "balanced": VectorSearchProfile(ef_search=100, probes=10),
+    "exhaustive": VectorSearchProfile(ef_search=400, probes=100),
+}
+
+
+@dataclass
+class RetrievalTimings:
+    """Per-leg timings for one hybrid_search call, in milliseconds."""
+    embedding_ms: float | None = None
+    coarse_ms: float | None = None  # ranking documents by their summaries
+    vector_ms: float | None = None
+    keyword_ms: float | None = None
+    fused_ms: float | None = None  # single-statement SQL fusion
+    content_ms: float | None = None  # loading text for the fused top_k
+    total_ms: float | None = None
+    fusion: str | None = None
+    degraded: str | None = None  # "keyword_only" or "vector_only" when a leg failed
+    cache_hit: bool = False
+    working_set_hit: bool = False  # answered from the conversation's working set
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
 
 
 async def hybrid_search(
@@ -34,56 +98,301 @@ async def hybrid_search(
     project_id: uuid.UUID,
     top_k: int | None = None,
     document_ids: list[uuid.UUID] | None = None,
+    search_profile: str | None = None,
+    timings: RetrievalTimings | None = None,
+    fusion: str | None = None,
+    categories: list[DocumentCategory] | None = None,
+    tags: list[str] | None = None,
 ) -> list[RetrievedChunk]:
     """
     Perform hybrid search combining vector similarity and keyword search.
+
+    With fusion="python" the keyword leg and the query embedding plus vector
+    leg run concurrently, each on its own pooled connection, so retrieval
+    costs roughly the slower leg rather than the sum, and the legs are fused by
+    merge_results. A failed leg can't abort the transaction `db` still needs
+    for loading content. With fusion="sql" both legs and the fusion run as one
+    statement (fused_search) once the embedding is ready. Defaults to
+    settings.retrieval_fusion_mode.
+
+    If the embedding exceeds settings.embedding_timeout_seconds or either leg
+    fails, results degrade to the surviving leg (recorded in timings.degraded);
+    only both failing raises.
+
+    search_profile selects an ANN tuning from SEARCH_PROFILES ("fast",
+    "balanced", "exhaustive"); defaults to settings.vector_search_profile.
+
+    In python mode the legs rank ids only; text for the top_k survivors is
+    loaded afterwards in one batch by load_chunk_contents.
+
+    Results are cached per project corpus version (app.services.retrieval_cache),
+    so a repeated question skips both legs until the project's documents change.
+
+    categories and tags narrow the search to matching documents (see
+    resolve_document_scope); a scope matching no documents returns nothing.
+
+    With settings.hierarchical_top_documents set, documents are first ranked
+    by their summaries and chunks are searched only within the closest ones.
     """
     top_k = top_k or settings.retrieval_top_k
+    timings = timings if timings is not None else RetrievalTimings()
+    timings.fusion = fusion or settings.retrieval_fusion_mode
+    start = time.perf_counter()
+
+    document_ids = await resolve_document_scope(db, project_id, document_ids, categories, tags)
+    if document_ids is not None and not document_ids:
+        timings.total_ms = _elapsed_ms(start)
+        return []
+
+    key = None
+    if settings.retrieval_cache_max_mb > 0:
+        corpus_version = await retrieval_cache.get_corpus_version(db, project_id)
+        key = retrieval_cache.cache_key(
+            project_id,
+            query,
+            document_ids,
+            top_k,
+            corpus_version,
+            timings.fusion,
+            search_profile or settings.vector_search_profile,
+            settings.lexical_backend,
+            settings.hierarchical_top_documents,
+        )
+        cached = retrieval_cache.get_cached(key)
+        if cached is not None:
+            timings.cache_hit = True
+            timings.total_ms = _elapsed_ms(start)
+            return cached
+
+    if settings.hierarchical_top_documents > 0:
+        document_ids = await _coarse_scope(db, query, project_id, document_ids, timings)
+
+    merged = await _search(db, query, project_id, top_k, document_ids, search_profile, timings)
+    timings.total_ms = _elapsed_ms(start)
+
+    # Degraded results reflect a transient failure, not the corpus
+    if key is not None and timings.degraded is None:
+        retrieval_cache.store(key, merged)
 
-    # Generate embedding for query
-    query_embedding = await generate_single_embedding(query)
+    return merged
+
+
+async def resolve_document_scope(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    document_ids: list[uuid.UUID] | None = None,
+    categories: list[DocumentCategory] | None = None,
+    tags: list[str] | None = None,
+) -> list[uuid.UUID] | None:
+    """
+    Live documents matching every given filter: one of document_ids, one of
+    categories, and carrying one of tags. None means the whole project; an
+    empty list means no document matched.
+
+    Filters resolve to ids up front so both retrieval legs, the in-process
+    indexes and the retrieval cache key all use the same document_ids filter.
+    """
+    if not categories and not tags:
+        return document_ids
 
-    # Vector similarity search using pgvector
-    vector_results = await vector_search(
-        db, query_embedding, project_id, top_k * 2, document_ids
+    query = select(Document.id).where(
+        Document.project_id == project_id, Document.deleted_at.is_(None)
     )
+    if document_ids:
+        query = query.where(Document.id.in_(document_ids))
+    if categories:
+        query = query.where(Document.category.in_(categories))
+    if tags:
+        query = query.where(
+            Document.id.in_(select(DocumentTag.document_id).where(DocumentTag.tag.in_(tags)))
+        )
+
+    result = await db.execute(query)
+    return list(result.scalars().all())
 
-    # Keyword search using pg_trgm
-    keyword_results = await keyword_search(
-        db, query, project_id, top_k * 2, document_ids
+
+async def _coarse_scope(
+    db: AsyncSession,
+    query: str,
+    project_id: uuid.UUID,
+    document_ids: list[uuid.UUID] | None,
+    timings: RetrievalTimings,
+) -> list[uuid.UUID] | None:
+    """Narrow document_ids to the documents whose summaries best match the query."""
+    coarse_start = time.perf_counter()
+    try:
+        # Cached, so the vector leg's own lookup is free
+        query_embedding = await asyncio.wait_for(
+            get_query_embedding(query),
+            timeout=settings.embedding_timeout_seconds,
+        )
+    except Exception:
+        return document_ids  # _search degrades to keyword results
+    scoped = await summaries.coarse_document_scope(
+        db, project_id, query_embedding, settings.hierarchical_top_documents, document_ids
     )
+    timings.coarse_ms = _elapsed_ms(coarse_start)
+    return scoped
 
-    # Merge and rerank results
-    merged = merge_results(vector_results, keyword_results, top_k)
+
+async def _search(
+    db: AsyncSession,
+    query: str,
+    project_id: uuid.UUID,
+    top_k: int,
+    document_ids: list[uuid.UUID] | None,
+    search_profile: str | None,
+    timings: RetrievalTimings,
+) -> list[RetrievedChunk]:
+    """Run the retrieval legs and fuse them, uncached."""
+
+    async def embed_query() -> np.ndarray:
+        embedding_start = time.perf_counter()
+        query_embedding = await asyncio.wait_for(
+            get_query_embedding(query),
+            timeout=settings.embedding_timeout_seconds,
+        )
+        timings.embedding_ms = _elapsed_ms(embedding_start)
+        return query_embedding
+
+    async def run_vector_leg() -> list[RankedChunk]:
+        query_embedding = await embed_query()
+
+        vector_start = time.perf_counter()
+        async with AsyncSessionLocal() as vector_db:
+            results = await vector_search(
+                vector_db, query_embedding, project_id, top_k * 2, document_ids, search_profile
+            )
+        timings.vector_ms = _elapsed_ms(vector_start)
+        return results
+
+    async def run_keyword_leg() -> list[RankedChunk]:
+        keyword_start = time.perf_counter()
+        async with AsyncSessionLocal() as keyword_db:
+            results = await keyword_search(
+                keyword_db, query, project_id, top_k * 2, document_ids
+            )
+        timings.keyword_ms = _elapsed_ms(keyword_start)
+        return results
+
+    if timings.fusion == "sql":
+        try:
+            query_embedding = await embed_query()
+            fused_start = time.perf_counter()
+            # Own session, so a failed statement leaves `db` usable for the fallback
+            async with AsyncSessionLocal() as fused_db:
+                merged = await fused_search(
+                    fused_db,
+                    query,
+                    query_embedding,
+                    project_id,
+                    top_k,
+                    document_ids,
+                    search_profile,
+                )
+            timings.fused_ms = _elapsed_ms(fused_start)
+        except Exception:
+            timings.degraded = "keyword_only"
+            ranked = merge_results([], await run_keyword_leg(), top_k)
+            merged = await load_chunk_contents(db, ranked, project_id)
+        return merged
+
+    vector_results, keyword_results = await asyncio.gather(
+        run_vector_leg(), run_keyword_leg(), return_exceptions=True
+    )
+
+    if isinstance(vector_results, BaseException) and isinstance(keyword_results, BaseException):
+        raise vector_results
+    if isinstance(vector_results, BaseException):
+        vector_results = []
+        timings.degraded = "keyword_only"
+    elif isinstance(keyword_results, BaseException):
+        keyword_results = []
+        timings.degraded = "vector_only"
+
+    # Merge and rerank results, then load text for the survivors only
+    ranked = merge_results(vector_results, keyword_results, top_k)
+
+    content_start = time.perf_counter()
+    merged = await load_chunk_contents(db, ranked, project_id)
+    timings.content_ms = _elapsed_ms(content_start)
 
     return merged
 
 
+def embedding_distance(query_embedding: np.ndarray):
+    """
+    Cosine distance expression matching the HNSW index definition.
+
+    pgvector cannot index `vector` columns above 2000 dimensions, so the index
+    is built on `embedding::halfvec(dim)` and queries must use the same cast.
+    """
+    index_type = HalfEmbeddingVector(settings.embedding_dimension)
+    return cast(Chunk.embedding, index_type).cosine_distance(cast(query_embedding, index_type))
+
+
+async def apply_search_profile(db: AsyncSession, profile: str | None, limit: int) -> None:
+    """Set hnsw.ef_search / ivfflat.probes for the current transaction."""
+    profile = profile or settings.vector_search_profile
+    if profile not in SEARCH_PROFILES:
+        raise ValueError(f"Unknown search profile: {profile}")
+    tuning = SEARCH_PROFILES[profile]
+
+    # HNSW never returns more rows than ef_search, so keep it above the limit
+    await db.execute(
+        text(
+            "SELECT set_config('hnsw.ef_search', :ef_search, true), "
+            "set_config('ivfflat.probes', :probes, true)"
+        ),
+        {"ef_search": str(max(tuning.ef_search, limit)), "probes": str(tuning.probes)},
+    )
+
+
 async def vector_search(
     db: AsyncSession,
-    query_embedding: list[float],
+    query_embedding: np.ndarray,
     project_id: uuid.UUID,
     top_k: int,
     document_ids: list[uuid.UUID] | None = None,
-) -> list[RetrievedChunk]:
-    """Perform vector similarity search."""
+    search_profile: str | None = None,
+) -> list[RankedChunk]:
+    """
+    Perform vector similarity search, returning ranked ids without content.
+
+    With settings.vector_index_enabled, projects under the size threshold are
+    searched exactly in process (app.services.vector_index) instead.
+    """
+    if settings.vector_index_enabled:
+        hits = await vector_index.search_project_index(
+            db, project_id, query_embedding, top_k, document_ids
+        )
+        if hits is not None:
+            return [
+                RankedChunk(
+                    chunk_id=chunk_id,
+                    document_id=document_id,
+                    # Same 0-1 scale as the pgvector path: 1 - distance / 2
+                    score=max(0, (1 + similarity) / 2),
+                    retrieval_relevance=max(0, (1 + similarity) / 2),
+                )
+                for chunk_id, document_id, similarity in hits
+            ]
+
+    await apply_search_profile(db, search_profile, top_k)
+
     # Build query
     query = (
         select(
             Chunk.id,
             Chunk.document_id,
-            Document.filename,
-            Chunk.content,
-            Chunk.page_number,
-            Chunk.section,
-            Chunk.embedding.cosine_distance(query_embedding).label("distance"),
+            embedding_distance(query_embedding).label("distance"),
         )
         .join(Document, Chunk.document_id == Document.id)
-        .where(Document.project_id == project_id)
+        .where(Chunk.project_id == project_id, Document.deleted_at.is_(None))
     )
 
     if document_ids:
-        query = query.where(Document.id.in_(document_ids))
+        query = query.where(Chunk.document_id.in_(document_ids))
 
     query = query.order_by("distance").limit(top_k)
 
@@ -91,13 +400,9 @@ async def vector_search(
     rows = result.all()
 
     return [
-        RetrievedChunk(
+        RankedChunk(
             chunk_id=row.id,
             document_id=row.document_id,
-            document_name=row.filename,
-            content=row.content,
-            page_number=row.page_number,
-            section=row.section,
             # Cosine distance ranges 0-2, convert to similarity 0-1
             # distance=0 → similarity=1, distance=2 → similarity=0
             score=max(0, 1 - row.distance / 2),
@@ -113,30 +418,235 @@ async def keyword_search(
     project_id: uuid.UUID,
     top_k: int,
     document_ids: list[uuid.UUID] | None = None,
-) -> list[RetrievedChunk]:
-    """Perform keyword search using PostgreSQL full-text search."""
+) -> list[RankedChunk]:
+    """
+    Perform keyword search using the stored chunk and filename tsvectors,
+    returning ranked ids without content.
+
+    With settings.lexical_backend == "bm25" the project's in-process BM25
+    index is used instead.
+    """
+    if settings.lexical_backend == "bm25":
+        hits = await bm25_index.search_project_index(db, project_id, query, top_k, document_ids)
+        return [
+            RankedChunk(chunk_id=chunk_id, document_id=document_id, score=score)
+            for chunk_id, document_id, score in hits
+        ]
+
     sql = text("""
         SELECT
             c.id,
             c.document_id,
-            d.filename,
-            c.content,
-            c.page_number,
-            c.section,
-            ts_rank(to_tsvector('english', c.content), plainto_tsquery('english', :query)) as rank
+            ts_rank(CAST(:weights AS float4[]), c.search_vector || d.search_vector, q) as rank
         FROM chunks c
         JOIN documents d ON c.document_id = d.id
-        WHERE d.project_id = :project_id
-        AND to_tsvector('english', c.content) @@ plainto_tsquery('english', :query)
+        CROSS JOIN plainto_tsquery('english', :query) q
+        WHERE c.project_id = :project_id
+        AND d.deleted_at IS NULL
+        AND c.search_vector @@ q
+        {document_filter}
         ORDER BY rank DESC
         LIMIT :limit
-    """)
+    """.format(document_filter=_document_filter(document_ids)))
 
     params = {
         "query": query,
         "project_id": str(project_id),
+        "weights": settings.keyword_rank_weights,
         "limit": top_k,
     }
+    if document_ids:
+        params["document_ids"] = list(document_ids)
+
+    result = await db.execute(sql, params)
+    rows = result.all()
+
+    return [
+        RankedChunk(chunk_id=row.id, document_id=row.document_id, score=float(row.rank))
+        for row in rows
+    ]
+
+
+async def load_chunk_contents(
+    db: AsyncSession,
+    ranked: list[RankedChunk],
+    project_id: uuid.UUID,
+) -> list[RetrievedChunk]:
+    """
+    Attach text and citation fields to ranked candidates, keeping their order.
+
+    Served from chunk_text_cache where possible; the rest come back in a single
+    query. Candidates whose chunk disappeared since ranking are dropped.
+    """
+    texts: dict[uuid.UUID, ChunkText] = {}
+    missing = []
+    for candidate in ranked:
+        cached = chunk_text_cache.get(candidate.chunk_id)
+        if cached is None:
+            missing.append(candidate.chunk_id)
+        else:
+            texts[candidate.chunk_id] = cached
+
+    if missing:
+        result = await db.execute(
+            select(
+                Chunk.id,
+                Document.filename,
+                Chunk.content,
+                Chunk.page_number,
+                Chunk.section,
+                Chunk.metadata_["chunk_index"].as_integer().label("chunk_index"),
+            )
+            .join(Document, Chunk.document_id == Document.id)
+            .where(Chunk.project_id == project_id, Chunk.id.in_(missing))
+        )
+        for row in result.all():
+            chunk_text = ChunkText(
+                document_name=row.filename,
+                content=row.content,
+                page_number=row.page_number,
+                section=row.section,
+                chunk_index=row.chunk_index,
+            )
+            texts[row.id] = chunk_text
+            chunk_text_cache.set(row.id, chunk_text)
+
+    return [
+        RetrievedChunk(
+            chunk_id=candidate.chunk_id,
+            document_id=candidate.document_id,
+            document_name=texts[candidate.chunk_id].document_name,
+            content=texts[candidate.chunk_id].content,
+            page_number=texts[candidate.chunk_id].page_number,
+            section=texts[candidate.chunk_id].section,
+            score=candidate.score,
+            retrieval_relevance=candidate.retrieval_relevance,
+            retrieval_rank=candidate.retrieval_rank,
+            chunk_index=texts[candidate.chunk_id].chunk_index,
+        )
+        for candidate in ranked
+        if candidate.chunk_id in texts
+    ]
+
+
+async def load_chunk_embeddings(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    chunk_ids: list[uuid.UUID],
+) -> dict[uuid.UUID, np.ndarray]:
+    """Stored embeddings for the given chunks, in one query."""
+    if not chunk_ids:
+        return {}
+    result = await db.execute(
+        select(Chunk.id, Chunk.embedding).where(
+            Chunk.project_id == project_id,
+            Chunk.id.in_(chunk_ids),
+            Chunk.embedding.is_not(None),
+        )
+    )
+    return {row.id: row.embedding for row in result.all()}
+
+
+def _document_filter(document_ids: list[uuid.UUID] | None) -> str:
+    return "AND c.document_id = ANY(:document_ids)" if document_ids else ""
+
+
+# Both legs, weighted reciprocal rank fusion and the content fetch in one
+# round trip. Ranks are 1-based here, so `rank + 59` matches merge_results'
+# 0-based `rank + 60`.
+FUSED_SEARCH_SQL = """
+    WITH vector_hits AS (
+        SELECT id, distance, row_number() OVER (ORDER BY distance) AS rank
+        FROM (
+            SELECT c.id, {distance} AS distance
+            FROM chunks c
+            JOIN documents d ON c.document_id = d.id
+            WHERE c.project_id = :project_id
+            AND d.deleted_at IS NULL
+            {document_filter}
+            ORDER BY distance
+            LIMIT :candidates
+        ) nearest
+    ),
+    keyword_hits AS (
+        SELECT id, row_number() OVER (ORDER BY rank DESC) AS rank
+        FROM (
+            SELECT
+                c.id,
+                ts_rank(CAST(:weights AS float4[]), c.search_vector || d.search_vector, q) AS rank
+            FROM chunks c
+            JOIN documents d ON c.document_id = d.id
+            CROSS JOIN plainto_tsquery('english', :query) q
+            WHERE c.project_id = :project_id
+            AND d.deleted_at IS NULL
+            AND c.search_vector @@ q
+            {document_filter}
+            ORDER BY rank DESC
+            LIMIT :candidates
+        ) matched
+    ),
+    fused AS (
+        SELECT
+            coalesce(v.id, k.id) AS id,
+            coalesce(CAST(:vector_weight AS float8) / (v.rank + 59), 0)
+                + coalesce(CAST(:keyword_weight AS float8) / (k.rank + 59), 0) AS score,
+            v.distance
+        FROM vector_hits v
+        FULL OUTER JOIN keyword_hits k ON v.id = k.id
+        ORDER BY score DESC
+        LIMIT :top_k
+    )
+    SELECT
+        c.id, c.document_id, d.filename, c.content, c.page_number, c.section,
+        CAST(c.metadata ->> 'chunk_index' AS integer) AS chunk_index, f.score, f.distance
+    FROM fused f
+    JOIN chunks c ON c.id = f.id AND c.project_id = :project_id
+    JOIN documents d ON d.id = c.document_id
+    ORDER BY f.score DESC
+"""
+
+
+async def fused_search(
+    db: AsyncSession,
+    query: str,
+    query_embedding: np.ndarray,
+    project_id: uuid.UUID,
+    top_k: int,
+    document_ids: list[uuid.UUID] | None = None,
+    search_profile: str | None = None,
+    vector_weight: float = 0.7,
+    keyword_weight: float = 0.3,
+) -> list[RetrievedChunk]:
+    """
+    Hybrid search with reciprocal rank fusion done in the database.
+
+    Equivalent to merge_results over vector_search and keyword_search with
+    top_k * 2 candidates each, but only the final top_k rows (with content)
+    leave the database.
+    """
+    candidates = top_k * 2
+    await apply_search_profile(db, search_profile, candidates)
+
+    dim = settings.embedding_dimension
+    sql = text(
+        FUSED_SEARCH_SQL.format(
+            distance=f"(c.embedding::halfvec({dim})) <=> CAST(:embedding AS halfvec({dim}))",
+            document_filter=_document_filter(document_ids),
+        )
+    ).bindparams(bindparam("embedding", type_=HalfEmbeddingVector(dim)))
+
+    params = {
+        "embedding": query_embedding,
+        "query": query,
+        "project_id": project_id,
+        "weights": settings.keyword_rank_weights,
+        "candidates": candidates,
+        "top_k": top_k,
+        "vector_weight": vector_weight,
+        "keyword_weight": keyword_weight,
+    }
+    if document_ids:
+        params["document_ids"] = list(document_ids)
 
     result = await db.execute(sql, params)
     rows = result.all()
@@ -149,19 +659,24 @@ async def keyword_search(
             content=row.content,
             page_number=row.page_number,
             section=row.section,
-            score=float(row.rank),
+            score=float(row.score),
+            retrieval_relevance=(
+                max(0, 1 - row.distance / 2) if row.distance is not None else None
+            ),
+            retrieval_rank=rank,
+            chunk_index=row.chunk_index,
         )
-        for row in rows
+        for rank, row in enumerate(rows, start=1)
     ]
 
 
 def merge_results(
-    vector_results: list[RetrievedChunk],
-    keyword_results: list[RetrievedChunk],
+    vector_results: list[RankedChunk],
+    keyword_results: list[RankedChunk],
     top_k: int,
     vector_weight: float = 0.7,
     keyword_weight: float = 0.3,
-) -> list[RetrievedChunk]:
+) -> list[RankedChunk]:
     """
     Merge and rerank results from vector and keyword search.
     Uses reciprocal rank fusion with weights.
@@ -0,0 +1,86 @@
+"""
+Retrieval result cache keyed on a per-project corpus version.
+
+projects.corpus_version is bumped whenever the set of retrievable chunks
+changes (ingestion completes, a document is deleted, restored, purged or
+reprocessed). It is part of every cache key, so a bump makes all older
+entries unreachable and they age out of the LRU; nothing is ever served stale.
+"""
+import uuid
+from dataclasses import replace
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+
+from app.models.project import Project
+from app.services.cache import LRUCache
+from app.services.embeddings import normalize_query
+from app.config import get_settings
+
+settings = get_settings()
+
+# Rough per-chunk overhead on top of its text: ids, floats, dataclass
+CHUNK_OVERHEAD_BYTES = 400
+
+
+def _result_size(results: list) -> int:
+    return sum(len(chunk.content) + CHUNK_OVERHEAD_BYTES for chunk in results)
+
+
+retrieval_cache = LRUCache(
+    maxsize=10_000 if settings.retrieval_cache_max_mb > 0 else 0,
+    max_bytes=settings.retrieval_cache_max_mb * 1024 * 1024,
+    sizeof=_result_size,
+)
+
+
+async def get_corpus_version(db: AsyncSession, project_id: uuid.UUID) -> int:
+    version = await db.scalar(select(Project.corpus_version).where(Project.id == project_id))
+    return version or 0
+
+
+async def bump_corpus_version(db: AsyncSession, project_id: uuid.UUID) -> int:
+    """
+    Invalidate cached retrieval results for a project; commits with the
+    caller. Returns the new version. The row stays locked until the caller
+    commits, so concurrent bumps for a project are serialized.
+    """
+    # Plain SQL so the bump doesn't touch projects.updated_at
+    version = await db.scalar(
+        text(
+            "UPDATE projects SET corpus_version = corpus_version + 1 "
+            "WHERE id = :project_id RETURNING corpus_version"
+        ),
+        {"project_id": project_id},
+    )
+    return version or 0
+
+
+def cache_key(
+    project_id: uuid.UUID,
+    query: str,
+    document_ids: list[uuid.UUID] | None,
+    top_k: int,
+    corpus_version: int,
+    *options: str | None,
+) -> tuple:
+    return (
+        project_id,
+        normalize_query(query),
+        tuple(sorted(document_ids)) if document_ids else None,
+        top_k,
+        corpus_version,
+        options,
+    )
+
+
+def get_cached(key: tuple) -> list | None:
+    results = retrieval_cache.get(key)
+    if results is None:
+        return None
+    # Callers annotate chunks with answer support, so hand out copies
+    return [replace(chunk) for chunk in results]
+
+
+def store(key: tuple, results: list) -> None:
+    retrieval_cache.set(key, [replace(chunk) for chunk in results])
@@ -0,0 +1,111 @@
+"""
+Runtime settings from the settings table, cached in process.
+
+Rows are loaded once into a RuntimeSettings snapshot with values decoded and
+API keys decrypted, and reused until invalidated. update_settings sends a
+NOTIFY on SETTINGS_CHANNEL with its transaction, so every worker drops its
+snapshot once the change commits, and invalidates its own directly;
+settings.runtime_settings_ttl_seconds bounds staleness if a notification is
+missed.
+"""
+import base64
+import hashlib
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from cryptography.fernet import Fernet
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.models.settings import Settings as SettingsModel
+from app.services import notify
+from app.config import get_settings
+
+settings = get_settings()
+
+SETTINGS_CHANNEL = "settings_changed"
+API_KEY_PREFIX = "api_key_"
+
+
+@lru_cache
+def _fernet() -> Fernet:
+    key = hashlib.sha256(settings.secret_key.encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def encrypt_value(value: str) -> bytes:
+    return _fernet().encrypt(value.encode())
+
+
+def decrypt_value(encrypted: bytes) -> str:
+    return _fernet().decrypt(encrypted).decode()
+
+
+@dataclass(frozen=True)
+class RuntimeSettings:
+    values: dict[str, Any] = field(default_factory=dict)  # key -> value["v"]
+    api_keys: dict[str, str] = field(default_factory=dict)  # provider -> decrypted key
+    loaded_at: float = 0.0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.values.get(key)
+        return default if value is None else value
+
+
+_snapshot: RuntimeSettings | None = None
+# Bumped by invalidate(), so a load racing an update isn't cached
+_generation = 0
+
+
+async def _load(db: AsyncSession) -> RuntimeSettings:
+    result = await db.execute(select(SettingsModel))
+    values, api_keys = {}, {}
+    for row in result.scalars().all():
+        if row.key.startswith(API_KEY_PREFIX):
+            if row.encrypted_value:
+                try:
+                    api_keys[row.key[len(API_KEY_PREFIX):]] = decrypt_value(row.encrypted_value)
+                except Exception:
+                    pass  # Undecryptable (e.g. secret_key changed); env var applies
+        elif row.value is not None:
+            values[row.key] = row.value.get("v")
+    return RuntimeSettings(values=values, api_keys=api_keys, loaded_at=time.monotonic())
+
+
+async def get_runtime_settings(db: AsyncSession) -> RuntimeSettings:
+    global _snapshot
+    snapshot = _snapshot
+    if (
+        snapshot is not None
+        and time.monotonic() - snapshot.loaded_at < settings.runtime_settings_ttl_seconds
+    ):
+        return snapshot
+
+    generation = _generation
+    snapshot = await _load(db)
+    if generation == _generation:
+        _snapshot = snapshot
+    return snapshot
+
+
+def invalidate(payload: str | None = None) -> None:
+    global _snapshot, _generation
+    _snapshot = None
+    _generation += 1
+
+
+async def notify_changed(db: AsyncSession) -> None:
+    """Have every worker invalidate once db commits; call invalidate() after the commit too."""
+    await notify.notify(db, SETTINGS_CHANNEL)
+
+
+notify.subscribe(SETTINGS_CHANNEL, invalidate)
+
+
+async def get_llm_config(db: AsyncSession) -> tuple[str, str | None]:
+    """LLM provider and decrypted API key; None when the env var should be used."""
+    runtime = await get_runtime_settings(db)
+    provider = runtime.get("llm_provider", settings.default_llm_provider)
+    return provider, runtime.api_keys.get(provider)
@@ -11,6 +11,9 @@ from app.models.message import Message
 from app.models.project import Project
 from app.schemas.search import SearchRequest, SearchResponse, SearchResult
 from app.services.embeddings import generate_single_embedding
+from app.config import get_settings
+
+settings = get_settings()
 
 
 async def global_search(
@@ -68,7 +71,7 @@ async def search_documents(
 
     # Apply filters
     if request.project_id:
-        query = query.where(Document.project_id == request.project_id)
+        query = query.where(Chunk.project_id == request.project_id)
 
     if request.category:
         query = query.where(Document.category == request.category)
@@ -81,13 +84,16 @@ async def search_documents(
 
     # Full-text search
     query = query.where(
-        text("to_tsvector('english', chunks.content) @@ plainto_tsquery('english', :query)")
+        text("chunks.search_vector @@ plainto_tsquery('english', :query)")
     ).params(query=request.query)
 
-    # Add ranking
+    # Add ranking (section titles and filenames carry weight A)
     query = query.add_columns(
-        text("ts_rank(to_tsvector('english', chunks.content), plainto_tsquery('english', :query)) as rank")
-    ).params(query=request.query)
+        text(
+            "ts_rank(CAST(:weights AS float4[]), chunks.search_vector || documents.search_vector, "
+            "plainto_tsquery('english', :query)) as rank"
+        )
+    ).params(query=request.query, weights=settings.keyword_rank_weights)
 
     query = query.order_by(text("rank DESC")).limit(request.limit * 2)
 
@@ -150,12 +156,12 @@ async def search_conversations(
 
     # Full-text search
     query = query.where(
-        text("to_tsvector('english', messages.content) @@ plainto_tsquery('english', :query)")
+        text("messages.search_vector @@ plainto_tsquery('english', :query)")
     ).params(query=request.query)
 
     # Add ranking
     query = query.add_columns(
-        text("ts_rank(to_tsvector('english', messages.content), plainto_tsquery('english', :query)) as rank")
+        text("ts_rank(messages.search_vector, plainto_tsquery('english', :query)) as rank")
     ).params(query=request.query)
 
     query = query.order_by(text("rank DESC")).limit(request.limit * 2)
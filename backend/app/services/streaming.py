@@ -0,0 +1,74 @@
+"""
+SSE framing for streamed answers.
+
+Providers yield tokens of a few characters each. coalesce_tokens batches them
+into frames of up to settings.stream_coalesce_chars, flushing whatever has
+arrived once the oldest buffered token is settings.stream_coalesce_ms old, so
+a client gets a few dozen frames a second instead of one per token. Setting
+the optional `cancelled` event ends the stream at once, without waiting for
+the provider's next token.
+"""
+import asyncio
+from typing import Any, AsyncIterator
+
+import orjson
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def dumps(payload: Any) -> str:
+    """Encode an SSE event payload."""
+    return orjson.dumps(payload).decode()
+
+
+async def coalesce_tokens(
+    tokens: AsyncIterator[str],
+    window_ms: int | None = None,
+    max_chars: int | None = None,
+    cancelled: asyncio.Event | None = None,
+) -> AsyncIterator[str]:
+    """Re-chunk a token stream into frames bounded by size and age."""
+    window = (settings.stream_coalesce_ms if window_ms is None else window_ms) / 1000
+    max_chars = settings.stream_coalesce_chars if max_chars is None else max_chars
+    if window <= 0:
+        max_chars = 0  # every token is its own frame
+
+    loop = asyncio.get_running_loop()
+    iterator = aiter(tokens)
+    buffer: list[str] = []
+    size = 0
+    deadline = None
+    # The pending read survives a flush timeout, so no token is lost
+    next_token = asyncio.ensure_future(anext(iterator))
+    stop = asyncio.ensure_future(cancelled.wait() if cancelled else asyncio.Future())
+    try:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait(
+                {next_token, stop}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if stop in done:
+                break
+            if done:
+                try:
+                    token = next_token.result()
+                except StopAsyncIteration:
+                    break
+                next_token = asyncio.ensure_future(anext(iterator))
+                buffer.append(token)
+                size += len(token)
+                if deadline is None:
+                    deadline = loop.time() + window
+                if size < max_chars:
+                    continue
+
+            yield "".join(buffer)
+            buffer, size, deadline = [], 0, None
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        next_token.cancel()
+        stop.cancel()
@@ -0,0 +1,197 @@
+"""
+Per-document and per-section summaries for coarse-to-fine retrieval.
+
+Summaries are extractive (filename, category, section titles and leading
+sentences), and each embedding is the normalized mean of the chunk embeddings
+it covers, so the ingestion stage needs no extra API calls. rank_documents
+orders a project's documents by their best-matching summary; hybrid_search
+uses coarse_document_scope to search chunks only within the top documents.
+"""
+import re
+import uuid
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_
+
+from app.models.document import Document
+from app.models.document_summary import DocumentSummary
+
+SECTION_SUMMARY_CHARS = 400
+DOCUMENT_SUMMARY_CHARS = 1200
+MAX_LISTED_SECTIONS = 25
+
+
+def build_summaries(
+    document: Document,
+    chunks: list,
+    embeddings: np.ndarray,
+) -> list[DocumentSummary]:
+    """
+    Summaries of a freshly chunked document: one for the whole document and
+    one per section title. chunks carry content, section and page_number and
+    align with the rows of embeddings.
+    """
+    if not chunks:
+        return []
+
+    sections: dict[str, list[int]] = {}
+    for i, chunk in enumerate(chunks):
+        if chunk.section:
+            sections.setdefault(chunk.section, []).append(i)
+
+    summaries = [
+        _summary(
+            document,
+            None,
+            _document_text(document, chunks, list(sections)),
+            list(range(len(chunks))),
+            chunks,
+            embeddings,
+        )
+    ]
+    for section, indices in sections.items():
+        text = _lead([chunks[i].content for i in indices], SECTION_SUMMARY_CHARS)
+        summaries.append(_summary(document, section, text, indices, chunks, embeddings))
+    return summaries
+
+
+def _summary(
+    document: Document,
+    section: str | None,
+    content: str,
+    indices: list[int],
+    chunks: list,
+    embeddings: np.ndarray,
+) -> DocumentSummary:
+    pages = [chunks[i].page_number for i in indices if chunks[i].page_number is not None]
+    return DocumentSummary(
+        project_id=document.project_id,
+        document_id=document.id,
+        section=section,
+        content=content,
+        chunk_count=len(indices),
+        page_start=min(pages, default=None),
+        page_end=max(pages, default=None),
+        embedding=_centroid(np.asarray(embeddings, dtype=np.float32)[indices]),
+    )
+
+
+def _centroid(vectors: np.ndarray) -> np.ndarray | None:
+    mean = vectors.mean(axis=0)
+    norm = np.linalg.norm(mean)
+    return mean / norm if norm > 0 else None
+
+
+def _document_text(document: Document, chunks: list, sections: list[str]) -> str:
+    header = f"{document.filename} ({document.category.value}"
+    if document.page_count:
+        header += f", {document.page_count} pages"
+    header += ")"
+
+    parts = [header]
+    if sections:
+        parts.append("Sections: " + "; ".join(sections[:MAX_LISTED_SECTIONS]))
+    parts.append(_lead([c.content for c in chunks], DOCUMENT_SUMMARY_CHARS))
+    return "\n".join(parts)
+
+
+def _lead(texts: list[str], limit: int) -> str:
+    """Leading sentences of texts up to about limit characters, skipping repeats."""
+    sentences: list[str] = []
+    seen = set()
+    length = 0
+    for text in texts:
+        for sentence in re.split(r"(?<=[.!?])\s+", " ".join(text.split())):
+            # Consecutive chunks overlap, so their first sentences repeat
+            if not sentence or sentence in seen:
+                continue
+            if length and length + len(sentence) > limit:
+                return " ".join(sentences)
+            sentences.append(sentence[:limit])
+            seen.add(sentence)
+            length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+async def rank_documents(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    query_embedding: np.ndarray,
+    document_ids: list[uuid.UUID] | None = None,
+) -> list[tuple[uuid.UUID, float | None]]:
+    """
+    Live documents with the cosine distance of their closest summary, closest
+    first. Documents without summaries come first with a distance of None.
+    """
+    distance = func.min(DocumentSummary.embedding.cosine_distance(query_embedding)).label(
+        "distance"
+    )
+    query = (
+        select(Document.id, distance)
+        .outerjoin(
+            DocumentSummary,
+            and_(
+                DocumentSummary.document_id == Document.id,
+                DocumentSummary.project_id == project_id,
+            ),
+        )
+        .where(Document.project_id == project_id, Document.deleted_at.is_(None))
+        .group_by(Document.id)
+        .order_by(distance.asc().nulls_first())
+    )
+    if document_ids:
+        query = query.where(Document.id.in_(document_ids))
+
+    result = await db.execute(query)
+    return [(row.id, row.distance) for row in result.all()]
+
+
+async def coarse_document_scope(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    query_embedding: np.ndarray,
+    top_documents: int,
+    document_ids: list[uuid.UUID] | None = None,
+) -> list[uuid.UUID] | None:
+    """
+    The top_documents documents closest to the query plus any not yet
+    summarized, or document_ids unchanged when no more than top_documents
+    summarized documents are in scope.
+    """
+    ranked = await rank_documents(db, project_id, query_embedding, document_ids)
+    summarized = [doc_id for doc_id, distance in ranked if distance is not None]
+    if len(summarized) <= top_documents:
+        return document_ids
+
+    unsummarized = [doc_id for doc_id, distance in ranked if distance is None]
+    return summarized[:top_documents] + unsummarized
+
+
+async def project_overview(db: AsyncSession, project_id: uuid.UUID) -> list:
+    """
+    Live documents with their stored summaries, without touching chunks.
+    Rows are ordered by document, whole-document summary first, then sections
+    by page; documents without summaries appear once with summary fields None.
+    """
+    result = await db.execute(
+        select(
+            Document.id.label("document_id"),
+            Document.filename,
+            Document.category,
+            Document.page_count,
+            DocumentSummary.section,
+            DocumentSummary.content,
+            DocumentSummary.page_start,
+            DocumentSummary.page_end,
+        )
+        .outerjoin(DocumentSummary, DocumentSummary.document_id == Document.id)
+        .where(Document.project_id == project_id, Document.deleted_at.is_(None))
+        .order_by(
+            Document.created_at,
+            Document.id,
+            DocumentSummary.section.is_not(None),
+            DocumentSummary.page_start.nulls_first(),
+        )
+    )
+    return result.all()
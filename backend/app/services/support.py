@@ -0,0 +1,76 @@
+"""
+Answer-support scores: how closely each retrieved chunk matches the answer.
+
+Chunks are compared through their stored embeddings, so a turn embeds only
+the answer (or its sentences); chunks without a stored vector are embedded in
+the same request. All similarities come from one matrix product.
+"""
+import re
+import uuid
+
+import numpy as np
+
+from app.services.embeddings import generate_embeddings, cosine_similarity_matrix
+from app.services.retrieval import RetrievedChunk
+from app.config import get_settings
+
+settings = get_settings()
+
+MAX_RESPONSE_CHARS = 3000
+MAX_CHUNK_CHARS = 1500
+MAX_SENTENCES = 40
+
+
+def answer_sentences(response: str) -> list[str]:
+    """Sentences of the answer worth scoring, citation markers removed."""
+    text = re.sub(r"\[Document:[^\]]*\]", " ", response)
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", text)]
+    return [s for s in sentences if len(s.split()) >= 4][:MAX_SENTENCES]
+
+
+async def score_answer_support(
+    chunks: list[RetrievedChunk],
+    response: str,
+    vectors: dict[uuid.UUID, np.ndarray] | None = None,
+) -> None:
+    """
+    Set answer_support on each chunk. vectors maps chunk ids to stored
+    embeddings; settings.support_scoring picks whole-answer or per-sentence
+    scoring. Falls back to word overlap if embedding fails.
+    """
+    if not chunks:
+        return
+
+    vectors = vectors or {}
+    missing = [chunk for chunk in chunks if vectors.get(chunk.chunk_id) is None]
+    answer = []
+    if settings.support_scoring == "sentences":
+        answer = answer_sentences(response)
+    answer = answer or [response[:MAX_RESPONSE_CHARS]]
+
+    try:
+        embedded = await generate_embeddings(
+            [*answer, *(chunk.content[:MAX_CHUNK_CHARS] for chunk in missing)]
+        )
+        chunk_vectors = dict(vectors)
+        chunk_vectors.update(zip((c.chunk_id for c in missing), embedded[len(answer):]))
+        matrix = np.stack([chunk_vectors[chunk.chunk_id] for chunk in chunks])
+
+        # (answer parts, chunks); a chunk is as supported as its best match
+        similarities = cosine_similarity_matrix(embedded[: len(answer)], matrix)
+        supports = np.clip(similarities.max(axis=0), 0.0, 1.0)
+        for chunk, support in zip(chunks, supports):
+            chunk.answer_support = float(support)
+    except Exception:
+        for chunk in chunks:
+            chunk.answer_support = lexical_support_score(response, chunk.content)
+
+
+def lexical_support_score(response: str, content: str) -> float:
+    """Fallback overlap score when embedding-based support cannot be computed."""
+    response_tokens = set(re.findall(r"\b[a-z0-9]{3,}\b", response.lower()))
+    content_tokens = set(re.findall(r"\b[a-z0-9]{3,}\b", content.lower()))
+    if not response_tokens or not content_tokens:
+        return 0.0
+    overlap = len(response_tokens & content_tokens)
+    return min(1.0, overlap / len(response_tokens))
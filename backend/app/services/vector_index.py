@@ -0,0 +1,368 @@
+"""
+In-process exact vector index for small and medium projects.
+
+Each project's chunk embeddings live in one contiguous, L2-normalized float32
+matrix, so a query is a single matrix-vector product instead of a Postgres
+round trip. Matrices are persisted under <documents_path>/<project_id>/.index
+as generation directories (embeddings, chunk ids, document ids and the corpus
+version they reflect). The `vectors` symlink names the current generation and
+is swapped atomically. Embeddings are memory-mapped on load, and other
+workers notice a new generation through the link and reload.
+
+Writers hold the project's file lock (project_lock) around load-modify-save,
+so concurrent ingestions and deletes in any worker can't lose each other's
+updates. An index whose corpus version is behind the project's is rebuilt
+from the database.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import shutil
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+
+from app.models.chunk import Chunk
+from app.models.document import Document
+from app.services.cache import LRUCache
+from app.services.retrieval_cache import get_corpus_version
+from app.config import get_settings
+
+settings = get_settings()
+
+CURRENT_LINK = "vectors"
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNK_IDS_FILE = "chunk_ids.npy"
+DOCUMENT_IDS_FILE = "document_ids.npy"
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+# Generations load_generation retries when one is replaced mid-load
+LOAD_ATTEMPTS = 3
+
+
+def index_dir(project_id: uuid.UUID) -> Path:
+    return Path(settings.documents_path) / str(project_id) / ".index"
+
+
+@contextmanager
+def project_lock(project_id: uuid.UUID):
+    """
+    Exclusive lock on a project's persisted indexes, across threads and
+    workers. Not reentrant: code holding it must not take it again.
+    """
+    directory = index_dir(project_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_FILE, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _current_generation(project_id: uuid.UUID) -> str | None:
+    try:
+        return os.readlink(index_dir(project_id) / CURRENT_LINK)
+    except OSError:
+        return None
+
+
+def uuid_array(ids: list[uuid.UUID]) -> np.ndarray:
+    # V16 rather than S16: bytes dtypes drop trailing NULs, truncating some uuids
+    return np.array([i.bytes for i in ids], dtype="V16").reshape(len(ids))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, settings.embedding_dimension)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+@dataclass
+class ProjectVectorIndex:
+    project_id: uuid.UUID
+    embeddings: np.ndarray  # (n, dim) float32, rows L2-normalized
+    chunk_ids: np.ndarray  # (n,) V16 uuid bytes
+    document_ids: np.ndarray  # (n,) V16 uuid bytes
+    corpus_version: int = 0  # projects.corpus_version the contents reflect
+    generation: str | None = None  # directory it was loaded from or saved to
+
+    @property
+    def nbytes(self) -> int:
+        return self.embeddings.nbytes + self.chunk_ids.nbytes + self.document_ids.nbytes
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        document_ids: list[uuid.UUID] | None = None,
+    ) -> list[tuple[uuid.UUID, uuid.UUID, float]]:
+        """Exact cosine search returning (chunk_id, document_id, similarity)."""
+        query = _normalize(query_embedding)[0]
+        similarities = self.embeddings @ query
+
+        if document_ids:
+            mask = np.isin(self.document_ids, uuid_array(document_ids))
+            similarities = np.where(mask, similarities, -np.inf)
+
+        k = min(top_k, len(similarities))
+        if k == 0:
+            return []
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+
+        return [
+            (
+                uuid.UUID(bytes=bytes(self.chunk_ids[i])),
+                uuid.UUID(bytes=bytes(self.document_ids[i])),
+                float(similarities[i]),
+            )
+            for i in top
+            if similarities[i] != -np.inf
+        ]
+
+    def save(self) -> None:
+        """Write a new generation and switch the link to it; callers hold project_lock."""
+        directory = index_dir(self.project_id)
+        generation = f"{CURRENT_LINK}-{uuid.uuid4().hex}"
+        path = directory / generation
+        path.mkdir(parents=True)
+        np.save(path / EMBEDDINGS_FILE, self.embeddings)
+        np.save(path / CHUNK_IDS_FILE, self.chunk_ids)
+        np.save(path / DOCUMENT_IDS_FILE, self.document_ids)
+        (path / META_FILE).write_text(json.dumps({"corpus_version": self.corpus_version}))
+
+        link = directory / f"{CURRENT_LINK}.tmp"
+        link.unlink(missing_ok=True)
+        os.symlink(generation, link)
+        os.replace(link, directory / CURRENT_LINK)
+        self.generation = generation
+        # Readers that mapped an old generation keep their mapping
+        _remove_generations(directory, keep=generation)
+
+    @classmethod
+    def load(cls, project_id: uuid.UUID) -> "ProjectVectorIndex | None":
+        for _ in range(LOAD_ATTEMPTS):
+            generation = _current_generation(project_id)
+            if generation is None:
+                return None
+            path = index_dir(project_id) / generation
+            try:
+                meta = json.loads((path / META_FILE).read_text())
+                embeddings = np.load(path / EMBEDDINGS_FILE, mmap_mode="r")
+                chunk_ids = np.load(path / CHUNK_IDS_FILE)
+                document_ids = np.load(path / DOCUMENT_IDS_FILE)
+            except FileNotFoundError:
+                continue  # replaced and removed while loading; read the new one
+            return cls(
+                project_id, embeddings, chunk_ids, document_ids, meta["corpus_version"], generation
+            )
+        return None
+
+
+def _remove_generations(directory: Path, keep: str | None = None) -> None:
+    for entry in directory.iterdir():
+        if entry.name.startswith(f"{CURRENT_LINK}-") and entry.name != keep:
+            shutil.rmtree(entry, ignore_errors=True)
+    # Files of the single-generation layout
+    for name in (EMBEDDINGS_FILE, CHUNK_IDS_FILE, DOCUMENT_IDS_FILE):
+        (directory / name).unlink(missing_ok=True)
+
+
+class VectorIndexRegistry:
+    """Loaded project indexes, evicted least-recently-used past a memory budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._indexes: OrderedDict[uuid.UUID, ProjectVectorIndex] = OrderedDict()
+        self._locks: dict[uuid.UUID, asyncio.Lock] = {}
+        # Projects over the size threshold, rechecked every few minutes
+        self._oversized = LRUCache(maxsize=1024, ttl=300)
+
+    async def get(self, db: AsyncSession, project_id: uuid.UUID) -> ProjectVectorIndex | None:
+        """
+        Return the project's index, loading it from disk or building it from
+        the database on first use. None if the project is over the size
+        threshold, in which case callers use pgvector.
+        """
+        if self._oversized.get(project_id):
+            return None
+
+        corpus_version = await get_corpus_version(db, project_id)
+        lock = self._locks.setdefault(project_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(project_id)
+            if (
+                index is not None
+                and index.generation == _current_generation(project_id)
+                and index.corpus_version >= corpus_version
+            ):
+                self._indexes.move_to_end(project_id)
+                return index
+
+            index = await asyncio.to_thread(ProjectVectorIndex.load, project_id)
+            # Ahead only while the change it includes is being committed
+            if index is None or index.corpus_version < corpus_version:
+                index = await build_index(db, project_id)
+            if index is None:
+                self._indexes.pop(project_id, None)
+                self._oversized.set(project_id, True)
+                return None
+
+            self._store(index)
+            return index
+
+    def _store(self, index: ProjectVectorIndex) -> None:
+        self._indexes[index.project_id] = index
+        self._indexes.move_to_end(index.project_id)
+        while len(self._indexes) > 1 and self.memory_bytes() > self.max_bytes:
+            self._indexes.popitem(last=False)
+
+    def memory_bytes(self) -> int:
+        return sum(index.nbytes for index in self._indexes.values())
+
+    def evict(self, project_id: uuid.UUID) -> None:
+        self._indexes.pop(project_id, None)
+        self._oversized.pop(project_id)
+
+
+registry = VectorIndexRegistry(max_bytes=settings.vector_index_memory_mb * 1024 * 1024)
+
+
+async def build_index(db: AsyncSession, project_id: uuid.UUID) -> ProjectVectorIndex | None:
+    """Build and persist a project's index from the chunks table."""
+    # Read before the rows, so the rows include at least this version
+    corpus_version = await get_corpus_version(db, project_id)
+    count = await db.scalar(
+        select(func.count()).select_from(Chunk).where(Chunk.project_id == project_id)
+    )
+    if count > settings.vector_index_max_chunks:
+        return None
+
+    result = await db.execute(
+        select(Chunk.id, Chunk.document_id, Chunk.embedding)
+        .join(Document, Chunk.document_id == Document.id)
+        .where(
+            Chunk.project_id == project_id,
+            Chunk.embedding.is_not(None),
+            Document.deleted_at.is_(None),
+        )
+    )
+    rows = result.all()
+
+    index = ProjectVectorIndex(
+        project_id=project_id,
+        embeddings=_normalize(np.array([row.embedding for row in rows], dtype=np.float32)),
+        chunk_ids=uuid_array([row.id for row in rows]),
+        document_ids=uuid_array([row.document_id for row in rows]),
+        corpus_version=corpus_version,
+    )
+    return await asyncio.to_thread(_save_unless_newer, index)
+
+
+def _save_unless_newer(index: ProjectVectorIndex) -> ProjectVectorIndex:
+    """Persist a freshly built index unless another writer saved a newer one meanwhile."""
+    with project_lock(index.project_id):
+        current = ProjectVectorIndex.load(index.project_id)
+        if current is not None and current.corpus_version >= index.corpus_version:
+            return current
+        index.save()
+        return index
+
+
+async def search_project_index(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    query_embedding: np.ndarray,
+    top_k: int,
+    document_ids: list[uuid.UUID] | None = None,
+) -> list[tuple[uuid.UUID, uuid.UUID, float]] | None:
+    """Exact search over the project's in-process index, or None to fall back to pgvector."""
+    index = await registry.get(db, project_id)
+    if index is None:
+        return None
+    return await asyncio.to_thread(index.search, query_embedding, top_k, document_ids)
+
+
+def _update(
+    project_id: uuid.UUID,
+    corpus_version: int,
+    change: Callable[[ProjectVectorIndex], bool],
+) -> None:
+    """
+    Apply the change made by corpus_version to a persisted index, under the
+    project lock. change returns False if the index should be dropped
+    instead. An index that missed an earlier version is dropped too; it is
+    rebuilt from the database on the next search.
+    """
+    with project_lock(project_id):
+        index = ProjectVectorIndex.load(project_id)
+        if index is None:
+            return
+        if index.corpus_version != corpus_version - 1 or not change(index):
+            _remove_generations(index_dir(project_id))
+            (index_dir(project_id) / CURRENT_LINK).unlink(missing_ok=True)
+        else:
+            index.corpus_version = corpus_version
+            index.save()
+    registry.evict(project_id)
+
+
+def add_chunks(
+    project_id: uuid.UUID,
+    chunk_ids: list[uuid.UUID],
+    document_ids: list[uuid.UUID],
+    embeddings: np.ndarray,
+    corpus_version: int,
+) -> None:
+    """
+    Append newly stored chunks to a persisted index. Projects without one are
+    skipped; their index is built with these chunks on first search.
+    """
+
+    def append(index: ProjectVectorIndex) -> bool:
+        if len(index) + len(chunk_ids) > settings.vector_index_max_chunks:
+            return False
+        index.embeddings = np.concatenate([index.embeddings, _normalize(embeddings)])
+        index.chunk_ids = np.concatenate([index.chunk_ids, uuid_array(chunk_ids)])
+        index.document_ids = np.concatenate([index.document_ids, uuid_array(document_ids)])
+        return True
+
+    _update(project_id, corpus_version, append)
+
+
+def remove_documents(
+    project_id: uuid.UUID,
+    document_ids: list[uuid.UUID],
+    corpus_version: int,
+) -> None:
+    """Drop a document's chunks from a persisted index."""
+
+    def remove(index: ProjectVectorIndex) -> bool:
+        keep = ~np.isin(index.document_ids, uuid_array(document_ids))
+        index.embeddings = np.ascontiguousarray(index.embeddings[keep])
+        index.chunk_ids = index.chunk_ids[keep]
+        index.document_ids = index.document_ids[keep]
+        return True
+
+    _update(project_id, corpus_version, remove)
+
+
+def drop_project_index(project_id: uuid.UUID) -> None:
+    registry.evict(project_id)
+    if not index_dir(project_id).exists():
+        return
+    with project_lock(project_id):
+        _remove_generations(index_dir(project_id))
+        (index_dir(project_id) / CURRENT_LINK).unlink(missing_ok=True)
@@ -0,0 +1,200 @@
+"""
+Per-conversation retrieval working set.
+
+Follow-up turns mostly revisit the chunks the previous turns retrieved. Each
+conversation keeps those chunks with their embeddings in memory; a new turn is
+scored against them first and only falls back to a project-wide hybrid_search
+when too few of them are relevant. A hit with fewer than top_k chunks is
+answered as is, and the set is topped up from hybrid_search in the background
+for the next turn. Global results are merged back in, so the set follows the
+conversation. Sets expire after settings.working_set_ttl_seconds
+of inactivity and are discarded when the project's corpus version changes.
+"""
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.services import retrieval_cache
+from app.services.cache import LRUCache
+from app.services.embeddings import get_query_embedding
+from app.services.retrieval import (
+    RetrievedChunk,
+    RetrievalTimings,
+    hybrid_search,
+    load_chunk_embeddings,
+)
+from app.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class WorkingSet:
+    corpus_version: int
+    chunks: list[RetrievedChunk] = field(default_factory=list)
+    # Rows L2-normalized, aligned with chunks
+    vectors: np.ndarray = field(
+        default_factory=lambda: np.zeros((0, settings.embedding_dimension), dtype=np.float32)
+    )
+
+    def rank(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        document_ids: list[uuid.UUID] | None = None,
+    ) -> list[RetrievedChunk]:
+        """Chunks above settings.working_set_min_similarity, best first."""
+        if not self.chunks:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        similarities = self.vectors @ (query / norm)
+
+        results = []
+        for i in np.argsort(-similarities):
+            if similarities[i] < settings.working_set_min_similarity or len(results) == top_k:
+                break
+            chunk = self.chunks[i]
+            if document_ids and chunk.document_id not in document_ids:
+                continue
+            relevance = max(0.0, (1 + float(similarities[i])) / 2)
+            results.append(
+                replace(
+                    chunk,
+                    score=relevance,
+                    retrieval_relevance=relevance,
+                    retrieval_rank=len(results) + 1,
+                    answer_support=None,
+                    cited_in_answer=False,
+                )
+            )
+        return results
+
+    def add(self, chunks: list[RetrievedChunk], vectors: dict[uuid.UUID, np.ndarray]) -> None:
+        """Merge newly retrieved chunks in, keeping the most recent up to the size cap."""
+        known = {chunk.chunk_id for chunk in self.chunks}
+        new = [c for c in chunks if c.chunk_id not in known and c.chunk_id in vectors]
+        if not new:
+            return
+
+        new_vectors = np.array([vectors[c.chunk_id] for c in new], dtype=np.float32)
+        norms = np.linalg.norm(new_vectors, axis=1, keepdims=True)
+        new_vectors = np.divide(
+            new_vectors, norms, out=np.zeros_like(new_vectors), where=norms > 0
+        )
+
+        limit = settings.working_set_max_chunks
+        self.chunks = (self.chunks + [replace(c) for c in new])[-limit:]
+        self.vectors = np.concatenate([self.vectors, new_vectors])[-limit:]
+
+
+working_sets = LRUCache(maxsize=1024, ttl=settings.working_set_ttl_seconds)
+# Background top-ups by conversation; held so they aren't garbage collected
+_refreshes: dict[uuid.UUID, asyncio.Task] = {}
+
+
+async def conversation_search(
+    db: AsyncSession,
+    query: str,
+    project_id: uuid.UUID,
+    conversation_id: uuid.UUID,
+    top_k: int | None = None,
+    document_ids: list[uuid.UUID] | None = None,
+    timings: RetrievalTimings | None = None,
+) -> list[RetrievedChunk]:
+    """
+    Retrieve for a conversation turn, answering from the working set when at
+    least settings.working_set_min_hits of its chunks are relevant.
+    """
+    if document_ids is not None and not document_ids:
+        return []  # the turn's scope matched no documents
+    if not settings.working_set_enabled:
+        return await hybrid_search(
+            db, query, project_id, top_k, document_ids=document_ids, timings=timings
+        )
+
+    top_k = top_k or settings.retrieval_top_k
+    timings = timings if timings is not None else RetrievalTimings()
+    start = time.perf_counter()
+
+    corpus_version = await retrieval_cache.get_corpus_version(db, project_id)
+    working_set = working_sets.get(conversation_id)
+    if working_set is None or working_set.corpus_version != corpus_version:
+        working_set = WorkingSet(corpus_version=corpus_version)
+
+    if working_set.chunks:
+        try:
+            query_embedding = await get_query_embedding(query)
+        except Exception:
+            query_embedding = None  # hybrid_search degrades to keyword results
+        if query_embedding is not None:
+            hits = working_set.rank(query_embedding, top_k, document_ids)
+            if len(hits) >= min(settings.working_set_min_hits, top_k):
+                timings.working_set_hit = True
+                if len(hits) < top_k:
+                    _top_up_in_background(
+                        query, project_id, conversation_id, working_set, top_k, document_ids
+                    )
+                timings.total_ms = (time.perf_counter() - start) * 1000
+                working_sets.set(conversation_id, working_set)  # refresh expiry
+                return hits
+
+    results = await hybrid_search(
+        db, query, project_id, top_k, document_ids=document_ids, timings=timings
+    )
+    await _remember(db, project_id, working_set, results)
+    working_sets.set(conversation_id, working_set)
+    return results
+
+
+def _top_up_in_background(
+    query: str,
+    project_id: uuid.UUID,
+    conversation_id: uuid.UUID,
+    working_set: WorkingSet,
+    top_k: int,
+    document_ids: list[uuid.UUID] | None,
+) -> None:
+    """Merge this turn's global results into the set for the next turn, off the request path."""
+    if conversation_id in _refreshes:
+        return  # one top-up per conversation at a time
+    task = asyncio.create_task(_top_up(query, project_id, working_set, top_k, document_ids))
+    _refreshes[conversation_id] = task
+    task.add_done_callback(lambda _: _refreshes.pop(conversation_id, None))
+
+
+async def _top_up(
+    query: str,
+    project_id: uuid.UUID,
+    working_set: WorkingSet,
+    top_k: int,
+    document_ids: list[uuid.UUID] | None,
+) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            results = await hybrid_search(db, query, project_id, top_k, document_ids=document_ids)
+            await _remember(db, project_id, working_set, results)
+    except Exception:
+        pass  # The set stays as it was; a later miss searches globally anyway
+
+
+async def _remember(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    working_set: WorkingSet,
+    chunks: list[RetrievedChunk],
+) -> None:
+    vectors = await load_chunk_embeddings(db, project_id, [chunk.chunk_id for chunk in chunks])
+    working_set.add(chunks, vectors)
+
+
+def discard(conversation_id: uuid.UUID) -> None:
+    working_sets.pop(conversation_id)
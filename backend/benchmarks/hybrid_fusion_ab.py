@@ -0,0 +1,131 @@
+"""
+A/B latency comparison of Python-side and SQL-side hybrid fusion.
+
+Embeds each query once up front, then times the database part of retrieval
+under both modes on the same embeddings:
+
+  python  vector_search and keyword_search on two connections, merge_results,
+          then load_chunk_contents for the survivors
+  sql     fused_search (one statement, only top_k rows returned)
+
+Usage (from backend/):
+    python benchmarks/hybrid_fusion_ab.py --project-id <uuid> [--queries-file q.txt]
+        [--top-k 40] [--repeat 5]
+
+Queries default to a set of common diligence questions. Embedding the queries
+requires OPENAI_API_KEY.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+# Add current directory to path so 'app' is resolvable
+sys.path.append(os.getcwd())
+
+from app.database import AsyncSessionLocal  # noqa: E402
+from app.services.embeddings import generate_embeddings  # noqa: E402
+from app.services.retrieval import (  # noqa: E402
+    chunk_text_cache,
+    fused_search,
+    keyword_search,
+    load_chunk_contents,
+    merge_results,
+    vector_search,
+)
+
+DEFAULT_QUERIES = [
+    "What is the lease term?",
+    "Are there any environmental risks?",
+    "What is the net operating income?",
+    "What is the appraised market value?",
+    "Who is responsible for CAM charges?",
+    "Are there any recorded easements or liens?",
+    "What are the renewal options for the tenant?",
+    "What is the cap rate used in the appraisal?",
+]
+
+
+async def python_fusion(query, embedding, project_id, top_k):
+    async def vector_leg():
+        async with AsyncSessionLocal() as db:
+            return await vector_search(db, embedding, project_id, top_k * 2)
+
+    async def keyword_leg():
+        async with AsyncSessionLocal() as db:
+            return await keyword_search(db, query, project_id, top_k * 2)
+
+    vector_results, keyword_results = await asyncio.gather(vector_leg(), keyword_leg())
+    ranked = merge_results(vector_results, keyword_results, top_k)
+    async with AsyncSessionLocal() as db:
+        results = await load_chunk_contents(db, ranked, project_id)
+    rows = len(vector_results) + len(keyword_results) + len(results)
+    return results, rows
+
+
+async def sql_fusion(query, embedding, project_id, top_k):
+    async with AsyncSessionLocal() as db:
+        results = await fused_search(db, query, embedding, project_id, top_k)
+    return results, len(results)
+
+
+async def measure(mode, fn, queries, embeddings, project_id, top_k, repeat):
+    latencies = []
+    rows_fetched = []
+    results_by_query = {}
+    for query, embedding in zip(queries, embeddings):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results, rows = await fn(query, embedding, project_id, top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            rows_fetched.append(rows)
+        results_by_query[query] = [r.chunk_id for r in results]
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "rows": statistics.mean(rows_fetched),
+    }, results_by_query
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--project-id", type=uuid.UUID, required=True)
+    parser.add_argument("--queries-file")
+    parser.add_argument("--top-k", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    embeddings = await generate_embeddings(queries)
+    # Time the content fetch rather than in-process cache hits
+    chunk_text_cache.maxsize = 0
+
+    python_stats, python_ids = await measure(
+        "python", python_fusion, queries, embeddings, args.project_id, args.top_k, args.repeat
+    )
+    sql_stats, sql_ids = await measure(
+        "sql", sql_fusion, queries, embeddings, args.project_id, args.top_k, args.repeat
+    )
+
+    print(f"{'mode':<8}{'p50 ms':>9}{'p95 ms':>9}{'rows/query':>12}")
+    for stats in (python_stats, sql_stats):
+        print(f"{stats['mode']:<8}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['rows']:>12.1f}")
+
+    overlap = statistics.mean(
+        len(set(python_ids[q]) & set(sql_ids[q])) / max(len(python_ids[q]), 1) for q in queries
+    )
+    print(f"\nResult overlap between modes: {overlap:.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
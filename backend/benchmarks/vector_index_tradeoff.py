@@ -0,0 +1,143 @@
+"""
+Benchmark the recall/latency tradeoff of the vector search profiles.
+
+Samples stored chunk embeddings from a project as queries, computes exact
+top-k neighbours with index scans disabled, then times vector_search under
+each profile in SEARCH_PROFILES and reports recall@k against the exact set.
+
+Usage (from backend/):
+    python benchmarks/vector_index_tradeoff.py --project-id <uuid> [--queries 50]
+        [--top-k 80] [--csv results.csv] [--plot tradeoff.png]
+
+Plotting requires matplotlib, which is not a runtime dependency.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import statistics
+import sys
+import time
+import uuid
+
+# Add current directory to path so 'app' is resolvable
+sys.path.append(os.getcwd())
+
+import numpy as np  # noqa: E402
+from sqlalchemy import select, text, func  # noqa: E402
+
+from app.database import AsyncSessionLocal  # noqa: E402
+from app.models.chunk import Chunk  # noqa: E402
+from app.services.retrieval import SEARCH_PROFILES, vector_search  # noqa: E402
+
+
+async def sample_queries(project_id: uuid.UUID, count: int) -> list[np.ndarray]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Chunk.embedding)
+            .where(Chunk.project_id == project_id, Chunk.embedding.is_not(None))
+            .order_by(func.random())
+            .limit(count)
+        )
+        return [row.embedding for row in result.all()]
+
+
+async def exact_neighbours(
+    project_id: uuid.UUID, query_embedding: np.ndarray, top_k: int
+) -> set[uuid.UUID]:
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SET LOCAL enable_indexscan = off"))
+        results = await vector_search(db, query_embedding, project_id, top_k)
+        return {r.chunk_id for r in results}
+
+
+async def run_profile(
+    profile: str,
+    project_id: uuid.UUID,
+    queries: list[np.ndarray],
+    truth: list[set[uuid.UUID]],
+    top_k: int,
+) -> dict:
+    latencies = []
+    recalls = []
+    for query_embedding, expected in zip(queries, truth):
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            results = await vector_search(
+                db, query_embedding, project_id, top_k, search_profile=profile
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+        found = {r.chunk_id for r in results}
+        recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+
+    latencies.sort()
+    return {
+        "profile": profile,
+        "ef_search": SEARCH_PROFILES[profile].ef_search,
+        "probes": SEARCH_PROFILES[profile].probes,
+        "recall": statistics.mean(recalls),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+def plot(rows: list[dict], path: str) -> None:
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib not installed, skipping plot")
+        return
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.plot([r["p50_ms"] for r in rows], [r["recall"] for r in rows], marker="o")
+    for r in rows:
+        ax.annotate(r["profile"], (r["p50_ms"], r["recall"]))
+    ax.set_xlabel("p50 latency (ms)")
+    ax.set_ylabel("recall@k")
+    ax.set_title("Vector search profiles")
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"Plot written to {path}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--project-id", type=uuid.UUID, required=True)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=80)
+    parser.add_argument("--csv")
+    parser.add_argument("--plot")
+    args = parser.parse_args()
+
+    queries = await sample_queries(args.project_id, args.queries)
+    if not queries:
+        print("No embedded chunks found for project")
+        return
+
+    truth = [await exact_neighbours(args.project_id, q, args.top_k) for q in queries]
+    rows = [
+        await run_profile(profile, args.project_id, queries, truth, args.top_k)
+        for profile in SEARCH_PROFILES
+    ]
+
+    print(f"{'profile':<12}{'ef_search':>10}{'probes':>8}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for r in rows:
+        print(
+            f"{r['profile']:<12}{r['ef_search']:>10}{r['probes']:>8}"
+            f"{r['recall']:>9.3f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+        )
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    if args.plot:
+        plot(rows, args.plot)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
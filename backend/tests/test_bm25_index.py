@@ -0,0 +1,72 @@
+"""Tests for the in-process BM25 index."""
+import uuid
+
+import pytest
+
+from app.services import bm25_index
+from app.services.bm25_index import ProjectBM25Index, tokenize
+
+LEASE = uuid.uuid4()
+APPRAISAL = uuid.uuid4()
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    monkeypatch.setattr(bm25_index.settings, "documents_path", str(tmp_path))
+    index = ProjectBM25Index(project_id=uuid.uuid4())
+    index.add(
+        [uuid.uuid4() for _ in range(4)],
+        [LEASE, LEASE, APPRAISAL, APPRAISAL],
+        [
+            "Tenant pays CAM charges monthly in addition to base rent.",
+            "The lease term is ten years with two renewal options.",
+            "Net operating income (NOI) supports the appraised value.",
+            "The appraisal reviews comparable sales and market rent.",
+        ],
+    )
+    return index
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("The CAM charges of the leases") == ["cam", "charge", "lease"]
+
+
+def test_rare_terms_rank_their_chunk_first(index):
+    hits = index.search("What is the NOI?", top_k=5)
+
+    assert len(hits) == 1
+    assert hits[0][0] == uuid.UUID(bytes=bytes(index.chunk_ids[2]))
+
+
+def test_document_filter_and_tombstones(index):
+    assert {doc for _, doc, _ in index.search("rent", top_k=5)} == {LEASE, APPRAISAL}
+    assert {doc for _, doc, _ in index.search("rent", 5, [APPRAISAL])} == {APPRAISAL}
+
+    index.remove_documents([LEASE])
+
+    assert {doc for _, doc, _ in index.search("rent", top_k=5)} == {APPRAISAL}
+    # Half the index was tombstoned, so it has been compacted
+    assert len(index.chunk_ids) == 2
+
+
+def test_save_and_load_round_trip(index):
+    index.save()
+
+    loaded = ProjectBM25Index.load(index.project_id)
+
+    assert loaded.search("renewal options", 5) == index.search("renewal options", 5)
+
+
+def test_versioned_updates_apply_in_order_and_drop_on_a_gap(index):
+    index.save()
+
+    bm25_index.remove_documents(index.project_id, [LEASE], 1)
+
+    loaded = ProjectBM25Index.load(index.project_id)
+    assert loaded.corpus_version == 1
+    assert {doc for _, doc, _ in loaded.search("rent", top_k=5)} == {APPRAISAL}
+
+    # Version 2 never reached the index, so it can't be patched to 3
+    bm25_index.remove_documents(index.project_id, [APPRAISAL], 3)
+
+    assert ProjectBM25Index.load(index.project_id) is None
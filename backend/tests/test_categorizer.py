@@ -0,0 +1,15 @@
+"""Tests for document and query categorization."""
+from app.models.document import DocumentCategory
+from app.services.ingestion.categorizer import classify_query
+
+
+def test_classify_query_scopes_cap_rate_to_financial_and_appraisal():
+    assert set(classify_query("What's the cap rate?")) == {
+        DocumentCategory.financial,
+        DocumentCategory.appraisal,
+    }
+
+
+def test_classify_query_requires_capitals_for_acronyms():
+    assert classify_query("What is the FAR?") == [DocumentCategory.zoning]
+    assert classify_query("How far is the site from the highway?") == []
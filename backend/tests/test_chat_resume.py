@@ -0,0 +1,72 @@
+"""Tests for storing failed answers and resuming their streams."""
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.message import MessageStatus
+from app.services import generations
+
+try:
+    from app.routers import chat
+except OSError:  # app.routers loads weasyprint, which needs pango installed
+    pytest.skip("weasyprint system libraries are unavailable", allow_module_level=True)
+
+PROJECT_ID = uuid.uuid4()
+
+
+class FakeSession:
+    def __init__(self, message=None):
+        self.added = []
+        self.committed = False
+        self.message = message
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        self.committed = True
+
+    async def rollback(self):
+        pass
+
+    async def execute(self, statement):
+        return SimpleNamespace(scalar_one_or_none=lambda: self.message)
+
+
+async def test_errored_answer_is_stored_and_served_on_reconnect(monkeypatch):
+    async def failing_search(*args, **kwargs):
+        raise RuntimeError("retrieval unavailable")
+
+    monkeypatch.setattr(chat, "conversation_search", failing_search)
+    db = FakeSession()
+    conversation = SimpleNamespace(id=uuid.uuid4())
+    generation = generations.Generation(message_id=uuid.uuid4(), project_id=PROJECT_ID)
+
+    events = [
+        json.loads(event)
+        async for event in chat.stream_response(
+            db, SimpleNamespace(id=PROJECT_ID), conversation, "What is the rent?", generation
+        )
+    ]
+
+    assert [event["type"] for event in events] == ["start", "error"]
+    [stored] = db.added
+    assert db.committed
+    assert stored.id == generation.message_id
+    assert stored.status == MessageStatus.errored
+
+    # The event log has expired; the stored message is served instead
+    response = await chat.resume_stream(PROJECT_ID, stored.id, None, FakeSession(stored))
+    [complete] = [json.loads(event) async for event in response.body_iterator]
+    assert complete["type"] == "complete"
+    assert complete["status"] == "errored"
+
+
+async def test_resume_of_an_unknown_message_is_not_found():
+    with pytest.raises(HTTPException) as error:
+        await chat.resume_stream(PROJECT_ID, uuid.uuid4(), None, FakeSession())
+
+    assert error.value.status_code == 404
@@ -0,0 +1,59 @@
+"""Tests for incremental citation parsing."""
+import uuid
+
+from app.services.citations import CitationParser, extract_citations
+from app.services.retrieval import RetrievedChunk
+
+LEASE_ID = uuid.uuid4()
+DEED_ID = uuid.uuid4()
+
+
+def make_chunk(document_id: uuid.UUID, name: str, page: int, section: str | None = None) -> RetrievedChunk:
+    return RetrievedChunk(
+        chunk_id=uuid.uuid4(),
+        document_id=document_id,
+        document_name=name,
+        content="...",
+        page_number=page,
+        section=section,
+        score=0.5,
+    )
+
+
+CHUNKS = [
+    make_chunk(LEASE_ID, "lease.pdf", 3, "Rent"),
+    make_chunk(LEASE_ID, "lease.pdf", 7, "Insurance"),
+    make_chunk(DEED_ID, "deed.pdf", 1),
+]
+
+
+def test_marker_split_across_tokens_is_emitted_once_complete():
+    parser = CitationParser(CHUNKS)
+    tokens = ["Rent is due monthly [Doc", "ument: lease", ".pdf, Page 7", "]. Done", "."]
+
+    emitted = [[c.page for c in parser.feed(token)] for token in tokens]
+
+    assert emitted == [[], [], [], [7], []]
+    assert [c.section for c in parser.citations] == ["Insurance"]
+
+
+def test_citations_follow_order_of_mention_without_duplicates():
+    response = (
+        "See [Document: lease.pdf, Page 7, Section: Insurance] and "
+        "[Document: lease.pdf, Page 3]. Again [Document: lease.pdf, Page 7]."
+    )
+
+    assert [c.page for c in extract_citations(response, CHUNKS)] == [7, 3]
+
+
+def test_unknown_page_cites_every_retrieved_page_of_the_document():
+    citations = extract_citations("Per [Document: LEASE.pdf, Page 99].", CHUNKS)
+
+    assert [(c.document_id, c.page) for c in citations] == [(LEASE_ID, 3), (LEASE_ID, 7)]
+
+
+def test_unknown_documents_and_unclosed_markers_are_ignored():
+    parser = CitationParser(CHUNKS)
+
+    assert parser.feed("[Document: other.pdf, Page 1] [Document: " + "x" * 600) == []
+    assert parser.feed("[Document: lease.pdf, Page 3]") != []
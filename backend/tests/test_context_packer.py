@@ -0,0 +1,76 @@
+"""Tests for token-budgeted context packing."""
+import uuid
+
+import pytest
+
+from app.services import context_packer
+from app.services.retrieval import RetrievedChunk
+
+DOCUMENT_ID = uuid.uuid4()
+
+
+def make_chunk(content: str, chunk_index: int | None = None, page_number: int = 1) -> RetrievedChunk:
+    return RetrievedChunk(
+        chunk_id=uuid.uuid4(),
+        document_id=DOCUMENT_ID,
+        document_name="lease.pdf",
+        content=content,
+        page_number=page_number,
+        section=None,
+        score=0.5,
+        chunk_index=chunk_index,
+    )
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # tiktoken downloads its encoding on first use; count words instead
+    monkeypatch.setattr(context_packer, "count_tokens", lambda text: len(text.split()))
+    monkeypatch.setattr(context_packer.settings, "context_mmr_lambda", None)
+
+
+def test_overlapping_neighbours_are_merged_into_one_block():
+    first = make_chunk("Tenant pays base rent monthly. Rent escalates three percent annually.", 0)
+    second = make_chunk("Rent escalates three percent annually. Late fees accrue after five days.", 1)
+
+    packed = context_packer.pack_context([second, first], token_budget=1000)
+
+    assert packed.chunks == [second, first]
+    assert packed.text.count("[Document: lease.pdf, Page 1]") == 1
+    assert packed.text.count("escalates") == 1
+    assert packed.text.endswith("Late fees accrue after five days.")
+    # The second-admitted neighbour only pays for its novel words
+    assert packed.tokens_used == 11 + 20 + 5 + 20
+
+
+def test_exact_duplicates_are_dropped():
+    original = make_chunk("Landlord maintains the roof and structure.", 3)
+    duplicate = make_chunk("Landlord  maintains the ROOF and structure.", page_number=9)
+
+    packed = context_packer.pack_context([original, duplicate], token_budget=1000)
+
+    assert packed.chunks == [original]
+    assert packed.dropped_chunks == [duplicate]
+
+
+def test_lower_ranked_chunks_are_dropped_past_the_budget():
+    chunks = [make_chunk(f"clause {i} " + "word " * 30, page_number=i) for i in range(4)]
+
+    packed = context_packer.pack_context(chunks, token_budget=120)
+
+    assert packed.chunks == chunks[:2]
+    assert packed.dropped_chunks == chunks[2:]
+    assert packed.tokens_used <= 120
+    assert "clause 2" not in packed.text
+
+
+def test_budget_prefers_provider_model_override(monkeypatch):
+    monkeypatch.setattr(
+        context_packer.settings,
+        "context_token_budgets",
+        {"openai": 24_000, "openai:gpt-4o-mini": 8_000},
+    )
+
+    assert context_packer.context_token_budget("openai", "gpt-4o-mini") == 8_000
+    assert context_packer.context_token_budget("openai", "gpt-4o") == 24_000
+    assert context_packer.context_token_budget("ollama") == context_packer.settings.context_token_budget
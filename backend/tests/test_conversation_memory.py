@@ -0,0 +1,32 @@
+"""Tests for rolling conversation summaries."""
+import pytest
+
+from app.services import conversation_memory
+
+
+@pytest.fixture(autouse=True)
+def summary_window(monkeypatch):
+    monkeypatch.setattr(conversation_memory.settings, "conversation_summary_keep_messages", 10)
+    monkeypatch.setattr(conversation_memory.settings, "conversation_summary_batch_messages", 6)
+
+
+def test_nothing_is_folded_until_a_full_batch_leaves_the_window():
+    assert conversation_memory.messages_to_fold(total=15, covered=0) == 0
+    assert conversation_memory.messages_to_fold(total=16, covered=0) == 6
+    assert conversation_memory.messages_to_fold(total=21, covered=6) == 0
+
+
+def test_a_lagging_summary_is_folded_a_batch_at_a_time():
+    assert conversation_memory.messages_to_fold(total=40, covered=6) == 6
+    assert conversation_memory.messages_to_fold(total=40, covered=24) == 6
+    assert conversation_memory.messages_to_fold(total=40, covered=30) == 0
+
+
+def test_transcript_labels_roles_and_truncates_long_messages():
+    transcript = conversation_memory.format_transcript(
+        [("user", "What is the rent?"), ("assistant", "x" * 5000)]
+    )
+
+    user, assistant = transcript.split("\n\n")
+    assert user == "User: What is the rent?"
+    assert assistant == "Assistant: " + "x" * conversation_memory.MAX_MESSAGE_CHARS
@@ -0,0 +1,79 @@
+"""Tests for embedding helpers."""
+import asyncio
+
+import numpy as np
+
+from app.services import embeddings
+from app.services.embeddings import (
+    cosine_similarities,
+    generate_embeddings,
+    get_query_embedding,
+    normalize_query,
+    settings,
+)
+
+
+def test_cosine_similarities_scores_each_row_and_zeroes_empty_rows():
+    query = np.array([1.0, 0.0], dtype=np.float32)
+    matrix = np.array([[2.0, 0.0], [0.0, 3.0], [0.0, 0.0]], dtype=np.float32)
+
+    scores = cosine_similarities(query, matrix)
+
+    np.testing.assert_allclose(scores, [1.0, 0.0, 0.0])
+
+
+async def test_generate_embeddings_returns_float32_matrix_for_empty_input():
+    embeddings = await generate_embeddings([])
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (0, settings.embedding_dimension)
+
+
+def test_normalize_query_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_query("  What is the   lease term? ") == "what is the lease term"
+
+
+async def test_repeated_queries_are_embedded_once(monkeypatch):
+    calls = []
+
+    async def fake_embedding(text, model=None):
+        calls.append(text)
+        return np.ones(3, dtype=np.float32)
+
+    monkeypatch.setattr(embeddings, "generate_single_embedding", fake_embedding)
+    monkeypatch.setattr(settings, "query_embedding_cache_db", False)
+    embeddings.query_embedding_cache.clear()
+
+    first = await get_query_embedding("Any environmental risks?")
+    second = await get_query_embedding("any environmental risks")
+
+    assert calls == ["Any environmental risks?"]
+    assert second is first
+    assert embeddings.query_embedding_cache_stats()["hits"] >= 1
+
+
+async def test_shared_tier_write_does_not_block_the_query(monkeypatch):
+    stored = asyncio.Event()
+    release = asyncio.Event()
+
+    async def fake_embedding(text, model=None):
+        return np.ones(3, dtype=np.float32)
+
+    async def no_shared_embedding(key):
+        return None
+
+    async def slow_store(key, model, embedding):
+        await release.wait()
+        stored.set()
+
+    monkeypatch.setattr(embeddings, "generate_single_embedding", fake_embedding)
+    monkeypatch.setattr(embeddings, "_load_shared_embedding", no_shared_embedding)
+    monkeypatch.setattr(embeddings, "_store_shared_embedding", slow_store)
+    monkeypatch.setattr(settings, "query_embedding_cache_db", True)
+    embeddings.query_embedding_cache.clear()
+
+    await get_query_embedding("Any flood zone exposure?")
+
+    assert not stored.is_set()
+    release.set()
+    await asyncio.wait_for(stored.wait(), timeout=1)
@@ -0,0 +1,60 @@
+"""Tests for resumable generation logs."""
+import asyncio
+import uuid
+
+from app.services import generations
+
+PROJECT_ID = uuid.uuid4()
+
+
+async def take(follower, count):
+    return [await anext(follower) for _ in range(count)]
+
+
+async def test_reconnect_resumes_after_last_event_id():
+    generation = generations.start(uuid.uuid4(), PROJECT_ID)
+    for event in ("start", "The rent", " is due"):
+        generation.append(event)
+
+    first = generation.follow()
+    assert await take(first, 2) == [(0, "start"), (1, "The rent")]
+    await first.aclose()  # connection dropped
+
+    generation.append(" monthly.")
+    generations.finish(generation.message_id)
+
+    resumed = generations.get(PROJECT_ID, generation.message_id)
+    assert [event async for event in resumed.follow(after=1)] == [(2, " is due"), (3, " monthly.")]
+
+
+async def test_follower_receives_events_as_they_are_appended():
+    generation = generations.start(uuid.uuid4(), PROJECT_ID)
+    follower = asyncio.ensure_future(take(generation.follow(), 2))
+    await asyncio.sleep(0)
+
+    generation.append("start")
+    generation.append("token")
+
+    assert await asyncio.wait_for(follower, timeout=1) == [(0, "start"), (1, "token")]
+    generations.finish(generation.message_id)
+
+
+async def test_unfollowed_generation_is_cancelled_after_grace(monkeypatch):
+    monkeypatch.setattr(generations.settings, "stream_detach_grace_seconds", 0)
+    generation = generations.start(uuid.uuid4(), PROJECT_ID)
+    generation.append("start")
+
+    follower = generation.follow()
+    await anext(follower)
+    await follower.aclose()
+
+    await asyncio.wait_for(generation.cancelled.wait(), timeout=1)
+    generations.finish(generation.message_id)
+
+
+def test_logs_are_not_shared_across_projects():
+    generation = generations.start(uuid.uuid4(), PROJECT_ID)
+
+    assert generations.get(uuid.uuid4(), generation.message_id) is None
+    assert generations.cancel_local(uuid.uuid4(), generation.message_id) is False
+    generations.finish(generation.message_id)
@@ -0,0 +1,28 @@
+"""Tests for token-budgeted conversation history."""
+import pytest
+
+from app.services import history
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # tiktoken downloads its encoding on first use; count words instead
+    monkeypatch.setattr(history, "count_tokens", lambda text: len(text.split()))
+
+
+def message(role: str, words: int) -> dict:
+    return {"role": role, "content": " ".join(["word"] * words)}
+
+
+def test_newest_messages_are_kept_oldest_first():
+    newest_first = [message("user", 6), message("assistant", 6), message("user", 6)]
+
+    kept = history.fit_history(newest_first, token_budget=20)
+
+    assert kept == newest_first[1::-1]
+
+
+def test_an_older_message_is_not_kept_past_a_gap():
+    newest_first = [message("user", 5), message("assistant", 100), message("user", 1)]
+
+    assert history.fit_history(newest_first, token_budget=50) == newest_first[:1]
@@ -0,0 +1,48 @@
+"""Tests for provider prompt-cache request shaping."""
+from types import SimpleNamespace
+
+from app.services.llm import anthropic, openai
+
+
+def test_anthropic_breakpoints_cover_system_prompt_and_conversation():
+    messages = [
+        {"role": "system", "content": "You are a diligence assistant."},
+        {"role": "system", "content": "Summary of the earlier conversation:\nRent is $5k."},
+        {"role": "user", "content": "What about escalations?"},
+        {"role": "assistant", "content": "3% annually."},
+        {"role": "user", "content": "Based on the following documents: ..."},
+    ]
+
+    system, chat_messages = anthropic._split_messages(messages)
+
+    assert [block["text"][:7] for block in system] == ["You are", "Summary"]
+    assert all(block["cache_control"] == anthropic.CACHE_CONTROL for block in system)
+    assert chat_messages[1]["content"][0]["cache_control"] == anthropic.CACHE_CONTROL
+    # The volatile final turn is left uncached and unchanged
+    assert chat_messages[-1] == messages[-1]
+    assert chat_messages[0] == messages[2]
+
+
+def test_anthropic_prompt_tokens_include_cache_reads_and_writes():
+    usage = SimpleNamespace(
+        input_tokens=50, output_tokens=20, cache_read_input_tokens=900, cache_creation_input_tokens=0
+    )
+
+    assert anthropic._usage(usage) == {
+        "prompt_tokens": 950,
+        "completion_tokens": 20,
+        "total_tokens": 970,
+        "cached_prompt_tokens": 900,
+        "cache_creation_tokens": 0,
+    }
+
+
+def test_openai_usage_reports_cached_prompt_tokens():
+    usage = SimpleNamespace(
+        prompt_tokens=2000,
+        completion_tokens=100,
+        total_tokens=2100,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1536),
+    )
+
+    assert openai._usage(usage)["cached_prompt_tokens"] == 1536
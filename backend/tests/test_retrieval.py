@@ -0,0 +1,211 @@
+"""Tests for hybrid retrieval fusion and degradation."""
+import asyncio
+import uuid
+
+import pytest
+
+from app.services import retrieval, retrieval_cache
+from app.services.retrieval import (
+    ChunkText,
+    RankedChunk,
+    RetrievedChunk,
+    RetrievalTimings,
+    chunk_text_cache,
+    hybrid_search,
+    load_chunk_contents,
+    merge_results,
+)
+
+
+@pytest.fixture(autouse=True)
+def corpus_version(monkeypatch):
+    version = {"value": 0}
+
+    async def fake_corpus_version(db, project_id):
+        return version["value"]
+
+    monkeypatch.setattr(retrieval_cache, "get_corpus_version", fake_corpus_version)
+    retrieval_cache.retrieval_cache.clear()
+    return version
+
+
+def make_chunk(score: float = 0.5, chunk_id: uuid.UUID | None = None) -> RetrievedChunk:
+    return RetrievedChunk(
+        chunk_id=chunk_id or uuid.uuid4(),
+        document_id=uuid.uuid4(),
+        document_name="lease.pdf",
+        content="The lease term is ten years.",
+        page_number=1,
+        section=None,
+        score=score,
+    )
+
+
+def test_merge_results_rewards_chunks_found_by_both_legs():
+    shared = make_chunk()
+    vector_only = make_chunk()
+    keyword_only = make_chunk()
+
+    merged = merge_results([vector_only, shared], [shared, keyword_only], top_k=3)
+
+    assert merged[0].chunk_id == shared.chunk_id
+    assert [c.retrieval_rank for c in merged] == [1, 2, 3]
+
+
+def cache_text(chunk_id: uuid.UUID) -> None:
+    chunk_text_cache.set(
+        chunk_id, ChunkText("lease.pdf", "The lease term is ten years.", 1, None)
+    )
+
+
+async def test_load_chunk_contents_serves_cached_text_in_rank_order():
+    first = RankedChunk(chunk_id=uuid.uuid4(), document_id=uuid.uuid4(), score=0.9, retrieval_rank=1)
+    second = RankedChunk(chunk_id=uuid.uuid4(), document_id=uuid.uuid4(), score=0.5, retrieval_rank=2)
+    cache_text(first.chunk_id)
+    cache_text(second.chunk_id)
+
+    # Every candidate is cached, so no query is issued against the session
+    results = await load_chunk_contents(None, [first, second], uuid.uuid4())
+
+    assert [c.chunk_id for c in results] == [first.chunk_id, second.chunk_id]
+    assert results[0].content == "The lease term is ten years."
+    assert results[1].retrieval_rank == 2
+
+
+async def test_hybrid_search_degrades_to_keyword_when_embedding_is_slow(monkeypatch):
+    keyword_hit = RankedChunk(chunk_id=uuid.uuid4(), document_id=uuid.uuid4(), score=0.5)
+    cache_text(keyword_hit.chunk_id)
+
+    async def slow_embedding(query):
+        await asyncio.sleep(1)
+        return [0.0]
+
+    async def fake_keyword_search(db, query, project_id, top_k, document_ids=None):
+        return [keyword_hit]
+
+    monkeypatch.setattr(retrieval, "get_query_embedding", slow_embedding)
+    monkeypatch.setattr(retrieval, "keyword_search", fake_keyword_search)
+    monkeypatch.setattr(retrieval.settings, "embedding_timeout_seconds", 0.01)
+
+    timings = RetrievalTimings()
+    results = await hybrid_search(None, "lease term", uuid.uuid4(), top_k=5, timings=timings)
+
+    assert [c.chunk_id for c in results] == [keyword_hit.chunk_id]
+    assert timings.degraded == "keyword_only"
+    assert timings.keyword_ms is not None
+
+
+async def test_hybrid_search_raises_when_both_legs_fail(monkeypatch):
+    async def failing_embedding(query):
+        raise RuntimeError("embedding unavailable")
+
+    async def failing_keyword_search(db, query, project_id, top_k, document_ids=None):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(retrieval, "get_query_embedding", failing_embedding)
+    monkeypatch.setattr(retrieval, "keyword_search", failing_keyword_search)
+
+    with pytest.raises(RuntimeError, match="embedding unavailable"):
+        await hybrid_search(None, "lease term", uuid.uuid4(), top_k=5)
+
+
+async def test_hybrid_search_keyword_failure_leaves_the_request_session_usable(monkeypatch):
+    request_db = object()
+    vector_hit = RankedChunk(chunk_id=uuid.uuid4(), document_id=uuid.uuid4(), score=0.5)
+    loaded_with = []
+
+    async def fake_embedding(query):
+        return [0.0]
+
+    async def fake_vector_search(db, query_embedding, project_id, top_k, document_ids, profile):
+        return [vector_hit]
+
+    async def failing_keyword_search(db, query, project_id, top_k, document_ids=None):
+        assert db is not request_db
+        raise RuntimeError("statement timeout")
+
+    async def fake_load_chunk_contents(db, ranked, project_id):
+        loaded_with.append(db)
+        return [make_chunk(chunk_id=chunk.chunk_id) for chunk in ranked]
+
+    monkeypatch.setattr(retrieval, "get_query_embedding", fake_embedding)
+    monkeypatch.setattr(retrieval, "vector_search", fake_vector_search)
+    monkeypatch.setattr(retrieval, "keyword_search", failing_keyword_search)
+    monkeypatch.setattr(retrieval, "load_chunk_contents", fake_load_chunk_contents)
+
+    timings = RetrievalTimings()
+    results = await hybrid_search(
+        request_db, "lease term", uuid.uuid4(), top_k=5, timings=timings, fusion="python"
+    )
+
+    assert [c.chunk_id for c in results] == [vector_hit.chunk_id]
+    assert timings.degraded == "vector_only"
+    assert loaded_with == [request_db]
+
+
+async def test_sql_fusion_failure_degrades_to_keyword(monkeypatch):
+    keyword_hit = RankedChunk(chunk_id=uuid.uuid4(), document_id=uuid.uuid4(), score=0.5)
+    cache_text(keyword_hit.chunk_id)
+
+    async def fake_embedding(query):
+        return [0.0]
+
+    async def failing_fused_search(db, *args):
+        raise RuntimeError("statement timeout")
+
+    async def fake_keyword_search(db, query, project_id, top_k, document_ids=None):
+        return [keyword_hit]
+
+    monkeypatch.setattr(retrieval, "get_query_embedding", fake_embedding)
+    monkeypatch.setattr(retrieval, "fused_search", failing_fused_search)
+    monkeypatch.setattr(retrieval, "keyword_search", fake_keyword_search)
+
+    timings = RetrievalTimings()
+    results = await hybrid_search(
+        None, "lease term", uuid.uuid4(), top_k=5, timings=timings, fusion="sql"
+    )
+
+    assert [c.chunk_id for c in results] == [keyword_hit.chunk_id]
+    assert timings.degraded == "keyword_only"
+
+
+async def test_hybrid_search_results_are_cached_per_corpus_version(monkeypatch, corpus_version):
+    calls = []
+
+    async def fake_search(db, query, project_id, top_k, document_ids, search_profile, timings):
+        calls.append(query)
+        return [make_chunk()]
+
+    monkeypatch.setattr(retrieval, "_search", fake_search)
+    project_id = uuid.uuid4()
+
+    first = await hybrid_search(None, "What is the lease term?", project_id, top_k=5)
+    timings = RetrievalTimings()
+    second = await hybrid_search(None, "what is the lease term", project_id, top_k=5, timings=timings)
+
+    assert len(calls) == 1
+    assert timings.cache_hit
+    assert second[0].chunk_id == first[0].chunk_id
+    assert second[0] is not first[0]
+
+    corpus_version["value"] += 1
+    await hybrid_search(None, "What is the lease term?", project_id, top_k=5)
+
+    assert len(calls) == 2
+
+
+async def test_hybrid_search_with_empty_scope_skips_retrieval(monkeypatch):
+    async def fake_scope(db, project_id, document_ids, categories, tags):
+        return []
+
+    async def unexpected_search(*args):
+        raise AssertionError("retrieval legs should not run")
+
+    monkeypatch.setattr(retrieval, "resolve_document_scope", fake_scope)
+    monkeypatch.setattr(retrieval, "_search", unexpected_search)
+
+    results = await hybrid_search(
+        None, "What is the cap rate?", uuid.uuid4(), top_k=5, tags=["closing"]
+    )
+
+    assert results == []
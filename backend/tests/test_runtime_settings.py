@@ -0,0 +1,64 @@
+"""Tests for the cached runtime settings layer."""
+import pytest
+
+from app.models.settings import Settings as SettingsModel
+from app.services import notify, runtime_settings
+
+
+class FakeScalars:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeResult(FakeScalars):
+    def scalars(self):
+        return self
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, statement, params=None):
+        self.queries += 1
+        return FakeResult(self.rows)
+
+
+@pytest.fixture(autouse=True)
+def fresh_snapshot():
+    runtime_settings.invalidate()
+    yield
+    runtime_settings.invalidate()
+
+
+async def test_llm_config_is_loaded_once_and_decrypted():
+    db = FakeSession([
+        SettingsModel(key="llm_provider", value={"v": "anthropic"}),
+        SettingsModel(
+            key="api_key_anthropic",
+            encrypted_value=runtime_settings.encrypt_value("sk-ant-test"),
+        ),
+        SettingsModel(key="api_key_openai", encrypted_value=b"not a fernet token"),
+    ])
+
+    assert await runtime_settings.get_llm_config(db) == ("anthropic", "sk-ant-test")
+    assert await runtime_settings.get_llm_config(db) == ("anthropic", "sk-ant-test")
+    assert db.queries == 1
+
+    snapshot = await runtime_settings.get_runtime_settings(db)
+    assert "openai" not in snapshot.api_keys
+
+
+async def test_notification_invalidates_snapshot():
+    db = FakeSession([SettingsModel(key="llm_provider", value={"v": "ollama"})])
+    assert await runtime_settings.get_llm_config(db) == ("ollama", None)
+
+    db.rows = [SettingsModel(key="llm_provider", value={"v": "openai"})]
+    notify._dispatch(runtime_settings.SETTINGS_CHANNEL, "")
+
+    assert await runtime_settings.get_llm_config(db) == ("openai", None)
+    assert db.queries == 2
@@ -0,0 +1,60 @@
+"""Tests for coalesced SSE token framing."""
+import asyncio
+
+from app.services.streaming import coalesce_tokens, dumps
+
+
+async def token_stream(tokens, delay=0.0):
+    for token in tokens:
+        if delay:
+            await asyncio.sleep(delay)
+        yield token
+
+
+async def collect(frames):
+    return [frame async for frame in frames]
+
+
+async def test_tokens_are_batched_up_to_the_size_limit():
+    tokens = ["ab"] * 10
+
+    frames = await collect(coalesce_tokens(token_stream(tokens), window_ms=1000, max_chars=6))
+
+    assert frames == ["ababab", "ababab", "ababab", "ab"]
+
+
+async def test_buffered_tokens_flush_when_the_window_elapses():
+    async def slow():
+        yield "The rent "
+        yield "is due"
+        await asyncio.sleep(0.1)
+        yield " monthly."
+
+    frames = await collect(coalesce_tokens(slow(), window_ms=20, max_chars=1000))
+
+    assert frames == ["The rent is due", " monthly."]
+
+
+async def test_zero_window_passes_tokens_through():
+    tokens = ["a", "b", "c"]
+
+    assert await collect(coalesce_tokens(token_stream(tokens), window_ms=0)) == tokens
+
+
+def test_dumps_matches_json_event_shape():
+    assert dumps({"type": "token", "content": "é"}) == '{"type":"token","content":"é"}'
+
+
+async def test_cancel_event_stops_waiting_on_the_provider():
+    cancelled = asyncio.Event()
+
+    async def stalled():
+        yield "Partial"
+        await asyncio.sleep(60)
+        yield " never sent"
+
+    frames = coalesce_tokens(stalled(), window_ms=0, cancelled=cancelled)
+    assert await anext(frames) == "Partial"
+
+    cancelled.set()
+    assert await asyncio.wait_for(collect(frames), timeout=1) == []
@@ -0,0 +1,55 @@
+"""Tests for document summaries and coarse-to-fine document scoping."""
+import uuid
+
+import numpy as np
+
+from app.models.document import Document, DocumentCategory
+from app.services import summaries
+from app.services.ingestion.chunker import TextChunk
+
+
+def make_document() -> Document:
+    return Document(
+        id=uuid.uuid4(),
+        project_id=uuid.uuid4(),
+        filename="lease.pdf",
+        category=DocumentCategory.lease,
+        page_count=2,
+    )
+
+
+def test_build_summaries_covers_document_and_sections():
+    chunks = [
+        TextChunk("Base rent is $40 per foot. It escalates annually.", 1, "1. Rent", 12),
+        TextChunk("It escalates annually. Late fees apply after five days.", 1, "1. Rent", 12),
+        TextChunk("Tenant maintains the interior.", 2, "2. Maintenance", 5),
+    ]
+    embeddings = np.array([[1, 0, 0], [1, 0, 0], [0, 3, 0]], dtype=np.float32)
+
+    document_summary, rent, maintenance = summaries.build_summaries(
+        make_document(), chunks, embeddings
+    )
+
+    assert document_summary.section is None
+    assert document_summary.chunk_count == 3
+    assert "Sections: 1. Rent; 2. Maintenance" in document_summary.content
+    assert document_summary.content.count("It escalates annually.") == 1
+    assert (rent.section, rent.page_start, rent.page_end) == ("1. Rent", 1, 1)
+    np.testing.assert_allclose(rent.embedding, [1, 0, 0])
+    np.testing.assert_allclose(maintenance.embedding, [0, 1, 0])
+    assert np.isclose(np.linalg.norm(document_summary.embedding), 1)
+
+
+async def test_coarse_scope_keeps_top_and_unsummarized_documents(monkeypatch):
+    closest, second, distant, unsummarized = (uuid.uuid4() for _ in range(4))
+
+    async def fake_rank_documents(db, project_id, query_embedding, document_ids=None):
+        return [(unsummarized, None), (closest, 0.1), (second, 0.3), (distant, 0.9)]
+
+    monkeypatch.setattr(summaries, "rank_documents", fake_rank_documents)
+
+    scoped = await summaries.coarse_document_scope(None, uuid.uuid4(), np.zeros(3), 2)
+    assert scoped == [closest, second, unsummarized]
+
+    unchanged = await summaries.coarse_document_scope(None, uuid.uuid4(), np.zeros(3), 3)
+    assert unchanged is None
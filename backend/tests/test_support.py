@@ -0,0 +1,73 @@
+"""Tests for answer-support scoring."""
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services import support
+from app.services.retrieval import RetrievedChunk
+
+
+def make_chunk(content: str) -> RetrievedChunk:
+    return RetrievedChunk(
+        chunk_id=uuid.uuid4(),
+        document_id=uuid.uuid4(),
+        document_name="lease.pdf",
+        content=content,
+        page_number=1,
+        section=None,
+        score=0.5,
+    )
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    calls = []
+
+    async def fake_generate_embeddings(texts):
+        calls.append(list(texts))
+        vectors = {
+            "rent": [1.0, 0.0, 0.0],
+            "roof": [0.0, 1.0, 0.0],
+        }
+        return np.array(
+            [next((v for k, v in vectors.items() if k in t.lower()), [0.0, 0.0, 1.0]) for t in texts],
+            dtype=np.float32,
+        )
+
+    monkeypatch.setattr(support, "generate_embeddings", fake_generate_embeddings)
+    return calls
+
+
+async def test_stored_vectors_are_reused_and_only_the_answer_is_embedded(embedded, monkeypatch):
+    monkeypatch.setattr(support.settings, "support_scoring", "response")
+    rent, roof, unstored = make_chunk("Rent clause"), make_chunk("Roof clause"), make_chunk("Roof repairs")
+    vectors = {
+        rent.chunk_id: np.array([2.0, 0.0, 0.0], dtype=np.float32),
+        roof.chunk_id: np.array([0.0, 1.0, 0.0], dtype=np.float32),
+    }
+
+    await support.score_answer_support([rent, roof, unstored], "The rent is $40.", vectors)
+
+    assert embedded == [["The rent is $40.", "Roof repairs"]]
+    assert rent.answer_support == pytest.approx(1.0)
+    assert roof.answer_support == pytest.approx(0.0)
+
+
+async def test_sentence_mode_scores_each_chunk_by_its_best_sentence(embedded, monkeypatch):
+    monkeypatch.setattr(support.settings, "support_scoring", "sentences")
+    rent, roof = make_chunk("Rent clause"), make_chunk("Roof clause")
+    vectors = {
+        rent.chunk_id: np.array([1.0, 0.0, 0.0], dtype=np.float32),
+        roof.chunk_id: np.array([0.0, 1.0, 0.0], dtype=np.float32),
+    }
+    response = (
+        "Base rent is forty dollars per foot [Document: lease.pdf, Page 1]. "
+        "The landlord maintains the roof and structure."
+    )
+
+    await support.score_answer_support([rent, roof], response, vectors)
+
+    assert len(embedded[0]) == 2
+    assert rent.answer_support == pytest.approx(1.0)
+    assert roof.answer_support == pytest.approx(1.0)
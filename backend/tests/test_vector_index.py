@@ -0,0 +1,91 @@
+"""Tests for the in-process exact vector index."""
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services import vector_index
+from app.services.vector_index import ProjectVectorIndex
+
+
+@pytest.fixture
+def small_index(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_index.settings, "embedding_dimension", 3)
+    monkeypatch.setattr(vector_index.settings, "documents_path", str(tmp_path))
+
+    project_id = uuid.uuid4()
+    lease, appraisal = uuid.uuid4(), uuid.uuid4()
+    chunk_ids = [uuid.uuid4() for _ in range(3)]
+    index = ProjectVectorIndex(
+        project_id=project_id,
+        embeddings=vector_index._normalize(
+            np.array([[1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=np.float32)
+        ),
+        chunk_ids=vector_index.uuid_array(chunk_ids),
+        document_ids=vector_index.uuid_array([lease, lease, appraisal]),
+    )
+    index.save()
+    return index, chunk_ids, lease, appraisal
+
+
+def test_search_ranks_by_cosine_similarity(small_index):
+    index, chunk_ids, _, _ = small_index
+
+    hits = index.search(np.array([1, 0.1, 0], dtype=np.float32), top_k=2)
+
+    assert [chunk_id for chunk_id, _, _ in hits] == [chunk_ids[0], chunk_ids[2]]
+    assert hits[0][2] > hits[1][2]
+
+
+def test_search_honours_document_filter(small_index):
+    index, chunk_ids, _, appraisal = small_index
+
+    hits = index.search(np.array([1, 0, 0], dtype=np.float32), top_k=3, document_ids=[appraisal])
+
+    assert [chunk_id for chunk_id, _, _ in hits] == [chunk_ids[2]]
+
+
+def test_incremental_updates_are_persisted(small_index):
+    index, chunk_ids, lease, _ = small_index
+    new_document, new_chunk = uuid.uuid4(), uuid.uuid4()
+
+    vector_index.add_chunks(
+        index.project_id, [new_chunk], [new_document], np.array([[0, 0, 1]], dtype=np.float32), 1
+    )
+    vector_index.remove_documents(index.project_id, [lease], 2)
+
+    reloaded = ProjectVectorIndex.load(index.project_id)
+    hits = reloaded.search(np.array([0, 0, 1], dtype=np.float32), top_k=5)
+    assert len(reloaded) == 2
+    assert hits[0][0] == new_chunk
+    assert chunk_ids[0] not in {chunk_id for chunk_id, _, _ in hits}
+    assert reloaded.corpus_version == 2
+
+
+def test_update_that_skips_a_version_drops_the_index(small_index):
+    index, _, lease, _ = small_index
+
+    # Version 1 never reached this index, so it can't be patched to 2
+    vector_index.remove_documents(index.project_id, [lease], 2)
+
+    assert ProjectVectorIndex.load(index.project_id) is None
+
+
+def test_save_swaps_in_a_new_generation(small_index):
+    index, _, lease, _ = small_index
+    directory = vector_index.index_dir(index.project_id)
+    first = index.generation
+
+    vector_index.remove_documents(index.project_id, [lease], 1)
+
+    generations = [p.name for p in directory.iterdir() if p.name.startswith("vectors-")]
+    assert generations == [vector_index._current_generation(index.project_id)]
+    assert first not in generations
+
+
+def test_uuid_array_round_trips_trailing_null_bytes():
+    chunk_id = uuid.UUID(bytes=b"\x01" * 15 + b"\x00")
+
+    stored = vector_index.uuid_array([chunk_id])
+
+    assert uuid.UUID(bytes=bytes(stored[0])) == chunk_id
@@ -0,0 +1,97 @@
+"""Tests for the per-conversation retrieval working set."""
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services import retrieval_cache, working_set
+from app.services.retrieval import RetrievedChunk, RetrievalTimings
+
+
+def make_chunk() -> RetrievedChunk:
+    return RetrievedChunk(
+        chunk_id=uuid.uuid4(),
+        document_id=uuid.uuid4(),
+        document_name="lease.pdf",
+        content="Base rent escalates three percent annually.",
+        page_number=4,
+        section=None,
+        score=0.5,
+    )
+
+
+@pytest.fixture
+def search_calls(monkeypatch):
+    chunks = [make_chunk() for _ in range(3)]
+    vectors = {
+        chunks[0].chunk_id: np.array([1.0, 0.0, 0.0], dtype=np.float32),
+        chunks[1].chunk_id: np.array([0.9, 0.1, 0.0], dtype=np.float32),
+        chunks[2].chunk_id: np.array([0.0, 0.0, 1.0], dtype=np.float32),
+    }
+    calls = []
+
+    async def fake_hybrid_search(db, query, project_id, top_k=None, document_ids=None, timings=None):
+        calls.append(query)
+        return chunks
+
+    async def fake_load_chunk_embeddings(db, project_id, chunk_ids):
+        return {chunk_id: vectors[chunk_id] for chunk_id in chunk_ids}
+
+    async def fake_query_embedding(query):
+        return np.array([1.0, 0.05, 0.0], dtype=np.float32)
+
+    async def fake_corpus_version(db, project_id):
+        return 0
+
+    monkeypatch.setattr(working_set.settings, "embedding_dimension", 3)
+    monkeypatch.setattr(working_set.settings, "working_set_min_hits", 2)
+    monkeypatch.setattr(working_set, "hybrid_search", fake_hybrid_search)
+    monkeypatch.setattr(working_set, "load_chunk_embeddings", fake_load_chunk_embeddings)
+    monkeypatch.setattr(working_set, "get_query_embedding", fake_query_embedding)
+    monkeypatch.setattr(retrieval_cache, "get_corpus_version", fake_corpus_version)
+    return calls, chunks
+
+
+async def test_follow_up_turn_is_served_from_working_set(search_calls):
+    calls, chunks = search_calls
+    project_id, conversation_id = uuid.uuid4(), uuid.uuid4()
+
+    await working_set.conversation_search(None, "What is the base rent?", project_id, conversation_id)
+    timings = RetrievalTimings()
+    results = await working_set.conversation_search(
+        None, "How does rent escalate?", project_id, conversation_id, top_k=2, timings=timings
+    )
+
+    assert calls == ["What is the base rent?"]
+    assert timings.working_set_hit
+    assert [c.chunk_id for c in results] == [chunks[0].chunk_id, chunks[1].chunk_id]
+    assert [c.retrieval_rank for c in results] == [1, 2]
+
+
+async def test_short_hits_skip_the_global_search_and_top_up_in_background(search_calls):
+    calls, chunks = search_calls
+    project_id, conversation_id = uuid.uuid4(), uuid.uuid4()
+
+    await working_set.conversation_search(None, "What is the base rent?", project_id, conversation_id)
+    timings = RetrievalTimings()
+    results = await working_set.conversation_search(
+        None, "How does rent escalate?", project_id, conversation_id, top_k=3, timings=timings
+    )
+
+    # Answered from the working set alone, without a hybrid_search on the request path
+    assert calls == ["What is the base rent?"]
+    assert timings.working_set_hit
+    assert [c.chunk_id for c in results] == [chunks[0].chunk_id, chunks[1].chunk_id]
+
+    await working_set._refreshes[conversation_id]
+    assert calls == ["What is the base rent?", "How does rent escalate?"]
+
+
+async def test_other_conversations_start_cold(search_calls):
+    calls, _ = search_calls
+    project_id = uuid.uuid4()
+
+    await working_set.conversation_search(None, "What is the base rent?", project_id, uuid.uuid4())
+    await working_set.conversation_search(None, "What is the base rent?", project_id, uuid.uuid4())
+
+    assert len(calls) == 2
@@ -30,7 +30,7 @@ import { Button } from '@/components/ui/Button';
 import { Badge } from '@/components/ui/Badge';
 import { useKeyboardShortcuts } from '@/hooks/useKeyboardShortcuts';
 import { useNotifications } from '@/hooks/useNotifications';
-import type { Message, Citation, Document, Conversation, StreamEvent, DebugInfo } from '@/lib/types';
+import type { Message, Citation, Document, Conversation, DebugInfo } from '@/lib/types';
 import { cn } from '@/lib/utils';
 import { Panel, Group as PanelGroup, Separator as PanelResizeHandle } from 'react-resizable-panels';
 import { DebugModal } from '@/components/chat/DebugModal';
@@ -179,21 +179,20 @@ export default function ProjectPage() {
       // Use streaming endpoint
       let fullContent = '';
       let newConversationId = conversationId;
-      let lastEvent: StreamEvent | null = null;
+      let completed = false;
 
       for await (const event of chatApi.streamMessage(
         projectId,
         content,
         conversationId || undefined
       )) {
-        lastEvent = event;
-
         if (event.type === 'error') {
           throw new Error(event.content || 'An error occurred while generating a response');
         } else if (event.type === 'token') {
           fullContent += event.content;
           setStreamingContent(fullContent);
         } else if (event.type === 'complete') {
+          completed = true;
           // Create assistant message from complete event
           const assistantMessage: Message = {
             id: event.message_id,
@@ -218,11 +217,22 @@ export default function ProjectPage() {
           queryClient.invalidateQueries({
             queryKey: ['conversations', projectId],
           });
+        } else if (event.type === 'followups' || event.type === 'support') {
+          // Enrichments patch the message after `complete`
+          setMessages((prev) =>
+            prev.map((m) =>
+              m.id !== event.message_id
+                ? m
+                : event.type === 'followups'
+                  ? { ...m, suggested_followups: event.suggested_followups }
+                  : { ...m, debug_info: event.debug_info }
+            )
+          );
         }
       }
 
       // If stream ended without a complete event but we have content, save it anyway
-      if (fullContent && lastEvent?.type !== 'complete') {
+      if (fullContent && !completed) {
         const assistantMessage: Message = {
           id: `incomplete-${Date.now()}`,
           role: 'assistant',